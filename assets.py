@@ -0,0 +1,226 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+
+import config
+from storage import StaticFilesInmutables
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli solo se generan variantes .gz
+    brotli = None
+
+# ============================================================
+#      RECURSOS ESTÁTICOS (huella de contenido y precompresión)
+# ============================================================
+#
+# `python assets.py` (en el despliegue, después de instalar dependencias):
+#   - copia cada archivo de static/ (salvo fotos y derivados) a static/dist/
+#     con el hash de su contenido en el nombre: css/styles.<hash>.css,
+#   - reescribe las referencias url(...) de los CSS a los nombres con hash,
+#   - guarda junto a los archivos de texto sus variantes .br y .gz,
+#   - escribe static/dist/manifest.json: ruta original -> ruta con hash.
+#
+# Las plantillas enlazan los recursos con {{ asset_url("css/styles.css") }}.
+# Como el nombre cambia con el contenido, static/dist/ se sirve con caché
+# `immutable` de un año y el navegador no vuelve a preguntar por ellos. Sin
+# build (p. ej. en desarrollo) asset_url devuelve la ruta original en /static.
+
+DIRECTORIO_ESTATICOS = "static"
+DIRECTORIO_DIST = os.path.join(DIRECTORIO_ESTATICOS, "dist")
+MANIFIESTO = os.path.join(DIRECTORIO_DIST, "manifest.json")
+
+# Subdirectorios de static/ que no pasan por el build: las fotos y sus
+# derivados ya están nombrados por contenido y comprimidos
+EXCLUIDOS = {"dist", "uploads", "derivados"}
+
+# Solo vale la pena precomprimir formatos de texto
+COMPRIMIBLES = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map", ".xml"}
+
+# (codificación, extensión), en orden de preferencia
+CODIFICACIONES = (("br", ".br"), ("gzip", ".gz"))
+
+_URL_CSS = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+logger = logging.getLogger("ganaderia.assets")
+
+
+# ============================================================
+#                            BUILD
+# ============================================================
+
+def _huella(contenido: bytes) -> str:
+    return hashlib.sha256(contenido).hexdigest()[:12]
+
+
+def _nombre_con_huella(ruta: str, huella: str) -> str:
+    base, extension = posixpath.splitext(ruta)
+    return f"{base}.{huella}{extension}"
+
+
+def _reescribir_css(contenido: bytes, ruta: str, manifiesto: dict) -> bytes:
+    """Apunta los url(...) relativos (o a /static/...) de un CSS a sus versiones con hash."""
+    directorio = posixpath.dirname(ruta)
+
+    def reemplazar(coincidencia):
+        url = coincidencia.group(2).strip()
+        if url.startswith(("data:", "http:", "https:", "//", "#")):
+            return coincidencia.group(0)
+        objetivo, _, sufijo = url.partition("?")
+        if objetivo.startswith("/static/"):
+            objetivo = objetivo[len("/static/"):]
+        else:
+            objetivo = posixpath.normpath(posixpath.join(directorio, objetivo))
+        if objetivo not in manifiesto:
+            return coincidencia.group(0)
+        nueva = posixpath.relpath(manifiesto[objetivo], directorio or ".")
+        return f"url({nueva}{'?' + sufijo if sufijo else ''})"
+
+    return _URL_CSS.sub(reemplazar, contenido.decode("utf-8")).encode("utf-8")
+
+
+def _escribir(destino: str, contenido: bytes):
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = destino + ".parcial"
+    with open(temporal, "wb") as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, destino)
+
+
+def _precomprimir(destino: str, contenido: bytes) -> list[str]:
+    """Escribe las variantes .br / .gz que resulten más pequeñas que el original."""
+    variantes = [(".gz", gzip.compress(contenido, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.insert(0, (".br", brotli.compress(contenido, quality=11)))
+    escritas = []
+    for extension, comprimido in variantes:
+        if len(comprimido) < len(contenido):
+            _escribir(destino + extension, comprimido)
+            escritas.append(extension)
+    return escritas
+
+
+def _fuentes() -> list[str]:
+    """Rutas (relativas a static/, con '/') de los archivos que pasan por el build."""
+    rutas = []
+    for raiz, directorios, archivos in os.walk(DIRECTORIO_ESTATICOS):
+        if raiz == DIRECTORIO_ESTATICOS:
+            directorios[:] = [d for d in directorios if d not in EXCLUIDOS]
+        for nombre in archivos:
+            relativa = os.path.relpath(os.path.join(raiz, nombre), DIRECTORIO_ESTATICOS)
+            rutas.append(relativa.replace(os.sep, "/"))
+    # Los CSS al final: al reescribirlos ya se conocen los hashes de lo que enlazan
+    return sorted(rutas, key=lambda ruta: (ruta.endswith(".css"), ruta))
+
+
+def construir() -> dict:
+    """Genera static/dist/ y su manifiesto desde cero. Devuelve el manifiesto."""
+    shutil.rmtree(DIRECTORIO_DIST, ignore_errors=True)
+    manifiesto = {}
+    for ruta in _fuentes():
+        with open(os.path.join(DIRECTORIO_ESTATICOS, ruta), "rb") as archivo:
+            contenido = archivo.read()
+        if ruta.endswith(".css"):
+            contenido = _reescribir_css(contenido, ruta, manifiesto)
+        final = _nombre_con_huella(ruta, _huella(contenido))
+        destino = os.path.join(DIRECTORIO_DIST, final)
+        _escribir(destino, contenido)
+        variantes = []
+        if posixpath.splitext(ruta)[1].lower() in COMPRIMIBLES:
+            variantes = _precomprimir(destino, contenido)
+        manifiesto[ruta] = final
+        logger.info("%s -> %s %s", ruta, final, " ".join(variantes))
+    _escribir(MANIFIESTO, json.dumps(manifiesto, indent=2, sort_keys=True).encode("utf-8"))
+    _manifiesto.update(datos=manifiesto, mtime=None)
+    return manifiesto
+
+
+# ============================================================
+#                  URL DE UN RECURSO (plantillas)
+# ============================================================
+
+_manifiesto = {"datos": None, "mtime": None}
+
+
+def _cargar_manifiesto() -> dict:
+    # En desarrollo (PLANTILLAS_RECARGA) se relee si el build cambió
+    if _manifiesto["datos"] is not None and not config.PLANTILLAS_RECARGA:
+        return _manifiesto["datos"]
+    try:
+        mtime = os.stat(MANIFIESTO).st_mtime
+    except FileNotFoundError:
+        _manifiesto.update(datos={}, mtime=None)
+        return _manifiesto["datos"]
+    if _manifiesto["datos"] is None or mtime != _manifiesto["mtime"]:
+        with open(MANIFIESTO, encoding="utf-8") as archivo:
+            _manifiesto.update(datos=json.load(archivo), mtime=mtime)
+    return _manifiesto["datos"]
+
+
+def asset_url(ruta: str) -> str:
+    """Global de plantilla: "css/styles.css" -> "/static/dist/css/styles.<hash>.css"."""
+    ruta = ruta.lstrip("/")
+    final = _cargar_manifiesto().get(ruta)
+    if final is None:
+        return f"/static/{ruta}"
+    return f"/static/dist/{final}"
+
+
+# ============================================================
+#            SERVIDOR DE static/dist/ (precomprimido)
+# ============================================================
+
+def codificaciones_aceptadas(valor: str) -> set[str]:
+    """Codificaciones de un Accept-Encoding (las que tienen q=0 se excluyen)."""
+    aceptadas = set()
+    for parte in valor.split(","):
+        nombre, _, parametros = parte.partition(";")
+        nombre = nombre.strip().lower()
+        parametros = parametros.replace(" ", "")
+        if not nombre or parametros in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        aceptadas.add(nombre)
+    return aceptadas
+
+
+class StaticFilesPrecomprimidos(StaticFilesInmutables):
+    """
+    Sirve la variante .br o .gz de un archivo si el cliente la acepta y existe,
+    con la cabecera Content-Encoding correspondiente y Vary: Accept-Encoding.
+    """
+
+    async def get_response(self, path: str, scope):
+        comprimible = posixpath.splitext(path)[1].lower() in COMPRIMIBLES
+        if comprimible:
+            aceptadas = codificaciones_aceptadas(Headers(scope=scope).get("accept-encoding", ""))
+            if "*" in aceptadas:
+                aceptadas.update(codificacion for codificacion, _ in CODIFICACIONES)
+            for codificacion, extension in CODIFICACIONES:
+                if codificacion not in aceptadas:
+                    continue
+                try:
+                    response = await super().get_response(path + extension, scope)
+                except HTTPException:
+                    continue
+                # FileResponse deduce el tipo del original (styles.css.br -> text/css)
+                if response.status_code == 200:
+                    response.headers["Content-Encoding"] = codificacion
+                response.headers["Vary"] = "Accept-Encoding"
+                return response
+        response = await super().get_response(path, scope)
+        if comprimible:
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Recursos generados: {len(construir())} (brotli: {'sí' if brotli else 'no instalado'})")
@@ -0,0 +1,15 @@
+# ============================================================
+#                 BENCHMARKS DE RENDIMIENTO
+# ============================================================
+#
+#   python -m benchmarks.generar --ganados 100000 --salida benchmarks/datos/100k.db
+#   python -m benchmarks.ejecutar --db benchmarks/datos/100k.db --salida antes.json
+#   python -m benchmarks.comparar antes.json despues.json
+#
+# `generar` crea una base sintética reproducible (misma semilla -> mismos datos),
+# `ejecutar` recorre la aplicación real en proceso con un cliente HTTP y guarda
+# latencias, rendimiento y consultas por petición en JSON, y `comparar` muestra
+# la diferencia entre dos ejecuciones (p. ej. entre dos commits).
+#
+# Deben ejecutarse desde la raíz del proyecto (las rutas de static/ y
+# templates/ son relativas).
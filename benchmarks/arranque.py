@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# ============================================================
+#             TIEMPO DE ARRANQUE EN FRÍO (presupuesto)
+# ============================================================
+#
+# Uso: python -m benchmarks.arranque [--repeticiones 5] [--presupuesto-ms 3000] [--db base.db]
+#
+# Cada repetición es un proceso Python nuevo que importa main, ejecuta el
+# lifespan (esquema, censo, plantillas) y responde GET /. Se mide:
+#   importar_ms   import main (módulos, modelos, rutas)
+#   lifespan_ms   arranque del lifespan
+#   primera_ms    primera petición
+#   proceso_ms    desde lanzar el proceso hasta la primera respuesta, incluido
+#                 el arranque del intérprete (lo que espera un worker nuevo)
+#
+# Sin --db se usa una base vacía nueva en cada repetición (el peor caso: hay
+# que crear el esquema). Sale con código 1 si la mediana de proceso_ms supera
+# el presupuesto, para usarlo como control en integración continua.
+
+
+def _argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el arranque en frío de la aplicación.")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--presupuesto-ms", type=float, default=3000.0, help="Máximo para la mediana de proceso_ms")
+    parser.add_argument("--db", help="Base existente (por defecto, una vacía por repetición)")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+async def _medir_hijo() -> dict:
+    """Se ejecuta dentro del proceso medido."""
+    inicio = time.perf_counter()
+    import main
+    importado = time.perf_counter()
+
+    import httpx
+
+    transporte = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        listo = time.perf_counter()
+        async with httpx.AsyncClient(transport=transporte, base_url="http://arranque") as cliente:
+            respuesta = await cliente.get("/")
+        primera = time.perf_counter()
+    respuesta.raise_for_status()
+    return {
+        "importar_ms": round((importado - inicio) * 1000, 1),
+        "lifespan_ms": round((listo - importado) * 1000, 1),
+        "primera_ms": round((primera - listo) * 1000, 1),
+    }
+
+
+def _repeticion(args, directorio: str, numero: int) -> dict:
+    entorno = dict(os.environ)
+    db = args.db or os.path.join(directorio, f"arranque_{numero}.db")
+    entorno["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db)}"
+    entorno.pop("ASYNC_DATABASE_URL", None)
+    entorno["GANADO_PLANTILLAS_CACHE"] = os.path.join(directorio, "plantillas")
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, "-m", "benchmarks.arranque", "--hijo"],
+        env=entorno, capture_output=True, text=True,
+    )
+    total = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        sys.exit(f"El proceso de arranque falló:\n{proceso.stderr}")
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    resultado["proceso_ms"] = round(total * 1000, 1)
+    return resultado
+
+
+def principal(argv=None):
+    args = _argumentos(argv)
+    if args.hijo:
+        print(json.dumps(asyncio.run(_medir_hijo())))
+        return
+    if args.db and not os.path.exists(args.db):
+        sys.exit(f"No existe {args.db}")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repeticiones = [_repeticion(args, directorio, i) for i in range(args.repeticiones)]
+    medianas = {
+        clave: round(statistics.median(r[clave] for r in repeticiones), 1)
+        for clave in ("importar_ms", "lifespan_ms", "primera_ms", "proceso_ms")
+    }
+    for clave, valor in medianas.items():
+        print(f"{clave:12s} {valor:9.1f} ms (mediana de {len(repeticiones)})", file=sys.stderr)
+
+    excedido = medianas["proceso_ms"] > args.presupuesto_ms
+    resultado = {
+        "presupuesto_ms": args.presupuesto_ms,
+        "excedido": excedido,
+        "medianas": medianas,
+        "repeticiones": repeticiones,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(json.dumps(resultado, indent=2, ensure_ascii=False) + "\n")
+    if excedido:
+        sys.exit(f"Arranque de {medianas['proceso_ms']} ms: supera el presupuesto de {args.presupuesto_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    principal()
@@ -0,0 +1,52 @@
+import argparse
+import json
+import sys
+
+# ============================================================
+#           COMPARACIÓN DE DOS EJECUCIONES DEL BENCHMARK
+# ============================================================
+#
+# Uso: python -m benchmarks.comparar antes.json despues.json [--umbral 10]
+#
+# Muestra, por escenario, la variación de rendimiento, latencias y consultas.
+# Sale con código 1 si algún p95 empeora más que el umbral (en %), para poder
+# usarlo como control en integración continua.
+
+METRICAS = ("rps", "p50_ms", "p95_ms", "p99_ms", "consultas_por_peticion")
+
+
+def _variacion(antes, despues) -> float | None:
+    if antes in (None, 0) or despues is None:
+        return None
+    return (despues - antes) / antes * 100
+
+
+def comparar(antes: dict, despues: dict, umbral: float) -> bool:
+    """Imprime la tabla comparativa. Devuelve True si hay regresiones."""
+    print(f"{'escenario':16s}" + "".join(f"{m:>26s}" for m in METRICAS))
+    regresion = False
+    for nombre, nuevo in despues["escenarios"].items():
+        viejo = antes["escenarios"].get(nombre)
+        if viejo is None:
+            continue
+        celdas = []
+        for metrica in METRICAS:
+            a, d = viejo.get(metrica), nuevo.get(metrica)
+            cambio = _variacion(a, d)
+            celdas.append(f"{a!s:>9} -> {d!s:>9} {'' if cambio is None else f'{cambio:+.0f}%':>5}")
+        print(f"{nombre:16s}" + "".join(f"{c:>26s}" for c in celdas))
+        cambio_p95 = _variacion(viejo.get("p95_ms"), nuevo.get("p95_ms"))
+        if cambio_p95 is not None and cambio_p95 > umbral:
+            regresion = True
+    return regresion
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara dos resultados de benchmarks.ejecutar.")
+    parser.add_argument("antes")
+    parser.add_argument("despues")
+    parser.add_argument("--umbral", type=float, default=10.0, help="Empeoramiento máximo del p95 (%%)")
+    args = parser.parse_args()
+    with open(args.antes, encoding="utf-8") as a, open(args.despues, encoding="utf-8") as d:
+        hay_regresion = comparar(json.load(a), json.load(d), args.umbral)
+    sys.exit(1 if hay_regresion else 0)
@@ -0,0 +1,268 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+# ============================================================
+#       EJECUCIÓN DEL BENCHMARK CONTRA LA APLICACIÓN REAL
+# ============================================================
+#
+# Uso: python -m benchmarks.ejecutar --db benchmarks/datos/100k.db \
+#          --peticiones 500 --concurrencia 8 --salida resultado.json
+#
+# La aplicación (main.app) se ejecuta en el mismo proceso, con su lifespan,
+# y se le envían peticiones HTTP con httpx a través de ASGI: se mide todo el
+# camino (routing, validación, consultas, plantillas, serialización) sin el
+# ruido de la red. Con GANADO_DEBUG=1 cada respuesta trae X-DB-Queries, de
+# donde salen las consultas por petición.
+#
+# ¡Las escenas de escritura modifican la base! Conviene regenerarla (o usar
+# una copia) antes de comparar dos ejecuciones.
+
+
+def _argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Mide la aplicación en proceso contra una base sintética.")
+    parser.add_argument("--db", required=True, help="Base generada con benchmarks.generar")
+    parser.add_argument("--peticiones", type=int, default=200, help="Peticiones por escenario")
+    parser.add_argument("--concurrencia", type=int, default=4, help="Peticiones simultáneas")
+    parser.add_argument("--calentamiento", type=int, default=10, help="Peticiones previas no medidas")
+    parser.add_argument("--escenarios", nargs="*", help="Subconjunto de escenarios (por defecto, todos)")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto, salida estándar)")
+    parser.add_argument("--semilla", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def percentil(valores: list[float], p: float) -> float:
+    """Percentil por rango más cercano (valores ordenados)."""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, round(p / 100 * len(valores) + 0.5) - 1))
+    return valores[indice]
+
+
+def _commit_actual() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Contexto:
+    """Datos de la base que usan los escenarios (ids existentes, altas hechas...)."""
+
+    def __init__(self, muestra, finca_ids, tipo_ids, azar):
+        self.muestra = muestra          # [(id, identificacion)] de animales existentes
+        self.finca_ids = finca_ids
+        self.tipo_ids = tipo_ids
+        self.azar = azar
+        self.creados = []               # ids dados de alta por el escenario "crear"
+
+    def animal(self):
+        return self.azar.choice(self.muestra)
+
+    def datos_ganado(self, identificacion):
+        return {
+            "identificacion": identificacion,
+            "nombre": f"Bench {self.azar.randrange(10**6)}",
+            "fecha_nacimiento": "2020-01-01",
+            "sexo": self.azar.choice(["Macho", "Hembra"]),
+            "finca_id": self.azar.choice(self.finca_ids),
+            "tipo_animal_id": self.azar.choice(self.tipo_ids),
+        }
+
+
+async def _listar(cliente, ctx, i):
+    return await cliente.get("/ganado/api/", params={"limit": 50})
+
+
+async def _listar_filtrado(cliente, ctx, i):
+    return await cliente.get("/ganado/api/", params={
+        "limit": 50, "finca_id": ctx.azar.choice(ctx.finca_ids), "sexo": "Hembra",
+    })
+
+
+async def _listar_fincas(cliente, ctx, i):
+    return await cliente.get("/fincas/", params={"limit": 50})
+
+
+async def _buscar(cliente, ctx, i):
+    return await cliente.get("/ganado/api/buscar", params={"q": f"{ctx.azar.randrange(10000):04d}"})
+
+
+async def _lista_html(cliente, ctx, i):
+    return await cliente.get("/ganado/lista", params={"limit": 50})
+
+
+async def _detalle_html(cliente, ctx, i):
+    return await cliente.get(f"/ganado/detalle/{ctx.animal()[0]}")
+
+
+async def _editar_html(cliente, ctx, i):
+    return await cliente.get(f"/ganado/editar/{ctx.animal()[0]}")
+
+
+async def _censo(cliente, ctx, i):
+    return await cliente.get("/censo/", params=[("agrupar", "finca"), ("agrupar", "sexo")])
+
+
+async def _crear(cliente, ctx, i):
+    datos = ctx.datos_ganado(f"BENCH-{time.time_ns()}-{i}")
+    respuesta = await cliente.post("/ganado/api/", data=datos)
+    if respuesta.status_code == 200:
+        ctx.creados.append(respuesta.json()["id"])
+    return respuesta
+
+
+async def _actualizar(cliente, ctx, i):
+    id_, identificacion = ctx.animal()
+    return await cliente.put(f"/ganado/{id_}", json=ctx.datos_ganado(identificacion))
+
+
+async def _eliminar(cliente, ctx, i):
+    if not ctx.creados:
+        return None
+    return await cliente.delete(f"/ganado/api/{ctx.creados.pop()}")
+
+
+# Orden de ejecución: las bajas eliminan los animales creados por "crear"
+ESCENARIOS = {
+    "listar": _listar,
+    "listar_filtrado": _listar_filtrado,
+    "listar_fincas": _listar_fincas,
+    "buscar": _buscar,
+    "lista_html": _lista_html,
+    "detalle_html": _detalle_html,
+    "editar_html": _editar_html,
+    "censo": _censo,
+    "crear": _crear,
+    "actualizar": _actualizar,
+    "eliminar": _eliminar,
+}
+
+
+async def medir(cliente, ctx, peticion, total: int, concurrencia: int) -> dict:
+    """Ejecuta `total` peticiones con `concurrencia` trabajadores y resume los tiempos."""
+    latencias, consultas = [], []
+    estados = Counter()
+    pendientes = iter(range(total))
+
+    async def trabajador():
+        for i in pendientes:
+            inicio = time.perf_counter()
+            respuesta = await peticion(cliente, ctx, i)
+            if respuesta is None:
+                continue
+            latencias.append(time.perf_counter() - inicio)
+            estados[respuesta.status_code] += 1
+            if "x-db-queries" in respuesta.headers:
+                consultas.append(int(respuesta.headers["x-db-queries"]))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "peticiones": len(latencias),
+        "errores": sum(n for estado, n in estados.items() if estado >= 400),
+        "estados": {str(estado): n for estado, n in sorted(estados.items())},
+        "duracion_s": round(duracion, 4),
+        "rps": round(len(latencias) / duracion, 2) if duracion else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "max_ms": round(latencias[-1] * 1000, 3) if latencias else 0.0,
+        "consultas_por_peticion": round(sum(consultas) / len(consultas), 2) if consultas else None,
+    }
+
+
+async def ejecutar(args) -> dict:
+    import httpx
+    from sqlalchemy import func, select
+
+    import main
+    import models
+    from database import ReadSessionLocal
+
+    azar = random.Random(args.semilla)
+    async with ReadSessionLocal() as db:
+        total = await db.scalar(select(func.count()).select_from(models.Ganado))
+        muestra = (await db.execute(
+            select(models.Ganado.id, models.Ganado.identificacion)
+            .order_by(func.random()).limit(1000)
+        )).all()
+        finca_ids = (await db.scalars(select(models.Finca.id))).all()
+        tipo_ids = (await db.scalars(select(models.TipoAnimal.id))).all()
+    if not muestra:
+        sys.exit("La base no tiene ganado: genérela con python -m benchmarks.generar")
+    ctx = Contexto([tuple(fila) for fila in muestra], finca_ids, tipo_ids, azar)
+
+    nombres = args.escenarios or list(ESCENARIOS)
+    desconocidos = set(nombres) - set(ESCENARIOS)
+    if desconocidos:
+        sys.exit(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}. Opciones: {', '.join(ESCENARIOS)}")
+
+    resultados = {}
+    transporte = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+            for nombre in [n for n in ESCENARIOS if n in nombres]:
+                peticion = ESCENARIOS[nombre]
+                if nombre not in ("crear", "actualizar", "eliminar"):
+                    for i in range(args.calentamiento):
+                        await peticion(cliente, ctx, i)
+                resultados[nombre] = await medir(cliente, ctx, peticion, args.peticiones, args.concurrencia)
+                r = resultados[nombre]
+                print(
+                    f"{nombre:16s} {r['rps']:9.1f} req/s  p50 {r['p50_ms']:8.2f}  p95 {r['p95_ms']:8.2f}  "
+                    f"p99 {r['p99_ms']:8.2f} ms  consultas {r['consultas_por_peticion']}  errores {r['errores']}",
+                    file=sys.stderr,
+                )
+
+    return {
+        "meta": {
+            "fecha": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "commit": _commit_actual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "db": os.path.basename(args.db),
+            "ganados": total,
+            "fincas": len(finca_ids),
+            "peticiones": args.peticiones,
+            "concurrencia": args.concurrencia,
+            "semilla": args.semilla,
+        },
+        "escenarios": resultados,
+    }
+
+
+def principal(argv=None):
+    args = _argumentos(argv)
+    if not os.path.exists(args.db):
+        sys.exit(f"No existe {args.db}: genérela con python -m benchmarks.generar")
+
+    # Antes de importar la aplicación: base de datos y cabeceras de consultas
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["GANADO_DEBUG"] = "1"
+
+    resultado = asyncio.run(ejecutar(args))
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    principal()
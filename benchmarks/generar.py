@@ -0,0 +1,165 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+# ============================================================
+#         GENERADOR DE UNA BASE SINTÉTICA DE GANADO
+# ============================================================
+#
+# Uso: python -m benchmarks.generar --ganados 1000000 --fincas 200 --fotos 50 \
+#          --salida benchmarks/datos/1m.db
+#
+# La base se crea con los modelos y las migraciones de la aplicación, de modo
+# que tiene el mismo esquema, índices y triggers que una base real. Las fotos
+# (opcionales) se escriben en static/uploads/ nombradas por su hash, como las
+# subidas por la aplicación, y se reparten entre los animales.
+
+TAMANO_LOTE = 10_000
+
+TIPOS = ["Bovino", "Ovino", "Caprino", "Porcino", "Equino", "Bufalino", "Asnal", "Mular"]
+UBICACIONES = ["Antioquia", "Córdoba", "Meta", "Casanare", "Santander", "Cesar", "Huila", "Caquetá"]
+NOMBRES = ["Lucero", "Pinta", "Manchas", "Canela", "Estrella", "Negra", "Mora", "Paloma", "Toro", "Lola"]
+SEXOS = ["Macho", "Hembra"]
+
+
+def _argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Genera una base de datos sintética de ganado.")
+    parser.add_argument("--salida", required=True, help="Archivo SQLite a crear")
+    parser.add_argument("--ganados", type=int, default=10_000)
+    parser.add_argument("--fincas", type=int, default=50)
+    parser.add_argument("--tipos", type=int, default=len(TIPOS))
+    parser.add_argument("--fotos", type=int, default=0, help="Fotos distintas a generar (0 = sin fotos)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--forzar", action="store_true", help="Sobrescribe la base si ya existe")
+    return parser.parse_args(argv)
+
+
+def _generar_fotos(cantidad: int, azar: random.Random) -> list[str]:
+    """Crea `cantidad` imágenes PNG distintas en static/uploads y devuelve sus rutas."""
+    from PIL import Image
+
+    import storage
+
+    rutas = []
+    for _ in range(cantidad):
+        color = tuple(azar.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 480), color).save(buffer, "PNG")
+        datos = buffer.getvalue()
+        ruta = storage.ruta_foto(hashlib.sha256(datos).hexdigest(), ".png")
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        if not os.path.exists(ruta):
+            with open(ruta, "wb") as archivo:
+                archivo.write(datos)
+        rutas.append(ruta.replace(os.sep, "/"))
+    return rutas
+
+
+def _filas_ganado(args, finca_ids, tipo_ids, fotos, azar: random.Random):
+    hoy = date.today()
+    registro = datetime.utcnow()
+    for i in range(args.ganados):
+        nacimiento = hoy - timedelta(days=azar.randrange(15 * 365))
+        yield {
+            "identificacion": f"CO-{i:08d}",
+            "nombre": f"{azar.choice(NOMBRES)} {i}" if azar.random() < 0.8 else None,
+            "fecha_nacimiento": nacimiento,
+            "sexo": azar.choice(SEXOS),
+            "finca_id": azar.choice(finca_ids),
+            "tipo_animal_id": azar.choice(tipo_ids),
+            "fecha_registro": registro,
+            "foto": azar.choice(fotos) if fotos else None,
+        }
+
+
+def generar(args):
+    if os.path.exists(args.salida):
+        if not args.forzar:
+            sys.exit(f"{args.salida} ya existe (use --forzar para sobrescribirla)")
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(args.salida + sufijo):
+                os.remove(args.salida + sufijo)
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+
+    # La configuración se lee al importar database: la URL debe fijarse antes
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.salida)}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    from sqlalchemy import insert
+
+    import censo
+    import eventos
+    import historico
+    import migraciones
+    import models
+    from database import AsyncSessionLocal, cerrar_engines, engine
+
+    migraciones.preparar(engine)
+
+    azar = random.Random(args.semilla)
+    inicio = time.perf_counter()
+    with engine.begin() as conexion:
+        tipos = [TIPOS[i] if i < len(TIPOS) else f"Tipo {i}" for i in range(args.tipos)]
+        tipo_ids = list(conexion.scalars(
+            insert(models.TipoAnimal).returning(models.TipoAnimal.id),
+            [{"nombre": nombre} for nombre in tipos],
+        ))
+        finca_ids = list(conexion.scalars(
+            insert(models.Finca).returning(models.Finca.id),
+            [
+                {
+                    "nombre": f"Finca {i}",
+                    "tamaño": azar.randrange(10, 5000),
+                    "ubicacion": azar.choice(UBICACIONES),
+                }
+                for i in range(args.fincas)
+            ],
+        ))
+
+    fotos = _generar_fotos(args.fotos, azar)
+
+    lote = []
+    insertados = 0
+    for fila in _filas_ganado(args, finca_ids, tipo_ids, fotos, azar):
+        lote.append(fila)
+        if len(lote) >= TAMANO_LOTE:
+            with engine.begin() as conexion:
+                conexion.execute(insert(models.Ganado), lote)
+            insertados += len(lote)
+            lote = []
+            print(f"\r{insertados:,} / {args.ganados:,} animales", end="", file=sys.stderr)
+    if lote:
+        with engine.begin() as conexion:
+            conexion.execute(insert(models.Ganado), lote)
+        insertados += len(lote)
+    print(file=sys.stderr)
+
+    # Alta de cada animal en el registro de eventos (para el histórico del censo)
+    with engine.begin() as conexion:
+        conexion.execute(insert(models.EventoGanado).from_select(
+            list(eventos.COLUMNAS), eventos.seleccion_altas().order_by(models.Ganado.id)
+        ))
+
+    async def _censo():
+        try:
+            async with AsyncSessionLocal() as db:
+                await historico.reconstruir(db)
+                return await censo.reconstruir(db)
+        finally:
+            await cerrar_engines()
+
+    total = asyncio.run(_censo())
+    engine.dispose()
+    print(
+        f"{args.salida}: {len(finca_ids)} fincas, {len(tipo_ids)} tipos, {total:,} animales, "
+        f"{len(fotos)} fotos en {time.perf_counter() - inicio:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    generar(_argumentos())
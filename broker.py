@@ -0,0 +1,96 @@
+import asyncio
+from collections import namedtuple
+
+# ============================================================
+#        CAMBIOS EN TIEMPO REAL (publicación / suscripción)
+# ============================================================
+#
+# Las rutas de escritura publican, DESPUÉS de su commit, un Evento por fila
+# modificada. Cada vista conectada por WebSocket (ver routers/ganado.py) tiene
+# una Suscripcion, opcionalmente limitada a una finca, que acumula eventos:
+#
+#   - coalescencia: varios cambios de la misma fila se guardan como uno solo
+#     (la vista solo necesita el estado final, que se lee al enviar), y el
+#     envío espera VENTANA segundos para agrupar ráfagas en un único mensaje;
+#   - contrapresión: si un cliente lento o una operación masiva acumula más de
+#     MAX_PENDIENTES filas, se descartan y la vista recibe una sola orden de
+#     recargar. La memoria por cliente está acotada y publicar nunca espera.
+#
+# El broker vive en el proceso: con varios workers, cada uno notifica a sus
+# propios clientes (para repartir entre workers haría falta p. ej. Redis).
+
+VENTANA = 0.25
+MAX_PENDIENTES = 200
+
+# entidad: "ganado", "finca" o "tipo_animal"; accion: "creado", "actualizado",
+# "eliminado" o "masivo" (id=None: muchas filas, la vista debe recargar).
+# fincas: fincas afectadas (antes y después del cambio), o None si afecta a todas.
+Evento = namedtuple("Evento", ["entidad", "accion", "id", "fincas"])
+
+# Eventos que no cambian ninguna fila visible de ganado (una finca o tipo
+# nuevos aún no tienen animales; solo se puede eliminar un tipo sin animales)
+SIN_EFECTO = {("finca", "creado"), ("tipo_animal", "creado"), ("tipo_animal", "eliminado")}
+
+
+class Suscripcion:
+    def __init__(self, finca_id: int | None = None, maximo: int = MAX_PENDIENTES):
+        self.finca_id = finca_id
+        self.maximo = maximo
+        self.pendientes = {}        # (entidad, id) -> último Evento
+        self.recargar = False
+        self._aviso = asyncio.Event()
+
+    def acepta(self, evento: Evento) -> bool:
+        return self.finca_id is None or evento.fincas is None or self.finca_id in evento.fincas
+
+    def recibir(self, evento: Evento):
+        if (evento.entidad, evento.accion) in SIN_EFECTO:
+            return
+        if not self.recargar:
+            # Solo las filas de ganado se envían como cambios; el resto
+            # (fincas, tipos, operaciones masivas) obliga a recargar la vista
+            if evento.entidad != "ganado" or evento.id is None:
+                self.recargar = True
+            else:
+                self.pendientes[(evento.entidad, evento.id)] = evento
+                if len(self.pendientes) > self.maximo:
+                    self.recargar = True
+            if self.recargar:
+                self.pendientes.clear()
+        self._aviso.set()
+
+    async def siguiente(self, ventana: float = VENTANA) -> tuple[list[Evento], bool]:
+        """Espera cambios y devuelve (eventos coalescidos, recargar)."""
+        await self._aviso.wait()
+        await asyncio.sleep(ventana)
+        self._aviso.clear()
+        eventos, self.pendientes = list(self.pendientes.values()), {}
+        recargar, self.recargar = self.recargar, False
+        return eventos, recargar
+
+
+class Broker:
+    def __init__(self):
+        self._suscripciones: set[Suscripcion] = set()
+
+    def suscribir(self, finca_id: int | None = None) -> Suscripcion:
+        suscripcion = Suscripcion(finca_id)
+        self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        self._suscripciones.discard(suscripcion)
+
+    def publicar(self, *eventos: Evento):
+        """Entrega los eventos a las suscripciones interesadas (no bloquea)."""
+        for suscripcion in self._suscripciones:
+            for evento in eventos:
+                if suscripcion.acepta(evento):
+                    suscripcion.recibir(evento)
+
+    def __len__(self):
+        return len(self._suscripciones)
+
+
+# Instancia compartida por los routers
+cambios = Broker()
@@ -0,0 +1,92 @@
+from sqlalchemy import Float, column, or_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models, schemas, queries
+
+# ============================================================
+#          BÚSQUEDA DE GANADO (identificación, nombre...)
+# ============================================================
+#
+# En SQLite se consulta la tabla FTS5 ganados_fts (migración 0004): cada
+# término de 3 o más caracteres se busca como fragmento en la identificación,
+# el nombre, la finca y el tipo, y los resultados se ordenan por relevancia
+# (bm25). Un texto de 1 o 2 caracteres no forma trigramas: se busca como
+# prefijo de la identificación con el índice único.
+
+LONGITUD_MINIMA = 3
+
+ganados_fts = table("ganados_fts", column("rowid"), column("rank", Float))
+
+
+def expresion_fts(texto: str) -> str | None:
+    """Convierte el texto del usuario en una expresión MATCH (términos con AND)."""
+    terminos = [t for t in texto.split() if len(t) >= LONGITUD_MINIMA]
+    if not terminos:
+        return None
+    # Entre comillas: los caracteres especiales de FTS5 (-, *, :...) son literales
+    return " ".join('"' + t.replace('"', '""') + '"' for t in terminos)
+
+
+def _consulta_fts(consulta, expresion: str, cursor: str | None, limite: int):
+    rank = ganados_fts.c.rank
+    consulta = (
+        consulta.add_columns(rank)
+        .join(ganados_fts, ganados_fts.c.rowid == models.Ganado.id)
+        .where(column("ganados_fts").op("MATCH")(expresion))
+    )
+    # rank es negativo: cuanto menor, más relevante (orden ascendente)
+    return queries.aplicar_keyset(consulta, rank, models.Ganado.id, cursor, False, limite)
+
+
+def _consulta_prefijo(consulta, texto: str, cursor: str | None, limite: int):
+    identificacion = models.Ganado.identificacion
+    # Rango en lugar de LIKE 'x%': LIKE no usa el índice (no distingue mayúsculas)
+    consulta = consulta.add_columns(identificacion).where(
+        identificacion >= texto, identificacion < texto + "\U0010ffff"
+    )
+    return queries.aplicar_keyset(consulta, identificacion, models.Ganado.id, cursor, False, limite)
+
+
+def _consulta_ilike(consulta, texto: str, cursor: str | None, limite: int):
+    for termino in texto.split():
+        patron = f"%{termino}%"
+        consulta = consulta.where(or_(
+            models.Ganado.identificacion.ilike(patron),
+            models.Ganado.nombre.ilike(patron),
+        ))
+    consulta = consulta.add_columns(models.Ganado.id)
+    return queries.aplicar_keyset(consulta, models.Ganado.id, models.Ganado.id, cursor, False, limite)
+
+
+async def buscar(
+    db: AsyncSession,
+    texto: str,
+    filtros: schemas.FiltroGanado,
+    cursor: str | None,
+    limite: int,
+    *opciones,
+):
+    """
+    Devuelve (ganados, siguiente_cursor) ordenados por relevancia.
+
+    Lanza ValueError si el texto está vacío o el cursor no es válido.
+    """
+    texto = texto.strip()
+    if not texto:
+        raise ValueError("El texto de búsqueda está vacío")
+
+    consulta = queries.filtrar_ganado(select(models.Ganado).options(*opciones), filtros)
+    if db.bind.dialect.name != "sqlite":
+        consulta = _consulta_ilike(consulta, texto, cursor, limite)
+    elif (expresion := expresion_fts(texto)) is not None:
+        consulta = _consulta_fts(consulta, expresion, cursor, limite)
+    else:
+        consulta = _consulta_prefijo(consulta, texto, cursor, limite)
+
+    # Cada fila es (ganado, valor_de_orden): el valor va en el cursor
+    filas = (await db.execute(consulta)).all()
+    siguiente = None
+    if len(filas) > limite:
+        ganado, valor = filas[limite - 1]
+        siguiente = queries.codificar_cursor(valor, ganado.id)
+    return [fila[0] for fila in filas[:limite]], siguiente
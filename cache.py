@@ -0,0 +1,68 @@
+import time
+from collections import namedtuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config, models, versiones
+
+# ============================================================
+#        CACHÉ EN PROCESO DE DATOS DE REFERENCIA (selects)
+# ============================================================
+#
+# Fincas y tipos de animal cambian muy poco pero se leen en cada carga de los
+# formularios de ganado. Cada worker guarda su copia junto con la versión de
+# la tabla (ver versiones.py) y solo recarga cuando:
+#   - la versión en la base de datos cambió (escritura en este u otro worker),
+#   - o pasó el TTL (red de seguridad ante cambios hechos fuera de la app).
+# Comprobar la versión es una lectura por clave primaria, mucho más barata que
+# releer las tablas completas.
+
+TTL = config.CACHE_TTL
+
+# Elemento de un <select>: solo lo que usan las plantillas
+Opcion = namedtuple("Opcion", ["id", "nombre"])
+
+
+async def _cargar_fincas(db: AsyncSession):
+    filas = await db.execute(select(models.Finca.id, models.Finca.nombre).order_by(models.Finca.id))
+    return [Opcion(*fila) for fila in filas.all()]
+
+
+async def _cargar_tipos(db: AsyncSession):
+    filas = await db.execute(select(models.TipoAnimal.id, models.TipoAnimal.nombre).order_by(models.TipoAnimal.id))
+    return [Opcion(*fila) for fila in filas.all()]
+
+
+class CacheReferencias:
+    """Caché por tabla con invalidación por versión y TTL."""
+
+    def __init__(self, cargadores, ttl: float = TTL):
+        self._cargadores = cargadores
+        self._ttl = ttl
+        # tabla -> (datos, version, instante_de_carga)
+        self._entradas = {}
+
+    def invalidar(self, *tablas: str):
+        """Descarta la copia local (tras una escritura en este worker)."""
+        for tabla in tablas or list(self._entradas):
+            self._entradas.pop(tabla, None)
+
+    async def obtener(self, db: AsyncSession, *tablas: str) -> list:
+        """Devuelve los datos de cada tabla pedida, recargando solo las obsoletas."""
+        actuales = await versiones.obtener(db, *tablas)
+        ahora = time.monotonic()
+        resultado = []
+        for tabla in tablas:
+            entrada = self._entradas.get(tabla)
+            if entrada is None or entrada[1] != actuales[tabla] or ahora - entrada[2] > self._ttl:
+                entrada = (await self._cargadores[tabla](db), actuales[tabla], ahora)
+                self._entradas[tabla] = entrada
+            resultado.append(entrada[0])
+        return resultado
+
+
+referencias = CacheReferencias({
+    "fincas": _cargar_fincas,
+    "tipos_animales": _cargar_tipos,
+})
@@ -0,0 +1,146 @@
+import asyncio
+from collections import Counter
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import edades, models
+from database import insert_dialecto
+
+# ============================================================
+#            CENSO (CONTEO) DE GANADO POR GRUPOS
+# ============================================================
+#
+# La tabla conteos_ganado guarda cuántas cabezas hay por (finca, tipo, sexo).
+# Las rutas de escritura de ganado llaman a `ajustar` ANTES de su commit, así
+# el contador y el animal se confirman (o se revierten) juntos.
+
+AGRUPACIONES = ("finca", "tipo", "sexo", "edad")
+
+
+async def ajustar(db: AsyncSession, cambios):
+    """
+    Suma `delta` al contador de cada grupo.
+
+    `cambios` es un iterable de tuplas (finca_id, tipo_animal_id, sexo, delta);
+    los cambios del mismo grupo se agregan en una sola fila del UPSERT. Los
+    grupos que quedan en cero se eliminan.
+    """
+    deltas = Counter()
+    for finca_id, tipo_animal_id, sexo, delta in cambios:
+        deltas[(finca_id, tipo_animal_id, sexo)] += delta
+    filas = [
+        {"finca_id": f, "tipo_animal_id": t, "sexo": s, "cantidad": d}
+        for (f, t, s), d in deltas.items()
+        if d
+    ]
+    if not filas:
+        return
+
+    tabla = models.ConteoGanado.__table__
+    consulta = insert_dialecto(db)(tabla)
+    consulta = consulta.on_conflict_do_update(
+        index_elements=[tabla.c.finca_id, tabla.c.tipo_animal_id, tabla.c.sexo],
+        set_={"cantidad": tabla.c.cantidad + consulta.excluded.cantidad},
+    )
+    await db.execute(consulta, filas)
+    if any(fila["cantidad"] < 0 for fila in filas):
+        # Un grupo vacío no se conserva: su fila impediría borrar la finca o
+        # el tipo (claves foráneas) y el censo ya no lo muestra
+        c = models.ConteoGanado
+        await db.execute(delete(c).where(c.cantidad == 0))
+
+
+def clave(ganado):
+    """Grupo del censo al que pertenece un animal."""
+    return ganado.finca_id, ganado.tipo_animal_id, ganado.sexo
+
+
+async def reconstruir(db: AsyncSession) -> int:
+    """Recalcula todos los contadores desde la tabla de ganado. Devuelve el total."""
+    await db.execute(delete(models.ConteoGanado))
+    await db.execute(
+        insert(models.ConteoGanado).from_select(
+            ["finca_id", "tipo_animal_id", "sexo", "cantidad"],
+            select(
+                models.Ganado.finca_id,
+                models.Ganado.tipo_animal_id,
+                models.Ganado.sexo,
+                func.count(),
+            ).group_by(
+                models.Ganado.finca_id, models.Ganado.tipo_animal_id, models.Ganado.sexo
+            ),
+        )
+    )
+    total = await db.scalar(select(func.coalesce(func.sum(models.ConteoGanado.cantidad), 0)))
+    await db.commit()
+    return total
+
+
+async def inicializar(db: AsyncSession):
+    """Puebla los contadores si la tabla está vacía pero ya hay ganado registrado."""
+    hay_conteos = await db.scalar(select(models.ConteoGanado.finca_id).limit(1))
+    hay_ganado = await db.scalar(select(models.Ganado.id).limit(1))
+    if hay_conteos is None and hay_ganado is not None:
+        await reconstruir(db)
+
+
+async def consultar(db: AsyncSession, agrupar, finca_id=None, tipo_animal_id=None, sexo=None, categoria_edad=None):
+    """
+    Devuelve (total, grupos) sumando los contadores según `agrupar`.
+
+    La edad cambia con el paso del tiempo y no tiene contadores: si se agrupa o
+    filtra por edad se cuenta sobre la tabla de ganado, con rangos de fecha de
+    nacimiento que usan los índices (finca_id, fecha_nacimiento) y fecha_nacimiento.
+    """
+    por_edad = "edad" in agrupar or categoria_edad is not None
+    origen = models.Ganado if por_edad else models.ConteoGanado
+    cantidad = func.count() if por_edad else func.sum(models.ConteoGanado.cantidad)
+
+    columnas = []
+    if "finca" in agrupar:
+        columnas += [origen.finca_id, models.Finca.nombre.label("finca")]
+    if "tipo" in agrupar:
+        columnas += [origen.tipo_animal_id, models.TipoAnimal.nombre.label("tipo_animal")]
+    if "sexo" in agrupar:
+        columnas.append(origen.sexo)
+    if "edad" in agrupar:
+        columnas.append(edades.expresion_categoria(models.Ganado.fecha_nacimiento).label("categoria_edad"))
+
+    consulta = select(*columnas, cantidad.label("cantidad")).select_from(origen)
+    if "finca" in agrupar:
+        consulta = consulta.join(models.Finca, models.Finca.id == origen.finca_id)
+    if "tipo" in agrupar:
+        consulta = consulta.join(models.TipoAnimal, models.TipoAnimal.id == origen.tipo_animal_id)
+    if finca_id is not None:
+        consulta = consulta.where(origen.finca_id == finca_id)
+    if tipo_animal_id is not None:
+        consulta = consulta.where(origen.tipo_animal_id == tipo_animal_id)
+    if sexo:
+        consulta = consulta.where(origen.sexo == sexo)
+    if categoria_edad is not None:
+        minimo, maximo = edades.CATEGORIAS_EDAD[categoria_edad]
+        consulta = edades.filtrar_edad(consulta, models.Ganado.fecha_nacimiento, minimo, maximo)
+    if columnas:
+        consulta = consulta.group_by(*columnas).having(cantidad > 0).order_by(*columnas)
+
+    grupos = [dict(fila._mapping) for fila in (await db.execute(consulta)).all()]
+    if not columnas:
+        # Sin agrupación: una única fila con el total (None si no hay contadores)
+        grupos = [{"cantidad": grupos[0]["cantidad"] or 0}] if grupos else []
+    total = sum(g["cantidad"] for g in grupos)
+    return total, grupos
+
+
+# Uso: python censo.py  (reconcilia los contadores con la tabla de ganado)
+if __name__ == "__main__":
+    from database import AsyncSessionLocal, cerrar_engines
+
+    async def _reconstruir():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await reconstruir(db)
+        finally:
+            await cerrar_engines()
+
+    print(f"Censo reconstruido: {asyncio.run(_reconstruir())} cabezas")
@@ -0,0 +1,84 @@
+from datetime import date, datetime, time, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import versiones
+from database import get_read_db
+
+# ============================================================
+#        PETICIONES CONDICIONALES (ETag / Last-Modified)
+# ============================================================
+#
+# Las respuestas de la API dependen solo de una o varias tablas, cuya versión
+# de cambio ya se mantiene en `versiones`. El ETag se deriva de esas versiones:
+# si el cliente envía el mismo valor en If-None-Match se responde 304 tras una
+# única lectura de la tabla `versiones`, sin consultar los datos ni serializar.
+#
+#     @router.get("/", dependencies=[Depends(condicional.por_version("fincas"))])
+#
+# La dependencia comparte la sesión de lectura con la ruta (get_read_db), así
+# que versión y datos se leen en la misma transacción.
+
+
+def _etag(estado: dict, dia: date | None = None) -> str:
+    partes = [f"{tabla}.{version}" for tabla, (version, _) in estado.items()]
+    if dia is not None:
+        partes.append(dia.strftime("d%Y%m%d"))
+    return '"' + "-".join(partes) + '"'
+
+
+def _ultima_modificacion(estado: dict, dia: date | None = None) -> datetime | None:
+    fechas = [actualizado for _, actualizado in estado.values() if actualizado is not None]
+    if dia is not None:
+        fechas.append(datetime.combine(dia, time.min))
+    if not fechas:
+        return None
+    # `actualizado` se guarda en UTC sin zona horaria; HTTP usa segundos enteros
+    return max(fechas).replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def _coincide(if_none_match: str, etag: str) -> bool:
+    etiquetas = {e.strip() for e in if_none_match.split(",")}
+    # Comparación débil (RFC 9110): W/"x" equivale a "x" para GET condicionales
+    return "*" in etiquetas or etag in etiquetas or f"W/{etag}" in etiquetas
+
+
+def _sin_cambios(request: Request, etag: str, modificado: datetime | None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Si hay If-None-Match, If-Modified-Since se ignora
+        return _coincide(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modificado is not None:
+        try:
+            return modificado <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def por_version(*tablas: str, diaria: bool = False):
+    """
+    Dependencia: ETag/Last-Modified según la versión de `tablas`, o 304.
+
+    Con `diaria=True` la respuesta cambia además cada día (UTC) aunque las
+    tablas no cambien, p. ej. porque incluye la edad de los animales.
+    """
+
+    async def dependencia(request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+        estado = await versiones.estado(db, *tablas)
+        dia = datetime.utcnow().date() if diaria else None
+        etag = _etag(estado, dia)
+        modificado = _ultima_modificacion(estado, dia)
+
+        cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+        if modificado is not None:
+            cabeceras["Last-Modified"] = format_datetime(modificado, usegmt=True)
+
+        if _sin_cambios(request, etag, modificado):
+            raise HTTPException(status_code=304, headers=cabeceras)
+        response.headers.update(cabeceras)
+
+    return dependencia
@@ -0,0 +1,124 @@
+import os
+
+from dotenv import load_dotenv
+
+# ============================================================
+#            CONFIGURACIÓN (variables de entorno / .env)
+# ============================================================
+#
+# Todos los valores pueden definirse como variables de entorno o en un archivo
+# .env en la raíz del proyecto. Migrar a PostgreSQL es cambiar DATABASE_URL.
+
+load_dotenv()
+
+
+def _texto(nombre: str, defecto: str | None = None) -> str | None:
+    valor = os.getenv(nombre)
+    return valor if valor not in (None, "") else defecto
+
+
+def _entero(nombre: str, defecto: int | None) -> int | None:
+    valor = _texto(nombre)
+    return int(valor) if valor is not None else defecto
+
+
+def _booleano(nombre: str, defecto: bool = False) -> bool:
+    valor = _texto(nombre)
+    if valor is None:
+        return defecto
+    return valor.lower() in ("1", "true", "si", "sí", "yes", "on")
+
+
+def url_asincrona(url: str) -> str:
+    """Deduce la URL del driver asíncrono a partir de la URL síncrona."""
+    for sincrono, asincrono in (
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+    ):
+        if url.startswith(sincrono):
+            return asincrono + url[len(sincrono):]
+    return url
+
+
+# ------------------------- Base de datos -------------------------
+
+DATABASE_URL = _texto("DATABASE_URL", "sqlite:///./ganaderia.db")
+ASYNC_DATABASE_URL = _texto("ASYNC_DATABASE_URL", url_asincrona(DATABASE_URL))
+
+# Réplica (o conexión) de solo lectura para las rutas GET. Si no se define:
+# en SQLite se abre un segundo engine sobre el mismo archivo con query_only;
+# en otros motores se usa el engine principal.
+DATABASE_READ_URL = _texto("DATABASE_READ_URL")
+ASYNC_DATABASE_READ_URL = _texto(
+    "ASYNC_DATABASE_READ_URL", url_asincrona(DATABASE_READ_URL) if DATABASE_READ_URL else None
+)
+
+# Pool de conexiones (no aplica a SQLite en memoria)
+DB_POOL_SIZE = _entero("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _entero("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _entero("DB_POOL_TIMEOUT", 30)
+
+# Perfil de almacenamiento de SQLite: PRAGMAs aplicados en cada conexión.
+#   produccion: WAL (lecturas concurrentes con una escritura), synchronous=NORMAL
+#               (seguro con WAL), caché de 64 MB, mmap de 256 MB y espera de 5 s
+#               ante bloqueos en lugar de fallar con "database is locked".
+#   basico:     valores por defecto de SQLite (p. ej. para discos de red,
+#               donde WAL no es compatible).
+PERFILES_SQLITE = {
+    "produccion": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "busy_timeout": 5000,
+    },
+    "basico": {
+        "busy_timeout": 5000,
+    },
+}
+DB_PERFIL = _texto("GANADO_DB_PERFIL", "produccion")
+if DB_PERFIL not in PERFILES_SQLITE:
+    raise ValueError(f"GANADO_DB_PERFIL desconocido: {DB_PERFIL}. Opciones: {', '.join(PERFILES_SQLITE)}")
+
+# Cada PRAGMA puede sobrescribirse individualmente, p. ej. SQLITE_CACHE_SIZE=-128000
+SQLITE_PRAGMAS = {}
+for _pragma in ("journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout"):
+    _valor = _texto(f"SQLITE_{_pragma.upper()}", PERFILES_SQLITE[DB_PERFIL].get(_pragma))
+    if _valor is not None:
+        SQLITE_PRAGMAS[_pragma] = _valor
+
+# ------------------------- Aplicación -------------------------
+
+# Al arrancar, crear las tablas y aplicar las migraciones pendientes. Con 0 solo
+# se verifica el esquema (y la aplicación no arranca si está desactualizado):
+# las migraciones se aplican aparte con `python -m migraciones`.
+AUTO_MIGRAR = _booleano("GANADO_AUTO_MIGRAR", True)
+
+# Modo depuración: añade a cada respuesta el número de consultas y el tiempo en BD
+DEBUG = _booleano("GANADO_DEBUG")
+
+# Métricas en formato Prometheus (GET /metrics): latencias, estados, consultas y pool
+METRICAS = _booleano("GANADO_METRICAS")
+
+# Tamaño máximo de una foto subida (bytes)
+FOTO_MAX_BYTES = _entero("GANADO_FOTO_MAX_BYTES", 10 * 1024 * 1024)
+
+# TTL (segundos) de la caché de fincas y tipos de animal
+CACHE_TTL = float(_texto("GANADO_CACHE_TTL", "300"))
+
+# Cada cuántos segundos incorpora cada worker los eventos de ganado nuevos al
+# histórico diario del censo (0 = no hacerlo en la app, p. ej. si lo hace cron)
+HISTORICO_INTERVALO = float(_texto("GANADO_HISTORICO_INTERVALO", "300"))
+
+# Tamaño máximo (bytes) de un lote de sincronización, ya descomprimido
+SYNC_MAX_BYTES = _entero("GANADO_SYNC_MAX_BYTES", 20 * 1024 * 1024)
+
+# ------------------------- Plantillas -------------------------
+
+# Directorio donde se guarda el código compilado de las plantillas
+PLANTILLAS_CACHE = _texto("GANADO_PLANTILLAS_CACHE", ".cache/plantillas")
+# Volver a leer una plantilla si su archivo cambió (desactivar en producción)
+PLANTILLAS_RECARGA = _booleano("GANADO_PLANTILLAS_RECARGA", True)
+# Fragmentos renderizados en la caché LRU de cada worker (0 = desactivada)
+FRAGMENTOS_MAX = _entero("GANADO_FRAGMENTOS_MAX", 20000)
@@ -1,6 +1,8 @@
-from database import Base, engine
+from database import engine
+import migraciones
 
-# Esto crea todas las tablas según tus modelos actuales
-Base.metadata.create_all(bind=engine)
+# Esto crea todas las tablas según tus modelos actuales y registra (o aplica,
+# en una base existente) las migraciones del esquema
+migraciones.preparar(engine)
 
 print("Base de datos creada correctamente")
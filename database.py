@@ -1,18 +1,195 @@
-from sqlalchemy import create_engine
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 
-DATABASE_URL = "sqlite:///./ganaderia.db"
+import config
+import metrics
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+DATABASE_URL = config.DATABASE_URL
+# Misma base de datos, a través del driver asíncrono (aiosqlite / asyncpg)
+ASYNC_DATABASE_URL = config.ASYNC_DATABASE_URL
+
+# Modo depuración: añade a cada respuesta el número de consultas y el tiempo en BD
+DEBUG = config.DEBUG
+
+# Métricas Prometheus: duración de consultas y espera del pool (ver metrics.py)
+METRICAS = config.METRICAS
+
+logger = logging.getLogger("ganaderia.db")
+
+
+# ============================================================
+#        PERFIL DE ALMACENAMIENTO (PRAGMAs y pool de conexiones)
+# ============================================================
+
+def _es_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _es_memoria(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def _pool_medido(clase):
+    """Subclase de un pool que mide cuánto espera cada checkout por una conexión."""
+
+    class PoolMedido(clase):
+        def _do_get(self):
+            inicio = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                metrics.ESPERA_POOL.observar(time.perf_counter() - inicio, self.nombre_metricas)
+
+        def recreate(self):
+            # dispose() recrea el pool: conservar la etiqueta
+            nuevo = super().recreate()
+            nuevo.nombre_metricas = self.nombre_metricas
+            return nuevo
+
+    PoolMedido.nombre_metricas = "principal"
+    PoolMedido.__name__ = f"{clase.__name__}Medido"
+    return PoolMedido
+
+
+_QueuePoolMedido = _pool_medido(QueuePool)
+_AsyncQueuePoolMedido = _pool_medido(AsyncAdaptedQueuePool)
+
+
+def _opciones_engine(url: str, asincrono=False) -> dict:
+    """Argumentos de create_engine / create_async_engine según el motor."""
+    if _es_sqlite(url):
+        opciones = {"connect_args": {"check_same_thread": False}}
+        if _es_memoria(url):
+            # Una base en memoria solo existe dentro de su conexión: se comparte una
+            opciones["poolclass"] = StaticPool
+            return opciones
+    else:
+        opciones = {"pool_pre_ping": True}
+    opciones.update(
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+    )
+    if METRICAS:
+        opciones["poolclass"] = _AsyncQueuePoolMedido if asincrono else _QueuePoolMedido
+    return opciones
+
+
+def _aplicar_pragmas(engine_, solo_lectura=False):
+    """Ejecuta los PRAGMAs del perfil (y foreign_keys) al abrir cada conexión SQLite."""
+    pragmas = dict(config.SQLITE_PRAGMAS)
+    for pragma, valor in pragmas.items():
+        if not re.fullmatch(r"-?\w+", str(valor)):
+            raise ValueError(f"Valor inválido para PRAGMA {pragma}: {valor!r}")
+
+    @event.listens_for(engine_, "connect")
+    def _al_conectar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, valor in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={valor}")
+            # SQLite no aplica las claves foráneas (ni ON DELETE CASCADE) si no se activan
+            cursor.execute("PRAGMA foreign_keys=ON")
+            if solo_lectura:
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
+
+# Sentencias que abren las transacciones en SQLite. No cuentan como consultas
+# en medir_consultas ni en las métricas
+_BEGIN = "BEGIN"
+_BEGIN_IMMEDIATE = "BEGIN IMMEDIATE"
+_SENTENCIAS_BEGIN = (_BEGIN, _BEGIN_IMMEDIATE)
+
+
+def _transacciones_sqlite(engine_, solo_lectura=False):
+    """
+    Deja que SQLAlchemy emita el BEGIN (receta documentada para pysqlite / aiosqlite).
+
+    El driver solo abre la transacción antes de un INSERT / UPDATE / DELETE: un
+    SAVEPOINT emitido tras solo SELECTs queda fuera de toda transacción y su
+    RELEASE confirma los cambios (p. ej. cada mutación de sincronizacion.aplicar
+    o cada fila del reintento de importacion._insertar_lote). Con el BEGIN
+    explícito la transacción abarca desde la primera consulta hasta el commit.
+
+    Las rutas de escritura leen antes de escribir: con un BEGIN diferido SQLite
+    tendría que promover el bloqueo de lectura a escritura y, si otra escritura
+    está en curso, falla al instante con "database is locked" (sin esperar
+    busy_timeout). Por eso el engine de escritura usa BEGIN IMMEDIATE (toma el
+    bloqueo de escritura al empezar y espera su turno) y solo el de lectura
+    usa el BEGIN diferido.
+    """
+    begin = _BEGIN if solo_lectura else _BEGIN_IMMEDIATE
+
+    @event.listens_for(engine_, "connect")
+    def _sin_transaccion_implicita(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine_, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql(begin)
+
+
+def crear_engine(url: str, asincrono=False, solo_lectura=False, nombre="principal"):
+    """
+    Crea un engine con el pool y, en SQLite, los PRAGMAs del perfil.
+    `nombre` etiqueta sus métricas de pool (GANADO_METRICAS=1).
+    """
+    crear = create_async_engine if asincrono else create_engine
+    engine_ = crear(url, **_opciones_engine(url, asincrono))
+    if _es_sqlite(url):
+        motor = engine_.sync_engine if asincrono else engine_
+        _aplicar_pragmas(motor, solo_lectura)
+        _transacciones_sqlite(motor, solo_lectura)
+    pool = engine_.pool
+    if hasattr(pool, "nombre_metricas"):
+        pool.nombre_metricas = nombre
+    return engine_
+
+
+engine = crear_engine(DATABASE_URL, nombre="sincrono")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Engine asíncrono para las rutas `async def`: las consultas no bloquean el
+# event loop. El engine síncrono se mantiene para scripts (create_db.py, etc.).
+async_engine = crear_engine(ASYNC_DATABASE_URL, asincrono=True, nombre="escritura")
+
+# Engine de solo lectura para las rutas GET: una réplica si se configuró
+# DATABASE_READ_URL; en SQLite, otro pool sobre el mismo archivo con
+# query_only (con WAL las lecturas no esperan a las escrituras).
+if config.ASYNC_DATABASE_READ_URL:
+    async_read_engine = crear_engine(
+        config.ASYNC_DATABASE_READ_URL, asincrono=True, solo_lectura=True, nombre="lectura"
+    )
+elif _es_sqlite(ASYNC_DATABASE_URL) and not _es_memoria(ASYNC_DATABASE_URL):
+    async_read_engine = crear_engine(ASYNC_DATABASE_URL, asincrono=True, solo_lectura=True, nombre="lectura")
+else:
+    async_read_engine = async_engine
+
+# expire_on_commit=False: tras el commit no se recargan atributos de forma
+# implícita (en asyncio eso fallaría fuera de un await).
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+ReadSessionLocal = async_sessionmaker(
+    async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
-# Dependencia para obtener sesión
+
+# Dependencia para obtener sesión (síncrona, para scripts y utilidades)
 def get_db():
     db = SessionLocal()
     try:
@@ -20,3 +197,134 @@ def get_db():
     finally:
         db.close()
 
+
+# Dependencia para obtener sesión asíncrona (usada por los routers)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependencia de solo lectura (rutas GET que no escriben)
+async def get_read_db():
+    async with ReadSessionLocal() as db:
+        yield db
+
+
+async def cerrar_engines():
+    """Cierra los pools asíncronos (al apagar la app o al final de un script)."""
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+
+def insert_dialecto(db):
+    """insert() del dialecto en uso, con soporte de ON CONFLICT (SQLite o PostgreSQL)."""
+    # Importación diferida: el dialecto que no se usa no se carga al arrancar
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+# ============================================================
+#          INSTRUMENTACIÓN DE CONSULTAS (por petición)
+# ============================================================
+
+class EstadisticasConsultas:
+    """Acumula el número de consultas y el tiempo total en BD (segundos)."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo = 0.0
+
+
+_estadisticas: ContextVar[EstadisticasConsultas | None] = ContextVar(
+    "estadisticas_consultas", default=None
+)
+
+
+@contextmanager
+def medir_consultas():
+    """
+    Cuenta las consultas ejecutadas dentro del bloque (mismo contexto).
+
+        with medir_consultas() as stats:
+            db.query(models.Ganado).all()
+        assert stats.consultas == 1
+
+    Con GANADO_DEBUG=1 el middleware de main.py lo aplica a cada petición y
+    devuelve las cabeceras X-DB-Queries y X-DB-Time-Ms; con GANADO_METRICAS=1
+    lo usa el middleware de métricas. Los bloques pueden anidarse: al salir,
+    lo medido se suma también al bloque exterior.
+    """
+    exterior = _estadisticas.get()
+    stats = EstadisticasConsultas()
+    token = _estadisticas.set(stats)
+    try:
+        yield stats
+    finally:
+        _estadisticas.reset(token)
+        if exterior is not None:
+            exterior.consultas += stats.consultas
+            exterior.tiempo += stats.tiempo
+
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    if statement in _SENTENCIAS_BEGIN:
+        return
+    if METRICAS or _estadisticas.get() is not None:
+        conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    if statement in _SENTENCIAS_BEGIN:
+        return
+    stats = _estadisticas.get()
+    if stats is None and not METRICAS:
+        return
+    inicios = conn.info.get("inicio_consulta")
+    duracion = time.perf_counter() - inicios.pop() if inicios else 0.0
+    if METRICAS:
+        metrics.DURACION_CONSULTA.observar(duracion)
+    if stats is not None:
+        stats.tiempo += duracion
+        stats.consultas += 1
+
+
+def _error_en_consulta(contexto):
+    # Una consulta fallida no dispara after_cursor_execute: descartamos su inicio
+    if METRICAS:
+        metrics.ERRORES_CONSULTA.incrementar()
+    if contexto.connection is not None:
+        inicios = contexto.connection.info.get("inicio_consulta")
+        if inicios:
+            inicios.pop()
+
+
+def instrumentar(engine_):
+    """Registra los eventos de conteo de consultas en un engine."""
+    event.listen(engine_, "before_cursor_execute", _antes_de_consulta)
+    event.listen(engine_, "after_cursor_execute", _despues_de_consulta)
+    event.listen(engine_, "handle_error", _error_en_consulta)
+
+
+instrumentar(engine)
+instrumentar(async_engine.sync_engine)
+if async_read_engine is not async_engine:
+    instrumentar(async_read_engine.sync_engine)
+
+
+def _conexiones_en_uso():
+    engines = {"escritura": async_engine, "lectura": async_read_engine, "sincrono": engine}
+    return {
+        (nombre,): engine_.pool.checkedout()
+        for nombre, engine_ in engines.items()
+        if hasattr(engine_.pool, "checkedout")
+    }
+
+
+if METRICAS:
+    metrics.registrar_medidor(
+        "db_pool_checked_out", "Conexiones del pool en uso", _conexiones_en_uso, ("engine",)
+    )
@@ -0,0 +1,77 @@
+import calendar
+from datetime import date, datetime
+
+from sqlalchemy import Integer, case, cast, extract, func
+
+# ============================================================
+#        EDAD DEL GANADO (derivada de fecha_nacimiento)
+# ============================================================
+#
+# La edad no se guarda: se calcula en meses cumplidos a partir de la fecha de
+# nacimiento, en Python (models.Ganado.edad) o en SQL (expresion_edad).
+#
+# Los filtros por edad no evalúan la expresión fila a fila: se traducen a un
+# rango de fechas de nacimiento, que usa los índices sobre fecha_nacimiento.
+#
+#     edad >= m meses   <=>   fecha_nacimiento <= hoy - m meses
+#     edad <  m meses   <=>   fecha_nacimiento >  hoy - m meses
+#
+# "Hoy" es la fecha UTC, igual que CURRENT_DATE en SQLite.
+
+# Categoría -> (edad mínima, edad máxima excluida) en meses
+CATEGORIAS_EDAD = {
+    "ternero": (0, 12),
+    "añojo": (12, 24),
+    "adulto": (24, None),
+}
+
+
+def hoy() -> date:
+    return datetime.utcnow().date()
+
+
+def restar_meses(fecha: date, meses: int) -> date:
+    """`fecha` menos `meses` meses; el día se ajusta al último del mes si no existe."""
+    anio, mes = divmod(fecha.year * 12 + fecha.month - 1 - meses, 12)
+    mes += 1
+    return date(anio, mes, min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+
+def meses_entre(nacimiento: date, fecha: date) -> int:
+    """Meses cumplidos entre `nacimiento` y `fecha`."""
+    meses = (fecha.year - nacimiento.year) * 12 + fecha.month - nacimiento.month
+    return meses - (fecha.day < nacimiento.day)
+
+
+def expresion_edad(columna):
+    """Expresión SQL de la edad en meses cumplidos (SQLite y PostgreSQL)."""
+    actual = func.current_date()
+    meses = (
+        (extract("year", actual) - extract("year", columna)) * 12
+        + extract("month", actual) - extract("month", columna)
+        - case((extract("day", actual) < extract("day", columna), 1), else_=0)
+    )
+    return cast(meses, Integer)
+
+
+def filtrar_edad(consulta, columna, minimo: int | None = None, maximo: int | None = None, fecha: date | None = None):
+    """Edad en [minimo, maximo) meses, como rango sobre la fecha de nacimiento."""
+    fecha = fecha or hoy()
+    if minimo:
+        consulta = consulta.filter(columna <= restar_meses(fecha, minimo))
+    if maximo is not None:
+        consulta = consulta.filter(columna > restar_meses(fecha, maximo))
+    return consulta
+
+
+def expresion_categoria(columna, fecha: date | None = None):
+    """CASE con la categoría de edad de cada animal (NULL sin fecha de nacimiento)."""
+    fecha = fecha or hoy()
+    ramas = [
+        (columna > restar_meses(fecha, maximo), nombre)
+        for nombre, (_, maximo) in CATEGORIAS_EDAD.items()
+        if maximo is not None
+    ]
+    ultima = next(nombre for nombre, (_, maximo) in CATEGORIAS_EDAD.items() if maximo is None)
+    ramas.append((columna.is_not(None), ultima))
+    return case(*ramas, else_=None)
@@ -0,0 +1,117 @@
+from datetime import datetime
+
+from sqlalchemy import and_, case, func, insert, literal, null, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+
+# ============================================================
+#          REGISTRO DE EVENTOS DE GANADO (solo inserción)
+# ============================================================
+#
+# Cada escritura de ganado añade, ANTES de su commit, un evento por animal a
+# eventos_ganado (igual que el censo: el animal y su evento se confirman o se
+# revierten juntos):
+#
+#   alta     grupo nuevo                        (finca, tipo, sexo)
+#   baja     grupo anterior                     (*_anterior)
+#   cambio   grupo nuevo y, si el animal cambió de grupo, el anterior
+#
+# Los eventos no se modifican ni se borran. De ellos se calcula el histórico
+# diario del censo (historico.py) y la sincronización de dispositivos
+# (sincronizacion.py).
+#
+# Orden de confirmación: ambos usan el id del último evento leído como marca
+# ("todo lo anterior ya lo vi"), así que un evento nunca debe hacerse visible
+# con un id menor que otro ya confirmado. En SQLite se cumple sin más (hay un
+# solo escritor a la vez). En PostgreSQL dos transacciones pueden tomar ids y
+# confirmar en distinto orden: antes de insertar eventos cada transacción toma
+# un bloqueo (pg_advisory_xact_lock) que se libera en su commit o rollback, de
+# modo que los ids se asignan en el orden en que se confirman. Las escrituras
+# de ganado registran sus eventos al final, justo antes del commit, y esa
+# última parte queda serializada.
+
+ALTA = "alta"
+BAJA = "baja"
+CAMBIO = "cambio"
+
+COLUMNAS = (
+    "fecha", "accion", "ganado_id", "finca_id", "tipo_animal_id", "sexo",
+    "finca_anterior_id", "tipo_animal_anterior_id", "sexo_anterior",
+)
+GRUPO = ("finca_id", "tipo_animal_id", "sexo")
+
+# Clave del bloqueo consultivo que ordena los eventos en PostgreSQL
+BLOQUEO_ORDEN = 0x6761_6E61  # "gana"
+
+
+def _evento(accion: str, ganado_id: int, grupo=(None, None, None), anterior=(None, None, None)) -> dict:
+    return dict(zip(COLUMNAS, (datetime.utcnow(), accion, ganado_id, *grupo, *anterior)))
+
+
+def _grupo(ganado) -> tuple:
+    return ganado.finca_id, ganado.tipo_animal_id, ganado.sexo
+
+
+def alta(ganado) -> dict:
+    return _evento(ALTA, ganado.id, _grupo(ganado))
+
+
+def baja(ganado) -> dict:
+    return _evento(BAJA, ganado.id, anterior=_grupo(ganado))
+
+
+def cambio(ganado, grupo_anterior: tuple) -> dict:
+    """Cambio de un animal; `grupo_anterior` es (finca, tipo, sexo) antes del cambio."""
+    grupo = _grupo(ganado)
+    return _evento(CAMBIO, ganado.id, grupo, grupo_anterior if grupo_anterior != grupo else (None, None, None))
+
+
+async def _ordenar(db: AsyncSession):
+    """En PostgreSQL, espera a que confirmen las demás transacciones que registran eventos."""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(BLOQUEO_ORDEN)))
+
+
+async def registrar(db: AsyncSession, eventos: list[dict]):
+    if eventos:
+        await _ordenar(db)
+        await db.execute(insert(models.EventoGanado), eventos)
+
+
+# ------------------ Escrituras masivas (INSERT ... SELECT) ------------------
+
+def seleccion_altas():
+    """SELECT de eventos de alta (en su fecha de registro); el llamador añade el WHERE."""
+    g = models.Ganado
+    return select(
+        func.coalesce(g.fecha_registro, datetime.utcnow()), literal(ALTA), g.id,
+        g.finca_id, g.tipo_animal_id, g.sexo, null(), null(), null(),
+    )
+
+
+def seleccion_bajas():
+    """SELECT de eventos de baja de los animales; el llamador añade el WHERE."""
+    g = models.Ganado
+    return select(
+        literal(datetime.utcnow()), literal(BAJA), g.id, null(), null(), null(),
+        g.finca_id, g.tipo_animal_id, g.sexo,
+    )
+
+
+def seleccion_cambios(cambios: dict):
+    """SELECT de eventos de cambio con los valores `cambios`, antes de aplicarlos."""
+    g = models.Ganado
+    nuevos = [literal(cambios[campo]) if campo in cambios else getattr(g, campo) for campo in GRUPO]
+    if any(campo in cambios for campo in GRUPO):
+        mismo_grupo = and_(*(getattr(g, campo) == cambios[campo] for campo in GRUPO if campo in cambios))
+        anteriores = [case((mismo_grupo, null()), else_=getattr(g, campo)) for campo in GRUPO]
+    else:
+        anteriores = [null(), null(), null()]
+    return select(literal(datetime.utcnow()), literal(CAMBIO), g.id, *nuevos, *anteriores)
+
+
+async def registrar_desde(db: AsyncSession, seleccion):
+    """Inserta los eventos que devuelve `seleccion` (ver seleccion_altas / _bajas / _cambios)."""
+    await _ordenar(db)
+    await db.execute(insert(models.EventoGanado).from_select(list(COLUMNAS), seleccion))
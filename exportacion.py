@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+import zlib
+
+from sqlalchemy import select
+
+import models, schemas, queries
+from database import ReadSessionLocal
+
+# ============================================================
+#          EXPORTACIÓN DEL GANADO EN STREAMING (CSV / NDJSON)
+# ============================================================
+#
+# Las filas se leen con un cursor de servidor (yield_per) y se codifican por
+# particiones, de modo que exportar 1M de animales usa memoria constante.
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+TAMANO_PARTICION = 1000
+
+COLUMNAS = (
+    ("id", models.Ganado.id),
+    ("identificacion", models.Ganado.identificacion),
+    ("nombre", models.Ganado.nombre),
+    ("fecha_nacimiento", models.Ganado.fecha_nacimiento),
+    ("edad", models.Ganado.edad),
+    ("sexo", models.Ganado.sexo),
+    ("finca_id", models.Ganado.finca_id),
+    ("finca", models.Finca.nombre),
+    ("tipo_animal_id", models.Ganado.tipo_animal_id),
+    ("tipo_animal", models.TipoAnimal.nombre),
+    ("fecha_registro", models.Ganado.fecha_registro),
+    ("foto", models.Ganado.foto),
+)
+NOMBRES = [nombre for nombre, _ in COLUMNAS]
+
+
+def consulta_exportacion(filtros: schemas.FiltroGanado):
+    consulta = (
+        select(*(columna.label(nombre) for nombre, columna in COLUMNAS))
+        .join(models.Finca, models.Finca.id == models.Ganado.finca_id)
+        .join(models.TipoAnimal, models.TipoAnimal.id == models.Ganado.tipo_animal_id)
+    )
+    return queries.filtrar_ganado(consulta, filtros).order_by(models.Ganado.id)
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return valor
+
+
+def codificar_csv(filas, cabecera=False) -> bytes:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    if cabecera:
+        escritor.writerow(NOMBRES)
+    escritor.writerows(filas)
+    return buffer.getvalue().encode("utf-8")
+
+
+def codificar_ndjson(filas) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(NOMBRES, map(_texto, fila))), ensure_ascii=False) + "\n"
+        for fila in filas
+    ).encode("utf-8")
+
+
+async def generar(formato: str, filtros: schemas.FiltroGanado, comprimir: bool = False):
+    """
+    Generador asíncrono de bytes para StreamingResponse.
+
+    Abre su propia sesión: la respuesta se sigue enviando después de que la
+    función de la ruta haya terminado.
+    """
+    # wbits=31 -> formato gzip (cabecera + CRC), comprimido sobre la marcha
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None
+
+    def salida(datos: bytes) -> bytes:
+        return compresor.compress(datos) if compresor else datos
+
+    if formato == "csv":
+        yield salida(codificar_csv([], cabecera=True))
+
+    async with ReadSessionLocal() as db:
+        resultado = await db.stream(
+            consulta_exportacion(filtros).execution_options(yield_per=TAMANO_PARTICION)
+        )
+        async for particion in resultado.partitions():
+            datos = codificar_csv(particion) if formato == "csv" else codificar_ndjson(particion)
+            bloque = salida(datos)
+            if bloque:
+                yield bloque
+
+    if compresor:
+        yield compresor.flush()
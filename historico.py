@@ -0,0 +1,280 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, delete, func, literal_column, or_, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import cache, models
+from database import insert_dialecto
+
+# ============================================================
+#        HISTÓRICO DIARIO DEL CENSO (resumen incremental)
+# ============================================================
+#
+# censo_diario guarda, por día y grupo (finca, tipo, sexo), cuántas cabezas
+# entraron y salieron. Se calcula desde eventos_ganado (eventos.py) de forma
+# incremental: avance_resumenes recuerda el último evento procesado y cada
+# ejecución de `actualizar` solo lee los eventos posteriores.
+#
+# Las consultas de `serie` leen censo_diario desde el inicio del rango: la
+# tendencia de un año es del orden de cientos de filas, sin recorrer los
+# animales. Las cabezas al inicio del rango salen del censo actual
+# (conteos_ganado) menos lo que cambió después, así que el costo depende de
+# la antigüedad del rango y no de toda la historia.
+#
+# `actualizar` se ejecuta periódicamente en cada worker (GANADO_HISTORICO_INTERVALO)
+# o desde cron con `python historico.py`. Varias ejecuciones simultáneas son
+# seguras: cada lote bloquea primero su fila de avance_resumenes.
+#
+# El avance es el id del último evento procesado: es correcto porque los ids
+# de los eventos se hacen visibles en orden (ver "Orden de confirmación" en
+# eventos.py), así que ningún evento aparece después por debajo del avance.
+
+RESUMEN = "censo_diario"
+
+# Eventos procesados por transacción
+LOTE = 50000
+
+# Rango máximo de una consulta (días)
+MAX_DIAS = 366 * 5
+
+AGRUPACIONES = ("finca", "tipo", "sexo")
+_COLUMNAS_GRUPO = {"finca": "finca_id", "tipo": "tipo_animal_id", "sexo": "sexo"}
+
+logger = logging.getLogger("ganaderia.historico")
+
+
+# ============================================================
+#                  ACTUALIZACIÓN INCREMENTAL
+# ============================================================
+
+_e = models.EventoGanado
+# Entradas: altas y llegadas a un grupo (un cambio sin traslado no cuenta)
+_ENTRADAS = (_e.finca_id.is_not(None), or_(_e.accion == "alta", _e.finca_anterior_id.is_not(None)))
+# Salidas: bajas y traslados desde un grupo
+_SALIDAS = (_e.finca_anterior_id.is_not(None),)
+
+
+async def _movimientos(db: AsyncSession, desde: int, hasta: int) -> dict:
+    """{(fecha, finca, tipo, sexo): [entradas, salidas]} de los eventos (desde, hasta]."""
+    e = _e
+    dia = func.date(e.fecha, type_=Date)
+    rango = (e.id > desde, e.id <= hasta)
+    movimientos = defaultdict(lambda: [0, 0])
+
+    entradas = await db.execute(
+        select(dia, e.finca_id, e.tipo_animal_id, e.sexo, func.count())
+        .where(*rango, *_ENTRADAS)
+        .group_by(dia, e.finca_id, e.tipo_animal_id, e.sexo)
+    )
+    for fecha, finca_id, tipo_animal_id, sexo, cantidad in entradas.all():
+        movimientos[(fecha, finca_id, tipo_animal_id, sexo)][0] += cantidad
+
+    salidas = await db.execute(
+        select(dia, e.finca_anterior_id, e.tipo_animal_anterior_id, e.sexo_anterior, func.count())
+        .where(*rango, *_SALIDAS)
+        .group_by(dia, e.finca_anterior_id, e.tipo_animal_anterior_id, e.sexo_anterior)
+    )
+    for fecha, finca_id, tipo_animal_id, sexo, cantidad in salidas.all():
+        movimientos[(fecha, finca_id, tipo_animal_id, sexo)][1] += cantidad
+    return movimientos
+
+
+async def _procesar_lote(db: AsyncSession) -> int:
+    """Procesa hasta LOTE eventos nuevos en una transacción. Devuelve cuántos ids avanzó."""
+    avance = models.AvanceResumen
+    # Primera escritura: bloquea el avance (en SQLite toma el bloqueo de
+    # escritura; en PostgreSQL, la fila), así dos ejecuciones simultáneas no
+    # procesan los mismos eventos
+    marcado = await db.execute(
+        update(avance).where(avance.nombre == RESUMEN).values(actualizado=datetime.utcnow())
+    )
+    if marcado.rowcount == 0:
+        db.add(avance(nombre=RESUMEN, ultimo_evento_id=0))
+        await db.flush()
+    desde = await db.scalar(select(avance.ultimo_evento_id).where(avance.nombre == RESUMEN))
+    ultimo = await db.scalar(select(func.max(models.EventoGanado.id)))
+    if ultimo is None or ultimo <= desde:
+        await db.commit()
+        return 0
+    hasta = min(ultimo, desde + LOTE)
+
+    filas = [
+        {"fecha": fecha, "finca_id": f, "tipo_animal_id": t, "sexo": s, "entradas": entradas, "salidas": salidas}
+        for (fecha, f, t, s), (entradas, salidas) in (await _movimientos(db, desde, hasta)).items()
+    ]
+    if filas:
+        tabla = models.CensoDiario.__table__
+        consulta = insert_dialecto(db)(tabla)
+        consulta = consulta.on_conflict_do_update(
+            index_elements=[tabla.c.fecha, tabla.c.finca_id, tabla.c.tipo_animal_id, tabla.c.sexo],
+            set_={
+                "entradas": tabla.c.entradas + consulta.excluded.entradas,
+                "salidas": tabla.c.salidas + consulta.excluded.salidas,
+            },
+        )
+        await db.execute(consulta, filas)
+    await db.execute(update(avance).where(avance.nombre == RESUMEN).values(ultimo_evento_id=hasta))
+    await db.commit()
+    return hasta - desde
+
+
+async def actualizar(db: AsyncSession) -> int:
+    """Incorpora al histórico todos los eventos pendientes. Devuelve cuántos ids procesó."""
+    total = 0
+    while procesados := await _procesar_lote(db):
+        total += procesados
+    return total
+
+
+async def reconstruir(db: AsyncSession) -> int:
+    """Recalcula el histórico completo desde el primer evento."""
+    await db.execute(delete(models.CensoDiario))
+    await db.execute(delete(models.AvanceResumen).where(models.AvanceResumen.nombre == RESUMEN))
+    await db.commit()
+    return await actualizar(db)
+
+
+async def programar(sesiones, intervalo: float, detener: asyncio.Event):
+    """
+    Tarea de fondo: actualiza el histórico cada `intervalo` segundos hasta que
+    se active `detener` (al apagar la app, que además la cancela y la espera).
+    """
+    while not detener.is_set():
+        try:
+            async with sesiones() as db:
+                procesados = await actualizar(db)
+            if procesados:
+                logger.info("Histórico del censo: %d eventos procesados", procesados)
+        except Exception:
+            # Durante el apagado la cancelación puede llegar como un error del
+            # driver: no se registra ni se reintenta
+            if detener.is_set():
+                raise
+            logger.exception("No se pudo actualizar el histórico del censo")
+        try:
+            await asyncio.wait_for(detener.wait(), intervalo)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ============================================================
+#                     CONSULTA DE SERIES
+# ============================================================
+
+async def _niveles_iniciales(db: AsyncSession, desde: date, columnas: list, seleccion: dict) -> Counter:
+    """
+    Cabezas por grupo al empezar el día `desde`: el censo actual menos los
+    movimientos desde ese día, ya resumidos en censo_diario o aún pendientes
+    en eventos_ganado. Una sola consulta, así todo sale de la misma instantánea.
+    """
+    g, c, e = models.ConteoGanado, models.CensoDiario, _e
+    avance = select(models.AvanceResumen.ultimo_evento_id).where(models.AvanceResumen.nombre == RESUMEN)
+    pendientes = (
+        e.id > func.coalesce(avance.scalar_subquery(), 0),
+        func.date(e.fecha, type_=Date) >= desde,
+    )
+    partes = union_all(
+        select(g.finca_id, g.tipo_animal_id, g.sexo, g.cantidad.label("cantidad")),
+        select(c.finca_id, c.tipo_animal_id, c.sexo, (c.salidas - c.entradas).label("cantidad"))
+        .where(c.fecha >= desde),
+        select(e.finca_id, e.tipo_animal_id, e.sexo, literal_column("-1").label("cantidad"))
+        .where(*pendientes, *_ENTRADAS),
+        select(e.finca_anterior_id, e.tipo_animal_anterior_id, e.sexo_anterior, literal_column("1").label("cantidad"))
+        .where(*pendientes, *_SALIDAS),
+    ).subquery()
+    claves = [partes.c[columna] for columna in columnas]
+    filas = await db.execute(
+        select(*claves, func.sum(partes.c.cantidad))
+        .where(*(partes.c[columna] == valor for columna, valor in seleccion.items()))
+        .group_by(*claves)
+    )
+    return Counter({tuple(fila[:-1]): fila[-1] or 0 for fila in filas.all()})
+
+
+async def serie(
+    db: AsyncSession, desde: date, hasta: date, agrupar=(),
+    finca_id=None, tipo_animal_id=None, sexo=None,
+) -> tuple[list[dict], datetime | None]:
+    """
+    Cabezas por día en [desde, hasta] para cada grupo de `agrupar`.
+
+    Devuelve (series, actualizado): cada serie trae sus claves de grupo y un
+    punto por día con cantidad (al final del día), entradas y salidas;
+    `actualizado` es la última ejecución de `actualizar` (los eventos
+    posteriores aún no aparecen).
+    """
+    c = models.CensoDiario
+    columnas = [_COLUMNAS_GRUPO[g] for g in AGRUPACIONES if g in agrupar]
+    claves = [getattr(c, columna) for columna in columnas]
+    seleccion = {
+        columna: valor
+        for columna, valor in (("finca_id", finca_id), ("tipo_animal_id", tipo_animal_id), ("sexo", sexo or None))
+        if valor is not None
+    }
+    filtros = [getattr(c, columna) == valor for columna, valor in seleccion.items()]
+
+    niveles = await _niveles_iniciales(db, desde, columnas, seleccion)
+
+    movimientos = defaultdict(dict)
+    dias = await db.execute(
+        select(c.fecha, *claves, func.sum(c.entradas), func.sum(c.salidas))
+        .where(c.fecha >= desde, c.fecha <= hasta, *filtros)
+        .group_by(c.fecha, *claves)
+    )
+    for fecha, *grupo, entradas, salidas in dias.all():
+        movimientos[tuple(grupo)][fecha] = (entradas, salidas)
+
+    # Grupos con cabezas al inicio o con movimientos en el rango
+    grupos = {grupo for grupo, cantidad in niveles.items() if cantidad} | set(movimientos)
+    if not claves:
+        grupos.add(())  # sin agrupar: siempre una serie (en cero si no hay datos)
+    nombres_grupo = [g for g in AGRUPACIONES if g in agrupar]
+    fincas, tipos = await cache.referencias.obtener(db, "fincas", "tipos_animales")
+    nombres = {"finca_id": ("finca", dict(fincas)), "tipo_animal_id": ("tipo_animal", dict(tipos))}
+
+    series = []
+    for grupo in sorted(grupos, key=lambda g: tuple((v is None, v) for v in g)):
+        cantidad = niveles[grupo]
+        puntos = []
+        for i in range((hasta - desde).days + 1):
+            dia = desde + timedelta(days=i)
+            entradas, salidas = movimientos[grupo].get(dia, (0, 0))
+            cantidad += entradas - salidas
+            puntos.append({"fecha": dia, "cantidad": cantidad, "entradas": entradas, "salidas": salidas})
+        serie_grupo = {}
+        for agrupacion, valor in zip(nombres_grupo, grupo):
+            columna = _COLUMNAS_GRUPO[agrupacion]
+            serie_grupo[columna] = valor
+            if columna in nombres:
+                # Una finca eliminada conserva su historia, sin nombre
+                campo, por_id = nombres[columna]
+                serie_grupo[campo] = por_id.get(valor)
+        serie_grupo["puntos"] = puntos
+        series.append(serie_grupo)
+
+    actualizado = await db.scalar(
+        select(models.AvanceResumen.actualizado).where(models.AvanceResumen.nombre == RESUMEN)
+    )
+    return series, actualizado
+
+
+# Uso: python historico.py [--reconstruir]  (p. ej. desde cron)
+if __name__ == "__main__":
+    import sys
+
+    from database import AsyncSessionLocal, cerrar_engines
+
+    async def _ejecutar():
+        try:
+            async with AsyncSessionLocal() as db:
+                if "--reconstruir" in sys.argv[1:]:
+                    return await reconstruir(db)
+                return await actualizar(db)
+        finally:
+            await cerrar_engines()
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"Eventos procesados: {asyncio.run(_ejecutar())}")
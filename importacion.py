@@ -0,0 +1,257 @@
+import codecs
+import csv
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+import models, schemas, censo, eventos, versiones
+
+# ============================================================
+#          IMPORTACIÓN MASIVA DE GANADO (CSV / NDJSON)
+# ============================================================
+#
+# El archivo se lee por lotes (nunca entero en memoria), cada fila se valida
+# con schemas.GanadoCreate y las filas válidas de un lote se insertan con un
+# solo INSERT multi-fila y un solo commit. Las filas inválidas se reportan sin
+# abortar el resto del archivo.
+#
+# Columnas: identificacion, nombre, fecha_nacimiento, sexo y
+#   finca_id    o  finca        (nombre de la finca)
+#   tipo_animal_id  o  tipo_animal  (nombre del tipo)
+
+FORMATOS = ("csv", "ndjson")
+TAMANO_LOTE = 500
+
+
+def detectar_formato(nombre_archivo: str | None, content_type: str | None = None):
+    """Deduce el formato por la extensión o el content-type, o None."""
+    nombre = (nombre_archivo or "").lower()
+    if nombre.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if nombre.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+
+def leer_filas(archivo, formato: str):
+    """
+    Genera (número_de_fila, dict) leyendo un archivo binario línea a línea.
+
+    Las líneas NDJSON mal formadas se devuelven como (número, ValueError).
+    """
+    texto = codecs.getreader("utf-8-sig")(archivo)
+    if formato == "csv":
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            # Número de línea del archivo (la cabecera es la línea 1)
+            yield lector.line_num, fila
+    elif formato == "ndjson":
+        for numero, linea in enumerate(texto, start=1):
+            if not linea.strip():
+                continue
+            try:
+                fila = json.loads(linea)
+                if not isinstance(fila, dict):
+                    raise ValueError("cada línea debe ser un objeto JSON")
+                yield numero, fila
+            except ValueError as e:
+                yield numero, ValueError(f"JSON inválido: {e}")
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+
+def _siguiente_lote(filas, tamano: int):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            break
+    return lote
+
+
+def _mensaje_validacion(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+
+class _Referencias:
+    """Mapas nombre -> id de fincas y tipos, cargados una sola vez por importación."""
+
+    def __init__(self, fincas, tipos):
+        self.finca_ids = {id_ for id_, _ in fincas}
+        self.fincas = {nombre.strip().lower(): id_ for id_, nombre in fincas if nombre}
+        self.tipo_ids = {id_ for id_, _ in tipos}
+        self.tipos = {nombre.strip().lower(): id_ for id_, nombre in tipos if nombre}
+
+    @staticmethod
+    async def _leer(db: AsyncSession):
+        fincas = (await db.execute(select(models.Finca.id, models.Finca.nombre))).all()
+        tipos = (await db.execute(select(models.TipoAnimal.id, models.TipoAnimal.nombre))).all()
+        return fincas, tipos
+
+    @classmethod
+    async def cargar(cls, db: AsyncSession):
+        return cls(*await cls._leer(db))
+
+    async def recargar(self, db: AsyncSession):
+        """Vuelve a leer fincas y tipos (alguno pudo eliminarse durante la importación)."""
+        self.__init__(*await self._leer(db))
+
+    def resolver(self, fila: dict) -> dict:
+        """Sustituye los nombres de finca/tipo por sus ids. Lanza ValueError."""
+        fila = {k: (v.strip() if isinstance(v, str) else v) for k, v in fila.items() if k}
+        for clave in ("nombre", "finca_id", "tipo_animal_id"):
+            if fila.get(clave) == "":
+                fila[clave] = None
+
+        finca = fila.pop("finca", None)
+        if fila.get("finca_id") is None and finca:
+            if finca.lower() not in self.fincas:
+                raise ValueError(f"Finca '{finca}' no existe")
+            fila["finca_id"] = self.fincas[finca.lower()]
+
+        tipo = fila.pop("tipo_animal", None)
+        if fila.get("tipo_animal_id") is None and tipo:
+            if tipo.lower() not in self.tipos:
+                raise ValueError(f"Tipo de animal '{tipo}' no existe")
+            fila["tipo_animal_id"] = self.tipos[tipo.lower()]
+        return fila
+
+    def validar_ids(self, finca_id: int, tipo_animal_id: int):
+        if finca_id not in self.finca_ids:
+            raise ValueError(f"Finca con id {finca_id} no existe")
+        if tipo_animal_id not in self.tipo_ids:
+            raise ValueError(f"Tipo de animal con id {tipo_animal_id} no existe")
+
+
+# INSERT por lotes que devuelve lo necesario para registrar el alta de cada animal
+_INSERTAR_GANADO = insert(models.Ganado).returning(
+    models.Ganado.id, models.Ganado.finca_id, models.Ganado.tipo_animal_id, models.Ganado.sexo
+)
+
+
+def _grupo(datos: dict):
+    return datos["finca_id"], datos["tipo_animal_id"], datos["sexo"]
+
+
+_IDENTIFICACION_EN_USO = "La identificación ya está en uso por otro animal."
+
+
+def _mensaje_integridad(error: IntegrityError) -> str:
+    """Mensaje de una fila rechazada por la base: clave foránea o identificación única."""
+    # SQLite: "FOREIGN KEY constraint failed"; PostgreSQL: "violates foreign key constraint"
+    if "foreign key" in str(error.orig).lower():
+        return "La finca o el tipo de animal ya no existe."
+    return _IDENTIFICACION_EN_USO
+
+
+async def _insertar_lote(db: AsyncSession, validas: list, resultado: schemas.ResultadoImportacion,
+                         referencias: _Referencias):
+    """Inserta un lote en una transacción; si falla, reintenta fila a fila."""
+    if not validas:
+        return
+    try:
+        insertados = await db.execute(_INSERTAR_GANADO, [datos for _, datos in validas])
+        await censo.ajustar(db, [(*_grupo(datos), 1) for _, datos in validas])
+        await eventos.registrar(db, [eventos.alta(fila) for fila in insertados.all()])
+        await versiones.incrementar(db, "ganados")
+        await db.commit()
+        resultado.insertadas += len(validas)
+        return
+    except IntegrityError:
+        await db.rollback()
+
+    # Un conflicto concurrente invalidó el lote: una identificación registrada
+    # entretanto, o una finca / tipo eliminado después de cargar las referencias.
+    # Se vuelven a validar las claves foráneas y se aísla cada fila en un SAVEPOINT
+    await referencias.recargar(db)
+    for numero, datos in validas:
+        try:
+            referencias.validar_ids(datos["finca_id"], datos["tipo_animal_id"])
+        except ValueError as e:
+            resultado.errores.append(schemas.ErrorImportacion(
+                fila=numero, identificacion=datos["identificacion"], error=str(e)
+            ))
+            continue
+        try:
+            async with db.begin_nested():
+                insertado = (await db.execute(_INSERTAR_GANADO, [datos])).one()
+                await censo.ajustar(db, [(*_grupo(datos), 1)])
+                await eventos.registrar(db, [eventos.alta(insertado)])
+            resultado.insertadas += 1
+        except IntegrityError as e:
+            resultado.errores.append(schemas.ErrorImportacion(
+                fila=numero,
+                identificacion=datos["identificacion"],
+                error=_mensaje_integridad(e),
+            ))
+    await versiones.incrementar(db, "ganados")
+    await db.commit()
+
+
+async def importar(db: AsyncSession, archivo, formato: str, tamano_lote: int = TAMANO_LOTE) -> schemas.ResultadoImportacion:
+    """Importa un archivo binario (CSV o NDJSON) y devuelve el informe por fila."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}. Opciones: {', '.join(FORMATOS)}")
+
+    resultado = schemas.ResultadoImportacion()
+    referencias = await _Referencias.cargar(db)
+    vistas = set()
+    filas = leer_filas(archivo, formato)
+
+    while True:
+        # La lectura y el parseo del archivo se hacen fuera del event loop
+        lote = await run_in_threadpool(_siguiente_lote, filas, tamano_lote)
+        if not lote:
+            break
+
+        candidatas = []
+        for numero, fila in lote:
+            resultado.filas += 1
+            identificacion = fila.get("identificacion") if isinstance(fila, dict) else None
+            try:
+                if isinstance(fila, Exception):
+                    raise fila
+                ganado = schemas.GanadoCreate(**referencias.resolver(fila))
+                referencias.validar_ids(ganado.finca_id, ganado.tipo_animal_id)
+                if ganado.identificacion in vistas:
+                    raise ValueError("Identificación repetida dentro del archivo")
+            except ValidationError as e:
+                resultado.errores.append(schemas.ErrorImportacion(
+                    fila=numero, identificacion=identificacion, error=_mensaje_validacion(e)
+                ))
+                continue
+            except ValueError as e:
+                resultado.errores.append(schemas.ErrorImportacion(
+                    fila=numero, identificacion=identificacion, error=str(e)
+                ))
+                continue
+            vistas.add(ganado.identificacion)
+            candidatas.append((numero, ganado.model_dump()))
+
+        # Una sola consulta por lote para detectar identificaciones ya registradas
+        existentes = set((await db.scalars(
+            select(models.Ganado.identificacion).where(
+                models.Ganado.identificacion.in_([d["identificacion"] for _, d in candidatas])
+            )
+        )).all()) if candidatas else set()
+
+        validas = []
+        for numero, datos in candidatas:
+            if datos["identificacion"] in existentes:
+                resultado.errores.append(schemas.ErrorImportacion(
+                    fila=numero,
+                    identificacion=datos["identificacion"],
+                    error=_IDENTIFICACION_EN_USO,
+                ))
+            else:
+                validas.append((numero, datos))
+
+        await _insertar_lote(db, validas, resultado, referencias)
+
+    return resultado
@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+
+from database import AsyncSessionLocal, cerrar_engines
+import importacion
+
+# Importa ganado desde un archivo CSV o NDJSON.
+# Uso: python importar_ganado.py ganado.csv [--formato csv|ndjson] [--lote 500]
+
+
+async def main(ruta, formato, tamano_lote):
+    try:
+        async with AsyncSessionLocal() as db:
+            with open(ruta, "rb") as archivo:
+                return await importacion.importar(db, archivo, formato, tamano_lote)
+    finally:
+        # Cierra las conexiones de aiosqlite para que el proceso pueda terminar
+        await cerrar_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importación masiva de ganado")
+    parser.add_argument("archivo")
+    parser.add_argument("--formato", choices=importacion.FORMATOS)
+    parser.add_argument("--lote", type=int, default=importacion.TAMANO_LOTE)
+    args = parser.parse_args()
+
+    formato = args.formato or importacion.detectar_formato(args.archivo)
+    if formato is None:
+        parser.error("no se pudo deducir el formato; use --formato")
+
+    resultado = asyncio.run(main(args.archivo, formato, args.lote))
+    for error in resultado.errores:
+        print(f"Fila {error.fila} ({error.identificacion or '-'}): {error.error}")
+    print(f"Filas: {resultado.filas}, insertadas: {resultado.insertadas}, con error: {len(resultado.errores)}")
@@ -1,67 +1,157 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from fastapi import Request
-
-from database import Base, engine
-import models
+from starlette.concurrency import run_in_threadpool
+
+import assets
+import config
+from database import engine, AsyncSessionLocal, logger, medir_consultas, cerrar_engines
+import metrics
+import migraciones
+import censo
+import historico
+import storage
+import thumbnails
+import templating
+from templating import templates
 
 # Routers
 from routers import finca
 from routers import ganado
 from routers import tipo_animal
-from fastapi.staticfiles import StaticFiles
-
-
-# Crear tablas en la base de datos
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="Sistema de Gestión de Ganado",
-    description="API para administrar fincas, ganado y tipos de ganado",
-    version="1.0.0"
-)
-
-
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-#---Templates---
-templates = Jinja2Templates(directory="templates")
-
-#---Statics---
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-
+from routers import censo as censo_router
+from routers import sync
 
 # ============================================================
-#                      CORS (opcional)
+#                 ARRANQUE (fábrica + lifespan)
 # ============================================================
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],      # En producción debes especificar dominio
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+#
+# Importar este módulo no toca la base de datos ni el disco: solo construye
+# la aplicación. El trabajo de arranque (esquema, censo, plantillas) se hace
+# en el lifespan, una vez por worker y antes de aceptar peticiones.
+#
+#   uvicorn main:app                      (instancia por defecto)
+#   uvicorn main:crear_app --factory      (una aplicación nueva por worker)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Esquema: crear y migrar (GANADO_AUTO_MIGRAR=1) o solo verificar
+    if config.AUTO_MIGRAR:
+        await run_in_threadpool(migraciones.preparar, engine)
+    else:
+        await run_in_threadpool(migraciones.verificar, engine)
+    # Poblar los contadores del censo en bases de datos ya existentes
+    async with AsyncSessionLocal() as db:
+        await censo.inicializar(db)
+    # Compilar las plantillas antes de la primera petición
+    templating.precompilar()
+    # Histórico diario del censo: incorporar los eventos nuevos periódicamente
+    resumen = None
+    detener_resumen = asyncio.Event()
+    if config.HISTORICO_INTERVALO > 0:
+        resumen = asyncio.create_task(
+            historico.programar(AsyncSessionLocal, config.HISTORICO_INTERVALO, detener_resumen)
+        )
+    yield
+    # Apagado: detener el histórico y el pool de procesos de miniaturas, y cerrar
+    # conexiones. La tarea se espera antes de cerrar el pool que está usando.
+    if resumen is not None:
+        detener_resumen.set()
+        resumen.cancel()
+        with suppress(asyncio.CancelledError):
+            await resumen
+    thumbnails.cerrar_pool()
+    await cerrar_engines()
+
+
+def crear_app() -> FastAPI:
+    app = FastAPI(
+        title="Sistema de Gestión de Ganado",
+        description="API para administrar fincas, ganado y tipos de ganado",
+        version="1.0.0",
+        lifespan=lifespan
+    )
 
-# ============================================================
-#                    RUTAS (Routers)
-# ============================================================
-app.include_router(finca.router)
-app.include_router(ganado.router)
-app.include_router(tipo_animal.router)
+    # ============================================================
+    #                      ARCHIVOS ESTÁTICOS
+    # ============================================================
+    # Fotos (nombradas por hash), sus derivados y los recursos con huella de
+    # `python assets.py`: caché de larga duración. Deben montarse antes que
+    # /static para que tengan prioridad.
+    app.mount("/static/uploads", storage.StaticFilesInmutables(directory=storage.DIRECTORIO_FOTOS, check_dir=False), name="uploads")
+    app.mount("/static/derivados", storage.StaticFilesInmutables(directory=thumbnails.DIRECTORIO_DERIVADOS, check_dir=False), name="derivados")
+    app.mount("/static/dist", assets.StaticFilesPrecomprimidos(directory=assets.DIRECTORIO_DIST, check_dir=False), name="dist")
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+
+    # ============================================================
+    #                      CORS (opcional)
+    # ============================================================
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],      # En producción debes especificar dominio
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
+    # ============================================================
+    #         DEPURACIÓN: consultas y tiempo de BD por petición
+    # ============================================================
+    if config.DEBUG:
+        app.middleware("http")(contar_consultas)
+
+    # ============================================================
+    #          MÉTRICAS PROMETHEUS (GANADO_METRICAS=1)
+    # ============================================================
+    if config.METRICAS:
+        # Se añade el último para ser el más externo: mide también CORS y depuración
+        app.add_middleware(metrics.MiddlewareMetricas, medir_consultas=medir_consultas)
+        app.get("/metrics", include_in_schema=False)(exponer_metricas)
+
+    # ============================================================
+    #                    RUTAS (Routers)
+    # ============================================================
+    app.include_router(finca.router)
+    app.include_router(ganado.router)
+    app.include_router(tipo_animal.router)
+    app.include_router(censo_router.router)
+    app.include_router(sync.router)
+
+    app.get("/")(home)
+    return app
+
+
+async def contar_consultas(request: Request, call_next):
+    with medir_consultas() as stats:
+        response = await call_next(request)
+    response.headers["X-DB-Queries"] = str(stats.consultas)
+    response.headers["X-DB-Time-Ms"] = f"{stats.tiempo * 1000:.2f}"
+    logger.info(
+        "%s %s -> %d consultas, %.2f ms en BD",
+        request.method, request.url.path, stats.consultas, stats.tiempo * 1000
+    )
+    return response
+
+
+def exponer_metricas():
+    return PlainTextResponse(
+        metrics.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 # ============================================================
 #                        RUTA RAÍZ
 # ============================================================
 
-@app.get("/")
 def home(request: Request):
     return templates.TemplateResponse(
         "index.html",
         {"request": request, "mensaje": "Sistema funcionando"}
     )
+
+
+app = crear_app()
@@ -0,0 +1,181 @@
+import bisect
+import threading
+import time
+
+# ============================================================
+#          MÉTRICAS EN FORMATO PROMETHEUS (opcionales)
+# ============================================================
+#
+# Se activan con GANADO_METRICAS=1 (ver config.py). Entonces:
+#   - main.py añade MiddlewareMetricas y la ruta GET /metrics,
+#   - database.py registra la duración de cada consulta y la espera al pedir
+#     una conexión al pool.
+#
+# Implementación mínima en proceso, sin dependencias: contadores e
+# histogramas con buckets fijos protegidos por un lock. Con varios workers de
+# uvicorn cada proceso tiene sus propias métricas (Prometheus las distingue
+# por instancia al hacer scrape de cada worker).
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BUCKETS_CONTEO = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BUCKETS_BYTES = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 5 * 1024 ** 2, 10 * 1024 ** 2, 50 * 1024 ** 2)
+
+_lock = threading.Lock()
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres, valores) -> str:
+    if not nombres:
+        return ""
+    return "{" + ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)) + "}"
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas=()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self._valores = {}
+
+    def incrementar(self, *valores, cantidad=1):
+        with _lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def exponer(self):
+        yield f"# HELP {self.nombre} {self.ayuda}"
+        yield f"# TYPE {self.nombre} counter"
+        for valores, total in sorted(self._valores.items()):
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {total}"
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, buckets, etiquetas=()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        # valores de etiquetas -> [conteos por bucket (+Inf al final), suma]
+        self._series = {}
+
+    def observar(self, valor: float, *valores):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with _lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def exponer(self):
+        yield f"# HELP {self.nombre} {self.ayuda}"
+        yield f"# TYPE {self.nombre} histogram"
+        for valores, (conteos, suma) in sorted(self._series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                le = "+Inf" if limite == float("inf") else repr(float(limite))
+                yield f"{self.nombre}_bucket{_etiquetas(self.etiquetas + ('le',), valores + (le,))} {acumulado}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {suma}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {acumulado}"
+
+
+class Medidor:
+    """
+    Valor instantáneo calculado al exponer (p. ej. conexiones en uso).
+    `funcion` devuelve {valores de etiquetas: valor}.
+    """
+
+    def __init__(self, nombre: str, ayuda: str, funcion, etiquetas=()):
+        self.nombre, self.ayuda, self.funcion = nombre, ayuda, funcion
+        self.etiquetas = tuple(etiquetas)
+
+    def exponer(self):
+        yield f"# HELP {self.nombre} {self.ayuda}"
+        yield f"# TYPE {self.nombre} gauge"
+        for valores, valor in sorted(self.funcion().items()):
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {valor}"
+
+
+# ------------------------- Métricas -------------------------
+
+PETICIONES = Contador(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+)
+LATENCIA = Histograma(
+    "http_request_duration_seconds", "Duración de las peticiones HTTP", BUCKETS_LATENCIA, ("method", "route")
+)
+TAMANO_PETICION = Histograma(
+    "http_request_size_bytes", "Tamaño del cuerpo recibido (subidas de fotos, importaciones)",
+    BUCKETS_BYTES, ("method", "route")
+)
+CONSULTAS_POR_PETICION = Histograma(
+    "db_queries_per_request", "Consultas SQL por petición HTTP", BUCKETS_CONTEO, ("route",)
+)
+DURACION_CONSULTA = Histograma(
+    "db_query_duration_seconds", "Duración de cada consulta SQL", BUCKETS_CONSULTA
+)
+ERRORES_CONSULTA = Contador("db_query_errors_total", "Consultas SQL fallidas")
+ESPERA_POOL = Histograma(
+    "db_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool",
+    BUCKETS_CONSULTA, ("engine",)
+)
+
+METRICAS = [
+    PETICIONES, LATENCIA, TAMANO_PETICION, CONSULTAS_POR_PETICION,
+    DURACION_CONSULTA, ERRORES_CONSULTA, ESPERA_POOL,
+]
+
+
+def registrar_medidor(nombre: str, ayuda: str, funcion, etiquetas=()):
+    METRICAS.append(Medidor(nombre, ayuda, funcion, etiquetas))
+
+
+def exponer() -> str:
+    """Todas las métricas en formato de texto de Prometheus (versión 0.0.4)."""
+    lineas = []
+    for metrica in METRICAS:
+        lineas.extend(metrica.exponer())
+    return "\n".join(lineas) + "\n"
+
+
+# ------------------------- Middleware -------------------------
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware, para no añadir una tarea ni
+    copiar el cuerpo de la respuesta por petición).
+
+    La ruta se etiqueta con su plantilla (/ganado/api/{ganado_id}) y no con la
+    URL real, para que el número de series no crezca con los ids.
+    """
+
+    def __init__(self, app, medir_consultas):
+        self.app = app
+        self.medir_consultas = medir_consultas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado = [500]
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            with self.medir_consultas() as stats:
+                await self.app(scope, receive, enviar)
+        finally:
+            ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+            metodo = scope["method"]
+            PETICIONES.incrementar(metodo, ruta, estado[0])
+            LATENCIA.observar(time.perf_counter() - inicio, metodo, ruta)
+            CONSULTAS_POR_PETICION.observar(stats.consultas, ruta)
+            for nombre, valor in scope["headers"]:
+                if nombre == b"content-length":
+                    TAMANO_PETICION.observar(int(valor), metodo, ruta)
+                    break
@@ -0,0 +1,120 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, inspect, select
+
+from migraciones import (
+    m0001_cascada_fincas,
+    m0002_indices_claves_foraneas,
+    m0003_indice_grupo_ganado,
+    m0004_busqueda_ganado,
+    m0005_version_ganado,
+    m0006_edad_derivada,
+    m0007_eventos_ganado,
+    m0008_sync_claves,
+)
+
+# ============================================================
+#            MIGRACIONES VERSIONADAS DEL ESQUEMA
+# ============================================================
+#
+# create_all solo crea las tablas que faltan: nunca altera una tabla ya
+# existente. Cada migración es un módulo mNNNN_<nombre>.py con:
+#   VERSION           número correlativo (no se reutiliza ni se reordena)
+#   DESCRIPCION       texto corto
+#   aplicar(engine)   aplica el cambio; debe tolerar una base creada con los
+#                     modelos actuales, que ya lo tiene
+#
+# La tabla schema_migraciones registra las versiones aplicadas; cada
+# migración se ejecuta una sola vez por base de datos.
+#
+# La aplicación no modifica el esquema al importarse: en su lifespan llama a
+# preparar() (GANADO_AUTO_MIGRAR=1, por defecto) o solo a verificar(), que
+# falla si faltan tablas o migraciones, sin escribir nada.
+#
+# Uso: python -m migraciones           (aplica las pendientes)
+#      python -m migraciones --estado  (muestra aplicadas y pendientes)
+
+MIGRACIONES = [
+    m0001_cascada_fincas,
+    m0002_indices_claves_foraneas,
+    m0003_indice_grupo_ganado,
+    m0004_busqueda_ganado,
+    m0005_version_ganado,
+    m0006_edad_derivada,
+    m0007_eventos_ganado,
+    m0008_sync_claves,
+]
+
+logger = logging.getLogger("ganaderia.migraciones")
+
+# Metadatos propios: la tabla de control no forma parte de los modelos
+_metadata = MetaData()
+schema_migraciones = Table(
+    "schema_migraciones",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String(200), nullable=False),
+    Column("aplicada", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+def versiones_aplicadas(engine_) -> set[int]:
+    _metadata.create_all(bind=engine_)
+    with engine_.connect() as conexion:
+        return set(conexion.scalars(select(schema_migraciones.c.version)).all())
+
+
+def pendientes(engine_) -> list:
+    aplicadas = versiones_aplicadas(engine_)
+    return [m for m in MIGRACIONES if m.VERSION not in aplicadas]
+
+
+def aplicar_pendientes(engine_) -> list[str]:
+    """Aplica, en orden, las migraciones pendientes. Devuelve sus descripciones."""
+    aplicadas = []
+    for migracion in pendientes(engine_):
+        logger.info("Aplicando migración %04d: %s", migracion.VERSION, migracion.DESCRIPCION)
+        migracion.aplicar(engine_)
+        with engine_.begin() as conexion:
+            conexion.execute(insert(schema_migraciones).values(
+                version=migracion.VERSION, descripcion=migracion.DESCRIPCION
+            ))
+        aplicadas.append(migracion.DESCRIPCION)
+    return aplicadas
+
+
+class EsquemaDesactualizado(RuntimeError):
+    pass
+
+
+def preparar(engine_) -> list[str]:
+    """Crea las tablas que faltan y aplica las migraciones pendientes."""
+    from database import Base
+    import models  # noqa: F401  (registra las tablas en Base.metadata)
+
+    Base.metadata.create_all(bind=engine_)
+    return aplicar_pendientes(engine_)
+
+
+def verificar(engine_):
+    """Comprueba, sin modificar la base, que el esquema está al día."""
+    from database import Base
+    import models  # noqa: F401
+
+    tablas = set(inspect(engine_).get_table_names())
+    faltantes = sorted(set(Base.metadata.tables) - tablas)
+    aplicadas = set()
+    if schema_migraciones.name in tablas:
+        with engine_.connect() as conexion:
+            aplicadas = set(conexion.scalars(select(schema_migraciones.c.version)).all())
+    sin_aplicar = [m.VERSION for m in MIGRACIONES if m.VERSION not in aplicadas]
+    if faltantes or sin_aplicar:
+        detalle = []
+        if faltantes:
+            detalle.append(f"tablas faltantes: {', '.join(faltantes)}")
+        if sin_aplicar:
+            detalle.append(f"migraciones pendientes: {', '.join(f'{v:04d}' for v in sin_aplicar)}")
+        raise EsquemaDesactualizado(
+            f"Esquema desactualizado ({'; '.join(detalle)}). Ejecute: python -m migraciones"
+        )
@@ -0,0 +1,20 @@
+import logging
+import sys
+
+from database import engine
+from migraciones import MIGRACIONES, preparar, versiones_aplicadas
+
+# Uso: python -m migraciones [--estado]
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if "--estado" in sys.argv[1:]:
+        aplicadas = versiones_aplicadas(engine)
+        for migracion in MIGRACIONES:
+            estado = "aplicada " if migracion.VERSION in aplicadas else "pendiente"
+            print(f"{migracion.VERSION:04d}  {estado}  {migracion.DESCRIPCION}")
+        sys.exit(0)
+
+    aplicadas = preparar(engine)
+    print(f"Migraciones aplicadas: {len(aplicadas)}")
+    for descripcion in aplicadas:
+        print(f"  - {descripcion}")
@@ -0,0 +1,132 @@
+from sqlalchemy import inspect
+
+# ============================================================
+#   0001 - ON DELETE CASCADE en las claves foráneas a fincas
+# ============================================================
+#
+# Bases creadas antes de este cambio tienen ganados.finca_id y
+# conteos_ganado.finca_id sin ON DELETE CASCADE. SQLite no permite alterar
+# una clave foránea: la tabla se reconstruye siguiendo el procedimiento de la
+# documentación (crear tabla nueva, copiar, borrar la vieja y renombrar).
+#
+# El DDL está congelado aquí a propósito: la migración debe producir siempre el
+# mismo esquema aunque los modelos cambien después.
+
+VERSION = 1
+DESCRIPCION = "ON DELETE CASCADE en ganados.finca_id y conteos_ganado.finca_id"
+
+TABLAS = {
+    "ganados": """
+        CREATE TABLE {tabla} (
+            id INTEGER NOT NULL,
+            identificacion VARCHAR NOT NULL,
+            nombre VARCHAR(100),
+            edad INTEGER NOT NULL,
+            sexo VARCHAR(10) NOT NULL,
+            fecha_nacimiento DATE,
+            finca_id INTEGER NOT NULL,
+            tipo_animal_id INTEGER NOT NULL,
+            fecha_registro DATETIME,
+            foto VARCHAR,
+            PRIMARY KEY (id),
+            FOREIGN KEY(finca_id) REFERENCES fincas (id) ON DELETE CASCADE,
+            FOREIGN KEY(tipo_animal_id) REFERENCES tipos_animales (id)
+        )
+        """,
+    "conteos_ganado": """
+        CREATE TABLE {tabla} (
+            finca_id INTEGER NOT NULL,
+            tipo_animal_id INTEGER NOT NULL,
+            sexo VARCHAR(10) NOT NULL,
+            cantidad INTEGER NOT NULL,
+            PRIMARY KEY (finca_id, tipo_animal_id, sexo),
+            FOREIGN KEY(finca_id) REFERENCES fincas (id) ON DELETE CASCADE,
+            FOREIGN KEY(tipo_animal_id) REFERENCES tipos_animales (id)
+        )
+        """,
+}
+
+
+def _sin_cascada(conexion) -> list[tuple[str, dict]]:
+    """Claves foráneas finca_id -> fincas.id que aún no tienen ON DELETE CASCADE."""
+    inspector = inspect(conexion)
+    pendientes = []
+    for tabla in TABLAS:
+        if not inspector.has_table(tabla):
+            continue
+        for fk in inspector.get_foreign_keys(tabla):
+            if (
+                fk["referred_table"] == "fincas"
+                and fk["constrained_columns"] == ["finca_id"]
+                and (fk.get("options") or {}).get("ondelete", "").upper() != "CASCADE"
+            ):
+                pendientes.append((tabla, fk))
+    return pendientes
+
+
+def _reconstruir_sqlite(cursor, tabla: str):
+    nueva = f"{tabla}_nueva"
+    # Los índices se borran con la tabla vieja: se guardan para recrearlos
+    indices = [fila[0] for fila in cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (tabla,),
+    )]
+    cursor.execute(TABLAS[tabla].format(tabla=nueva))
+    anteriores = [fila[1] for fila in cursor.execute(f"PRAGMA table_info({tabla})")]
+    nuevas = {fila[1] for fila in cursor.execute(f"PRAGMA table_info({nueva})")}
+    columnas = ", ".join(f'"{c}"' for c in anteriores if c in nuevas)
+    cursor.execute(f"INSERT INTO {nueva} ({columnas}) SELECT {columnas} FROM {tabla}")
+    cursor.execute(f"DROP TABLE {tabla}")
+    cursor.execute(f"ALTER TABLE {nueva} RENAME TO {tabla}")
+    for indice in indices:
+        cursor.execute(indice)
+
+
+def _aplicar_sqlite(engine_, tablas):
+    conexion = engine_.raw_connection()
+    dbapi = conexion.driver_connection
+    aislamiento = dbapi.isolation_level
+    # Transacción manual: PRAGMA foreign_keys no tiene efecto dentro de una
+    # transacción, y debe estar desactivado para poder borrar la tabla vieja
+    # sin disparar las cascadas.
+    dbapi.isolation_level = None
+    cursor = dbapi.cursor()
+    try:
+        cursor.execute("PRAGMA foreign_keys=OFF")
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            for tabla in tablas:
+                _reconstruir_sqlite(cursor, tabla)
+            violaciones = cursor.execute("PRAGMA foreign_key_check").fetchall()
+            if violaciones:
+                raise RuntimeError(f"Claves foráneas inválidas tras la migración: {violaciones[:10]}")
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+    finally:
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+        dbapi.isolation_level = aislamiento
+        conexion.close()
+
+
+def aplicar(engine_):
+    with engine_.connect() as conexion:
+        pendientes = _sin_cascada(conexion)
+    if not pendientes:
+        # Base creada con los modelos actuales: ya tiene las restricciones
+        return
+
+    if engine_.dialect.name == "sqlite":
+        _aplicar_sqlite(engine_, list(dict.fromkeys(tabla for tabla, _ in pendientes)))
+        return
+
+    # PostgreSQL y otros motores sí permiten cambiar la restricción en sitio
+    with engine_.begin() as conexion:
+        for tabla, fk in pendientes:
+            conexion.exec_driver_sql(f'ALTER TABLE {tabla} DROP CONSTRAINT "{fk["name"]}"')
+            conexion.exec_driver_sql(
+                f'ALTER TABLE {tabla} ADD CONSTRAINT "{fk["name"]}" '
+                "FOREIGN KEY (finca_id) REFERENCES fincas (id) ON DELETE CASCADE"
+            )
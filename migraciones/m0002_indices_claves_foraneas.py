@@ -0,0 +1,22 @@
+# ============================================================
+#     0002 - Índices en las claves foráneas de ganados
+# ============================================================
+#
+# Sin índice, filtrar por finca o comprobar si un tipo de animal tiene ganado
+# (eliminar_tipo_animal) recorre la tabla entera. Un índice de una columna en
+# SQLite incluye el rowid, así que también sirve `WHERE finca_id = ? ORDER BY
+# id` (la lista paginada de una finca) sin ordenar en memoria.
+
+VERSION = 2
+DESCRIPCION = "Índices en ganados.finca_id y ganados.tipo_animal_id"
+
+INDICES = [
+    "CREATE INDEX IF NOT EXISTS ix_ganados_finca_id ON ganados (finca_id)",
+    "CREATE INDEX IF NOT EXISTS ix_ganados_tipo_animal_id ON ganados (tipo_animal_id)",
+]
+
+
+def aplicar(engine_):
+    with engine_.begin() as conexion:
+        for indice in INDICES:
+            conexion.exec_driver_sql(indice)
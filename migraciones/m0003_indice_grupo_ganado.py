@@ -0,0 +1,17 @@
+# ============================================================
+#   0003 - Índice compuesto (finca_id, tipo_animal_id, sexo)
+# ============================================================
+#
+# Cubre los filtros combinados de la lista y la API de ganado y el GROUP BY
+# con el que censo.reconstruir recalcula los contadores sin leer la tabla.
+
+VERSION = 3
+DESCRIPCION = "Índice compuesto ganados (finca_id, tipo_animal_id, sexo)"
+
+
+def aplicar(engine_):
+    with engine_.begin() as conexion:
+        conexion.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_ganados_finca_tipo_sexo "
+            "ON ganados (finca_id, tipo_animal_id, sexo)"
+        )
@@ -0,0 +1,84 @@
+import logging
+
+# ============================================================
+#     0004 - Índice de búsqueda de texto (FTS5, trigramas)
+# ============================================================
+#
+# ganados_fts guarda, por animal (rowid = ganados.id), la identificación, el
+# nombre y los nombres de su finca y tipo. El tokenizador trigram permite
+# buscar cualquier fragmento de 3 o más caracteres (p. ej. los últimos dígitos
+# de un arete) usando el índice. Los triggers lo mantienen sincronizado con
+# las altas, bajas y cambios de ganado y con los renombres de fincas y tipos.
+#
+# Solo SQLite: en otros motores busqueda.py usa ILIKE sin este índice.
+
+VERSION = 4
+DESCRIPCION = "Tabla FTS5 ganados_fts y triggers de sincronización"
+
+logger = logging.getLogger("ganaderia.migraciones")
+
+SENTENCIAS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ganados_fts USING fts5(
+        identificacion, nombre, finca, tipo_animal,
+        tokenize = 'trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ganados_fts_alta AFTER INSERT ON ganados BEGIN
+        INSERT INTO ganados_fts (rowid, identificacion, nombre, finca, tipo_animal)
+        VALUES (
+            new.id, new.identificacion, new.nombre,
+            (SELECT nombre FROM fincas WHERE id = new.finca_id),
+            (SELECT nombre FROM tipos_animales WHERE id = new.tipo_animal_id)
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ganados_fts_baja AFTER DELETE ON ganados BEGIN
+        DELETE FROM ganados_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ganados_fts_cambio
+    AFTER UPDATE OF identificacion, nombre, finca_id, tipo_animal_id ON ganados BEGIN
+        UPDATE ganados_fts SET
+            identificacion = new.identificacion,
+            nombre = new.nombre,
+            finca = (SELECT nombre FROM fincas WHERE id = new.finca_id),
+            tipo_animal = (SELECT nombre FROM tipos_animales WHERE id = new.tipo_animal_id)
+        WHERE rowid = new.id;
+    END
+    """,
+    # Renombrar una finca o un tipo actualiza solo a sus animales (índices de 0002)
+    """
+    CREATE TRIGGER IF NOT EXISTS fincas_fts_cambio AFTER UPDATE OF nombre ON fincas BEGIN
+        UPDATE ganados_fts SET finca = new.nombre
+        WHERE rowid IN (SELECT id FROM ganados WHERE finca_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tipos_animales_fts_cambio AFTER UPDATE OF nombre ON tipos_animales BEGIN
+        UPDATE ganados_fts SET tipo_animal = new.nombre
+        WHERE rowid IN (SELECT id FROM ganados WHERE tipo_animal_id = new.id);
+    END
+    """,
+    # Carga inicial con el ganado existente
+    "DELETE FROM ganados_fts",
+    """
+    INSERT INTO ganados_fts (rowid, identificacion, nombre, finca, tipo_animal)
+    SELECT g.id, g.identificacion, g.nombre, f.nombre, t.nombre
+    FROM ganados g
+    LEFT JOIN fincas f ON f.id = g.finca_id
+    LEFT JOIN tipos_animales t ON t.id = g.tipo_animal_id
+    """,
+]
+
+
+def aplicar(engine_):
+    if engine_.dialect.name != "sqlite":
+        logger.info("Búsqueda FTS5 no disponible en %s: se usará ILIKE", engine_.dialect.name)
+        return
+    with engine_.begin() as conexion:
+        for sentencia in SENTENCIAS:
+            conexion.exec_driver_sql(sentencia)
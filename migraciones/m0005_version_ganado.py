@@ -0,0 +1,22 @@
+from sqlalchemy import inspect
+
+# ============================================================
+#        0005 - Columna ganados.version (caché de fragmentos)
+# ============================================================
+#
+# Número de versión por animal, que el ORM incrementa en cada modificación.
+# Las plantillas lo usan como clave de los fragmentos cacheados (una fila de
+# la lista de ganado), de modo que una fila solo se vuelve a renderizar cuando
+# el animal cambia.
+
+VERSION = 5
+DESCRIPCION = "Columna de versión por fila en ganados"
+
+
+def aplicar(engine_):
+    with engine_.begin() as conexion:
+        columnas = {c["name"] for c in inspect(conexion).get_columns("ganados")}
+        if "version" not in columnas:
+            conexion.exec_driver_sql(
+                "ALTER TABLE ganados ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            )
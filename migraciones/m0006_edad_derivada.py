@@ -0,0 +1,26 @@
+from sqlalchemy import inspect
+
+# ============================================================
+#    0006 - Edad derivada de fecha_nacimiento (sin columna edad)
+# ============================================================
+#
+# La columna ganados.edad se escribía al dar de alta y nunca se actualizaba.
+# Ahora la edad se calcula (ver edades.py), así que la columna se elimina, y
+# se indexa fecha_nacimiento para los filtros y agrupaciones por edad, que
+# son rangos sobre esa fecha. DROP COLUMN requiere SQLite 3.35 o posterior.
+
+VERSION = 6
+DESCRIPCION = "Edad derivada: elimina ganados.edad e indexa fecha_nacimiento"
+
+
+def aplicar(engine_):
+    with engine_.begin() as conexion:
+        columnas = {c["name"] for c in inspect(conexion).get_columns("ganados")}
+        if "edad" in columnas:
+            conexion.exec_driver_sql("ALTER TABLE ganados DROP COLUMN edad")
+        conexion.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_ganados_fecha_nacimiento ON ganados (fecha_nacimiento)"
+        )
+        conexion.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_ganados_finca_nacimiento ON ganados (finca_id, fecha_nacimiento)"
+        )
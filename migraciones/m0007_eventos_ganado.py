@@ -0,0 +1,74 @@
+# ============================================================
+#     0007 - Registro de eventos de ganado e histórico diario
+# ============================================================
+#
+# Crea eventos_ganado, censo_diario y avance_resumenes (ver eventos.py e
+# historico.py). En una base con animales, registra el alta de cada uno en su
+# fecha_registro: el histórico se reconstruye desde ahí (las bajas anteriores
+# a esta migración no se conocen).
+#
+# El DDL está congelado aquí (como en 0001): la migración debe producir
+# siempre el mismo esquema aunque los modelos cambien después. Solo los tipos
+# sin equivalente común se eligen según el motor.
+
+VERSION = 7
+DESCRIPCION = "Registro de eventos de ganado e histórico diario del censo"
+
+TIPOS = {
+    "sqlite": {"serial": "INTEGER", "fecha_hora": "DATETIME"},
+    "postgresql": {"serial": "SERIAL", "fecha_hora": "TIMESTAMP WITHOUT TIME ZONE"},
+}
+
+TABLAS = [
+    """
+    CREATE TABLE IF NOT EXISTS eventos_ganado (
+        id {serial} NOT NULL,
+        fecha {fecha_hora} NOT NULL,
+        accion VARCHAR(10) NOT NULL,
+        ganado_id INTEGER NOT NULL,
+        finca_id INTEGER,
+        tipo_animal_id INTEGER,
+        sexo VARCHAR(10),
+        finca_anterior_id INTEGER,
+        tipo_animal_anterior_id INTEGER,
+        sexo_anterior VARCHAR(10),
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS censo_diario (
+        fecha DATE NOT NULL,
+        finca_id INTEGER NOT NULL,
+        tipo_animal_id INTEGER NOT NULL,
+        sexo VARCHAR(10) NOT NULL,
+        entradas INTEGER NOT NULL,
+        salidas INTEGER NOT NULL,
+        PRIMARY KEY (fecha, finca_id, tipo_animal_id, sexo)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS avance_resumenes (
+        nombre VARCHAR(50) NOT NULL,
+        ultimo_evento_id INTEGER NOT NULL,
+        actualizado {fecha_hora},
+        PRIMARY KEY (nombre)
+    )
+    """,
+]
+
+
+def aplicar(engine_):
+    tipos = TIPOS.get(engine_.dialect.name, TIPOS["postgresql"])
+    with engine_.begin() as conexion:
+        for tabla in TABLAS:
+            conexion.exec_driver_sql(tabla.format(**tipos))
+        hay_eventos = conexion.exec_driver_sql("SELECT 1 FROM eventos_ganado LIMIT 1").first()
+        if hay_eventos is None:
+            conexion.exec_driver_sql(
+                """
+                INSERT INTO eventos_ganado (fecha, accion, ganado_id, finca_id, tipo_animal_id, sexo)
+                SELECT COALESCE(fecha_registro, CURRENT_TIMESTAMP), 'alta', id, finca_id, tipo_animal_id, sexo
+                FROM ganados
+                ORDER BY fecha_registro, id
+                """
+            )
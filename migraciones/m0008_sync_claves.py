@@ -0,0 +1,29 @@
+# ============================================================
+#     0008 - Claves de idempotencia de la sincronización
+# ============================================================
+#
+# DDL congelado (ver 0001 y 0007): no depende de models.SyncClave.
+
+VERSION = 8
+DESCRIPCION = "Tabla sync_claves (idempotencia de POST /sync/)"
+
+TIPOS = {
+    "sqlite": {"fecha_hora": "DATETIME"},
+    "postgresql": {"fecha_hora": "TIMESTAMP WITHOUT TIME ZONE"},
+}
+
+TABLA = """
+    CREATE TABLE IF NOT EXISTS sync_claves (
+        dispositivo VARCHAR(100) NOT NULL,
+        clave VARCHAR(100) NOT NULL,
+        ganado_id INTEGER,
+        fecha {fecha_hora},
+        PRIMARY KEY (dispositivo, clave)
+    )
+    """
+
+
+def aplicar(engine_):
+    tipos = TIPOS.get(engine_.dialect.name, TIPOS["postgresql"])
+    with engine_.begin() as conexion:
+        conexion.exec_driver_sql(TABLA.format(**tipos))
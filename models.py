@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Index, event, inspect
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
+import edades
 
 
 class Finca(Base):
@@ -16,7 +18,10 @@ class Finca(Base):
     ganados = relationship(
         "Ganado", 
         back_populates="finca",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        # El borrado en cascada lo hace la base de datos (ON DELETE CASCADE):
+        # el ORM no carga los animales de la finca para borrarlos uno a uno.
+        passive_deletes=True
     )
 
 class TipoAnimal(Base):
@@ -32,14 +37,120 @@ class Ganado(Base):
     id = Column(Integer, primary_key=True, index=True)
     identificacion = Column(String, index=True, unique=True, nullable=False)
     nombre = Column(String(100), nullable=True)
-    edad = Column(Integer, nullable=False)
     sexo = Column(String(10), nullable=False)
     fecha_nacimiento = Column(Date)
-    finca_id = Column(Integer, ForeignKey("fincas.id"), nullable=False)
-    tipo_animal_id = Column(Integer, ForeignKey("tipos_animales.id"), nullable=False)
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), nullable=False, index=True)
+    tipo_animal_id = Column(Integer, ForeignKey("tipos_animales.id"), nullable=False, index=True)
     fecha_registro = Column(DateTime, default=datetime.utcnow)
     foto = Column(String, nullable=True)  
+    # Versión de la fila: cambia con cada modificación. Es la clave de la caché
+    # de fragmentos de las plantillas (ver templating.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
 
     finca = relationship("Finca", back_populates="ganados")
     tipo_animal = relationship("TipoAnimal", back_populates="ganados")
+
+    # Edad en meses cumplidos, derivada de la fecha de nacimiento (ver edades.py)
+    @hybrid_property
+    def edad(self):
+        if self.fecha_nacimiento is None:
+            return None
+        return edades.meses_entre(self.fecha_nacimiento, edades.hoy())
+
+    @edad.inplace.expression
+    @classmethod
+    def _edad_sql(cls):
+        return edades.expresion_edad(cls.fecha_nacimiento)
+
+    # Filtros combinados de la lista y agrupaciones del censo
+    __table_args__ = (
+        Index("ix_ganados_finca_tipo_sexo", "finca_id", "tipo_animal_id", "sexo"),
+        # Filtros y agrupaciones por edad (rangos de fecha de nacimiento)
+        Index("ix_ganados_fecha_nacimiento", "fecha_nacimiento"),
+        Index("ix_ganados_finca_nacimiento", "finca_id", "fecha_nacimiento"),
+    )
+
+
+@event.listens_for(Ganado, "before_update")
+def _incrementar_version(mapper, connection, ganado):
+    # Solo los cambios reales de columnas invalidan los fragmentos. Los UPDATE
+    # masivos (Core) no pasan por aquí: deben incrementar `version` ellos mismos.
+    estado = inspect(ganado)
+    if any(estado.attrs[c.key].history.has_changes() for c in mapper.column_attrs):
+        ganado.version = (ganado.version or 0) + 1
+
+
+# Conteo de cabezas por (finca, tipo, sexo). Se mantiene en la misma
+# transacción que las altas, bajas y cambios de ganado (ver censo.py), de modo
+# que el censo se lee en O(grupos) y no en O(animales).
+class ConteoGanado(Base):
+    __tablename__ = "conteos_ganado"
+
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), primary_key=True)
+    tipo_animal_id = Column(Integer, ForeignKey("tipos_animales.id"), primary_key=True)
+    sexo = Column(String(10), primary_key=True)
+    cantidad = Column(Integer, nullable=False, default=0)
+
+
+# Versión de cambios por tabla. Cada escritura la incrementa en su misma
+# transacción; los procesos (workers) la consultan para invalidar sus cachés.
+class VersionTabla(Base):
+    __tablename__ = "versiones"
+
+    tabla = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    actualizado = Column(DateTime, default=datetime.utcnow)
+
+
+# Registro de solo inserción de las altas, bajas y cambios de ganado (ver
+# eventos.py). Sin claves foráneas: la historia se conserva aunque el animal
+# o su finca se eliminen. El grupo (finca, tipo, sexo) es el del animal
+# después del evento; el grupo *_anterior, el que dejó (bajas y traslados).
+class EventoGanado(Base):
+    __tablename__ = "eventos_ganado"
+
+    id = Column(Integer, primary_key=True)
+    fecha = Column(DateTime, nullable=False, default=datetime.utcnow)
+    accion = Column(String(10), nullable=False)
+    ganado_id = Column(Integer, nullable=False)
+    finca_id = Column(Integer)
+    tipo_animal_id = Column(Integer)
+    sexo = Column(String(10))
+    finca_anterior_id = Column(Integer)
+    tipo_animal_anterior_id = Column(Integer)
+    sexo_anterior = Column(String(10))
+
+
+# Entradas y salidas diarias por grupo, calculadas de forma incremental a
+# partir de eventos_ganado (ver historico.py). Las cabezas de un día son la
+# suma acumulada de entradas - salidas hasta ese día.
+class CensoDiario(Base):
+    __tablename__ = "censo_diario"
+
+    fecha = Column(Date, primary_key=True)
+    finca_id = Column(Integer, primary_key=True)
+    tipo_animal_id = Column(Integer, primary_key=True)
+    sexo = Column(String(10), primary_key=True)
+    entradas = Column(Integer, nullable=False, default=0)
+    salidas = Column(Integer, nullable=False, default=0)
+
+
+# Hasta qué evento está procesado cada resumen incremental
+class AvanceResumen(Base):
+    __tablename__ = "avance_resumenes"
+
+    nombre = Column(String(50), primary_key=True)
+    ultimo_evento_id = Column(Integer, nullable=False, default=0)
+    actualizado = Column(DateTime, default=datetime.utcnow)
+
+
+# Claves de idempotencia de la sincronización: una fila por mutación aplicada
+# (ver sincronizacion.py). Reenviar un lote no vuelve a aplicar sus mutaciones.
+class SyncClave(Base):
+    __tablename__ = "sync_claves"
+
+    dispositivo = Column(String(100), primary_key=True)
+    clave = Column(String(100), primary_key=True)
+    ganado_id = Column(Integer)
+    fecha = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,159 @@
+import base64
+import json
+from datetime import date
+
+from sqlalchemy import and_, or_
+
+import models, schemas, edades
+
+
+# ============================================================
+#                 PAGINACIÓN POR CURSOR (KEYSET)
+# ============================================================
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+
+# Columnas por las que se puede ordenar el listado de ganado. Las que admiten
+# NULL (fecha_nacimiento) ordenan los NULL como el valor más pequeño: primero
+# en orden ascendente y al final en descendente, el mismo orden del índice en
+# SQLite (ver aplicar_keyset).
+ORDEN_GANADO = {
+    "id": models.Ganado.id,
+    "identificacion": models.Ganado.identificacion,
+    "fecha_nacimiento": models.Ganado.fecha_nacimiento,
+}
+
+ORDEN_FINCAS = {
+    "id": models.Finca.id,
+    "nombre": models.Finca.nombre,
+}
+
+
+def codificar_cursor(valor, id_):
+    """Convierte la última fila de una página en un cursor opaco."""
+    if isinstance(valor, date):
+        valor = valor.isoformat()
+    crudo = json.dumps([valor, id_], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (valor, id) a partir de un cursor, o lanza ValueError."""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valor, id_ = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except Exception as e:
+        raise ValueError("Cursor inválido") from e
+    if not isinstance(id_, int) or isinstance(id_, bool):
+        raise ValueError("Cursor inválido")
+    return valor, id_
+
+
+def _valor_cursor(columna, valor):
+    """Convierte el valor de un cursor al tipo de la columna de orden, o lanza ValueError."""
+    if valor is None:
+        return valor
+    tipo = columna.type.python_type
+    if tipo is date:
+        if isinstance(valor, str):
+            try:
+                return date.fromisoformat(valor)
+            except ValueError:
+                pass
+    elif tipo is float and isinstance(valor, int) and not isinstance(valor, bool):
+        return float(valor)
+    elif isinstance(valor, tipo) and not isinstance(valor, bool):
+        return valor
+    raise ValueError("Cursor inválido")
+
+
+def resolver_orden(sort, columnas):
+    """Traduce 'campo' o '-campo' a (nombre, columna, descendente)."""
+    descendente = sort.startswith("-")
+    nombre = sort.lstrip("-")
+    if nombre not in columnas:
+        raise ValueError(
+            f"Orden no soportado: '{sort}'. Opciones: {', '.join(sorted(columnas))}"
+        )
+    return nombre, columnas[nombre], descendente
+
+
+def _condicion_keyset(columna, columna_id, valor, id_, descendente, nulos):
+    """Filas posteriores a (valor, id_); con `nulos`, NULL es el menor valor."""
+    if valor is None:
+        if not nulos:
+            raise ValueError("Cursor inválido")
+        if descendente:
+            # Los NULL van al final: solo quedan los NULL con id menor
+            return and_(columna.is_(None), columna_id < id_)
+        return or_(columna.is_not(None), and_(columna.is_(None), columna_id > id_))
+    if descendente:
+        condicion = or_(columna < valor, and_(columna == valor, columna_id < id_))
+        return or_(condicion, columna.is_(None)) if nulos else condicion
+    return or_(columna > valor, and_(columna == valor, columna_id > id_))
+
+
+def aplicar_keyset(consulta, columna, columna_id, cursor, descendente, limite):
+    """
+    Aplica orden, condición de cursor y límite a una consulta.
+
+    Se pide una fila de más (limite + 1) para saber si existe página siguiente
+    sin necesidad de un COUNT(*).
+    """
+    nulos = bool(getattr(columna, "nullable", False))
+    if cursor:
+        valor, id_ = decodificar_cursor(cursor)
+        valor = _valor_cursor(columna, valor)
+        if columna is columna_id:
+            condicion = columna_id < id_ if descendente else columna_id > id_
+        else:
+            condicion = _condicion_keyset(columna, columna_id, valor, id_, descendente, nulos)
+        consulta = consulta.filter(condicion)
+
+    if columna is columna_id:
+        orden = [columna_id.desc() if descendente else columna_id.asc()]
+    elif descendente:
+        orden = [columna.desc().nulls_last() if nulos else columna.desc(), columna_id.desc()]
+    else:
+        orden = [columna.asc().nulls_first() if nulos else columna.asc(), columna_id.asc()]
+
+    return consulta.order_by(*orden).limit(limite + 1)
+
+
+def cortar_pagina(filas, limite, campo_orden):
+    """Separa la fila extra y calcula el cursor de la página siguiente."""
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    siguiente = None
+    if hay_mas and filas:
+        ultima = filas[-1]
+        siguiente = codificar_cursor(getattr(ultima, campo_orden), ultima.id)
+    return filas, siguiente
+
+
+# ============================================================
+#                      FILTROS DE GANADO
+# ============================================================
+
+def filtrar_ganado(consulta, filtros: schemas.FiltroGanado):
+    """Aplica los filtros de servidor del listado de ganado."""
+    if filtros.finca_id is not None:
+        consulta = consulta.filter(models.Ganado.finca_id == filtros.finca_id)
+    if filtros.tipo_animal_id is not None:
+        consulta = consulta.filter(models.Ganado.tipo_animal_id == filtros.tipo_animal_id)
+    if filtros.sexo:
+        consulta = consulta.filter(models.Ganado.sexo == filtros.sexo)
+    if filtros.nacido_desde is not None:
+        consulta = consulta.filter(models.Ganado.fecha_nacimiento >= filtros.nacido_desde)
+    if filtros.nacido_hasta is not None:
+        consulta = consulta.filter(models.Ganado.fecha_nacimiento <= filtros.nacido_hasta)
+    # Edad: rangos de fecha de nacimiento (índices ix_ganados_*nacimiento)
+    if filtros.categoria_edad:
+        minimo, maximo = edades.CATEGORIAS_EDAD[filtros.categoria_edad]
+        consulta = edades.filtrar_edad(consulta, models.Ganado.fecha_nacimiento, minimo, maximo)
+    if filtros.edad_min_meses is not None or filtros.edad_max_meses is not None:
+        # edad_max_meses es inclusivo: edad <= n  <=>  edad < n + 1
+        maximo = filtros.edad_max_meses + 1 if filtros.edad_max_meses is not None else None
+        consulta = edades.filtrar_edad(consulta, models.Ganado.fecha_nacimiento, filtros.edad_min_meses, maximo)
+    return consulta
@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, get_read_db
+import schemas, censo, edades, historico
+
+router = APIRouter(
+    prefix="/censo",
+    tags=["Censo"]
+)
+
+# ======================================================
+#                RUTAS DE LA API (JSON)
+# ======================================================
+
+# Conteo de cabezas agrupado - URL: /censo/?agrupar=finca&agrupar=sexo&finca_id=1
+# Se lee de la tabla de contadores: el costo depende del número de grupos, no de animales.
+# Por edad (?agrupar=edad o ?categoria_edad=adulto) se cuenta con rangos indexados
+# de fecha de nacimiento.
+@router.get("/", response_model=schemas.Censo)
+async def obtener_censo(
+    agrupar: list[str] = Query(["finca"], description="finca, tipo, sexo y/o edad"),
+    finca_id: int | None = None,
+    tipo_animal_id: int | None = None,
+    sexo: str | None = None,
+    categoria_edad: Literal["ternero", "añojo", "adulto"] | None = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    invalidas = set(agrupar) - set(censo.AGRUPACIONES)
+    if invalidas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Agrupación no soportada: {', '.join(sorted(invalidas))}. Opciones: {', '.join(censo.AGRUPACIONES)}"
+        )
+    total, grupos = await censo.consultar(db, agrupar, finca_id, tipo_animal_id, sexo, categoria_edad)
+    return {"total": total, "grupos": grupos}
+
+
+# Cabezas por día en un rango - URL: /censo/historico?desde=2025-01-01&agrupar=finca
+# Se lee del resumen diario (censo_diario), no de los eventos ni de los animales.
+@router.get("/historico", response_model=schemas.HistoricoCenso)
+async def obtener_historico(
+    desde: date | None = Query(None, description="Por defecto, un año antes de `hasta`"),
+    hasta: date | None = Query(None, description="Por defecto, hoy"),
+    agrupar: list[str] = Query([], description="finca, tipo y/o sexo (sin agrupar: total)"),
+    finca_id: int | None = None,
+    tipo_animal_id: int | None = None,
+    sexo: str | None = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    invalidas = set(agrupar) - set(historico.AGRUPACIONES)
+    if invalidas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Agrupación no soportada: {', '.join(sorted(invalidas))}. Opciones: {', '.join(historico.AGRUPACIONES)}"
+        )
+    hasta = hasta or edades.hoy()
+    desde = desde or hasta - timedelta(days=365)
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="`desde` debe ser anterior o igual a `hasta`")
+    if (hasta - desde).days >= historico.MAX_DIAS:
+        raise HTTPException(status_code=400, detail=f"El rango no puede superar {historico.MAX_DIAS} días")
+    series, actualizado = await historico.serie(db, desde, hasta, agrupar, finca_id, tipo_animal_id, sexo)
+    return {"desde": desde, "hasta": hasta, "actualizado": actualizado, "series": series}
+
+
+# Reconciliar contadores con la tabla de ganado - URL: /censo/reconstruir
+@router.post("/reconstruir", response_model=schemas.Censo)
+async def reconstruir_censo(db: AsyncSession = Depends(get_async_db)):
+    total = await censo.reconstruir(db)
+    return {"total": total, "grupos": []}
@@ -1,17 +1,77 @@
-from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from database import get_db
-import models, schemas
+from fastapi import APIRouter, BackgroundTasks, Request, Response, Depends, HTTPException, Query
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, get_read_db
+from templating import templates
+import models, schemas, queries, cache, versiones, storage, thumbnails, condicional, serializacion, broker, eventos
 
-# Inicializar Jinja2Templates
-templates = Jinja2Templates(directory="templates") 
 
 router = APIRouter(
     prefix="/fincas",
     tags=["Fincas"]
 )
 
+# Columnas del esquema Finca, para el listado JSON (ver serializacion.py)
+COLUMNAS_API = serializacion.columnas(models.Finca, schemas.Finca)
+
+
+async def _pagina_fincas(db: AsyncSession, cursor: str | None, limite: int, sort: str, columnas=None):
+    """
+    Devuelve (fincas, siguiente_cursor) con paginación keyset.
+
+    Con `columnas` devuelve tuplas con esas columnas en lugar de objetos ORM.
+    """
+    try:
+        campo, columna, descendente = queries.resolver_orden(sort, queries.ORDEN_FINCAS)
+        consulta = queries.aplicar_keyset(
+            select(*columnas) if columnas else select(models.Finca),
+            columna, models.Finca.id, cursor, descendente, limite
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    resultado = await (db.execute(consulta) if columnas else db.scalars(consulta))
+    return queries.cortar_pagina(resultado.all(), limite, campo)
+
+
+async def _fotos_huerfanas(db: AsyncSession, finca_id: int) -> list[str]:
+    """
+    Fotos que quedarán sin uso al borrar la finca.
+
+    Las fotos se deduplican por hash: una misma foto puede estar en animales de
+    otras fincas y entonces no se borra.
+    """
+    ganado = models.Ganado
+    consulta = (
+        select(ganado.foto)
+        .where(ganado.foto.in_(
+            select(ganado.foto).where(ganado.finca_id == finca_id, ganado.foto.is_not(None))
+        ))
+        .group_by(ganado.foto)
+        .having(func.sum(ganado.finca_id != finca_id) == 0)
+    )
+    return list((await db.scalars(consulta)).all())
+
+
+def _eliminar_fotos(fotos: list[str]):
+    """Tarea en segundo plano: borra las fotos y sus derivados."""
+    for foto in fotos:
+        storage.eliminar_foto(foto)
+        thumbnails.eliminar_derivados(foto)
+
+
+def _publicar(accion: str, finca_id: int):
+    """Notifica el cambio a las vistas de ganado conectadas (ver broker.py)."""
+    broker.cambios.publicar(broker.Evento("finca", accion, finca_id, {finca_id}))
+
+
+async def _obtener_finca(db: AsyncSession, finca_id: int):
+    """Busca una finca por id o responde 404."""
+    finca = await db.get(models.Finca, finca_id)
+    if not finca:
+        raise HTTPException(status_code=404, detail="Finca no encontrada")
+    return finca
+
 # ======================================================
 #                RUTAS DE VISTAS (HTML GET)
 # ======================================================
@@ -27,22 +87,31 @@ async def crear_finca_view(request: Request):
 # 2. Muestra la tabla de todas las fincas
 # URL final: /fincas/lista
 @router.get("/lista")
-async def listar_fincas_view(request: Request, db: Session = Depends(get_db)):
-    """Muestra la tabla de fincas."""
-    fincas = db.query(models.Finca).all()
+async def listar_fincas_view(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(queries.LIMITE_POR_DEFECTO, ge=1, le=queries.LIMITE_MAXIMO),
+    sort: str = "id",
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Muestra la tabla de fincas, paginada por cursor."""
+    fincas, siguiente = await _pagina_fincas(db, cursor, limit, sort)
     return templates.TemplateResponse(
         "finca/lista_fincas.html", 
-        {"request": request, "fincas": fincas}
+        {
+            "request": request,
+            "fincas": fincas,
+            "siguiente_url": request.url.include_query_params(cursor=siguiente) if siguiente else None,
+            "primera_url": request.url.remove_query_params("cursor") if cursor else None,
+        }
     )
 
 # 3. Muestra el formulario para editar finca
 # URL final: /fincas/editar/{finca_id}
 @router.get("/editar/{finca_id}")
-async def editar_finca_view(request: Request, finca_id: int, db: Session = Depends(get_db)):
+async def editar_finca_view(request: Request, finca_id: int, db: AsyncSession = Depends(get_read_db)):
     """Muestra el formulario precargado para editar."""
-    finca = db.query(models.Finca).filter(models.Finca.id == finca_id).first()
-    if not finca:
-        raise HTTPException(status_code=404, detail="Finca no encontrada")
+    finca = await _obtener_finca(db, finca_id)
     return templates.TemplateResponse(
         "finca/editar_finca.html", 
         {"request": request, "finca": finca}
@@ -52,11 +121,9 @@ async def editar_finca_view(request: Request, finca_id: int, db: Session = Depen
 # URL final: /fincas/{finca_id}
 # Nota: Esta ruta debe ir después de /fincas/lista y /fincas/editar
 @router.get("/{finca_id}")
-async def detalle_finca_view(request: Request, finca_id: int, db: Session = Depends(get_db)):
+async def detalle_finca_view(request: Request, finca_id: int, db: AsyncSession = Depends(get_read_db)):
     """Muestra el detalle de una finca."""
-    finca = db.query(models.Finca).filter(models.Finca.id == finca_id).first()
-    if not finca:
-        raise HTTPException(status_code=404, detail="Finca no encontrada")
+    finca = await _obtener_finca(db, finca_id)
     return templates.TemplateResponse(
         "finca/detalle_finca.html", 
         {"request": request, "finca": finca}
@@ -68,79 +135,104 @@ async def detalle_finca_view(request: Request, finca_id: int, db: Session = Depe
 
 # Crear finca (POST API) - URL: /fincas/
 @router.post("/", response_model=schemas.Finca)
-def crear_finca(finca: schemas.FincaCreate, db: Session = Depends(get_db)):
-    nueva_finca = models.Finca(**finca.dict())
+async def crear_finca(finca: schemas.FincaCreate, db: AsyncSession = Depends(get_async_db)):
+    nueva_finca = models.Finca(**finca.model_dump())
     db.add(nueva_finca)
-    db.commit()
-    db.refresh(nueva_finca)
+    await versiones.incrementar(db, "fincas")
+    await db.commit()
+    cache.referencias.invalidar("fincas")
+    await db.refresh(nueva_finca)
+    _publicar("creado", nueva_finca.id)
     return nueva_finca
 
 
-# Listar todas las fincas (GET API) - URL: /fincas/
+# Listar fincas (GET API) - URL: /fincas/?cursor=&limit=&sort=
 # Se ha renombrado para no chocar con la función de vista (listar_fincas_view)
-@router.get("/", response_model=list[schemas.Finca])
-def listar_fincas_api(db: Session = Depends(get_db)):
-    return db.query(models.Finca).all()
+@router.get("/", response_model=schemas.PaginaFincas, dependencies=[Depends(condicional.por_version("fincas"))])
+async def listar_fincas_api(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(queries.LIMITE_POR_DEFECTO, ge=1, le=queries.LIMITE_MAXIMO),
+    sort: str = Query("id", description="Campo de orden; prefijo '-' para descendente"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    filas, siguiente = await _pagina_fincas(db, cursor, limit, sort, columnas=COLUMNAS_API)
+    return serializacion.respuesta(
+        {"items": serializacion.filas_a_dicts(filas), "next_cursor": siguiente}, response
+    )
 
 
-# Buscar finca por ID (GET API) - URL: /fincas/{finca_id}
-# Esta ruta comparte URL con la vista de detalle. Para ver el JSON, usa /docs
-@router.get("/{finca_id}", response_model=schemas.Finca)
-def obtener_finca_api(finca_id: int, db: Session = Depends(get_db)):
-    finca = db.query(models.Finca).filter(models.Finca.id == finca_id).first()
-    if not finca:
-        raise HTTPException(status_code=404, detail="Finca no encontrada")
-    return finca
+# Buscar finca por ID (GET API) - URL: /fincas/api/{finca_id}
+# GET /fincas/{finca_id} es la vista HTML de detalle: el JSON tiene su propia ruta
+@router.get("/api/{finca_id}", response_model=schemas.Finca, dependencies=[Depends(condicional.por_version("fincas"))])
+async def obtener_finca_api(finca_id: int, db: AsyncSession = Depends(get_read_db)):
+    return await _obtener_finca(db, finca_id)
 
 
 # Actualizar finca completa (PUT API) - URL: /fincas/{finca_id}
 #FUNCIÓN PUT PARA ACTUALIZAR LA FINCA
 @router.put("/{finca_id}", response_model=schemas.Finca)
-def actualizar_finca(finca_id: int, datos: schemas.FincaCreate, db: Session = Depends(get_db)):
-    # ... (código para buscar la finca) ...
+async def actualizar_finca(finca_id: int, datos: schemas.FincaCreate, db: AsyncSession = Depends(get_async_db)):
+    # 1. Buscar la finca existente
+    finca = await _obtener_finca(db, finca_id)
 
     # 2. Actualizar los campos con los nuevos datos
-    for key, value in datos.dict().items():
+    for key, value in datos.model_dump().items():
         setattr(finca, key, value) 
 
     # 3. Intentar confirmar la transacción (Persistir los cambios en la DB)
     try:
         # 💡 CAMBIO/REFUERZO: Aseguramos que SQLAlchemy sepa que este objeto está 'dirty'
         db.add(finca) 
-        db.commit() # Escribe los cambios a la base de datos
+        await versiones.incrementar(db, "fincas")
+        await db.commit() # Escribe los cambios a la base de datos
+        cache.referencias.invalidar("fincas")
     
-    except IntegrityError as e:
-        # ... (manejo de errores de unicidad) ...
-        db.rollback()
-        # ...
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Error de integridad de datos de la finca.")
     
-    db.refresh(finca)
+    await db.refresh(finca)
+    _publicar("actualizado", finca.id)
     return finca
 
 
 # Actualización parcial (PATCH API) - URL: /fincas/{finca_id}
 @router.patch("/{finca_id}", response_model=schemas.Finca)
-def modificar_parcialmente(finca_id: int, datos: schemas.FincaCreate, db: Session = Depends(get_db)):
-    finca = db.query(models.Finca).filter(models.Finca.id == finca_id).first()
-    if not finca:
-        raise HTTPException(status_code=404, detail="Finca no encontrada")
+async def modificar_parcialmente(finca_id: int, datos: schemas.FincaCreate, db: AsyncSession = Depends(get_async_db)):
+    finca = await _obtener_finca(db, finca_id)
 
-    datos_dict = datos.dict(exclude_unset=True)
+    datos_dict = datos.model_dump(exclude_unset=True)
     for key, value in datos_dict.items():
         setattr(finca, key, value)
 
-    db.commit()
-    db.refresh(finca)
+    await versiones.incrementar(db, "fincas")
+    await db.commit()
+    cache.referencias.invalidar("fincas")
+    await db.refresh(finca)
+    _publicar("actualizado", finca.id)
     return finca
 
 
 # Eliminar finca (DELETE API) - URL: /fincas/{finca_id}
 @router.delete("/{finca_id}")
-def eliminar_finca(finca_id: int, db: Session = Depends(get_db)):
-    finca = db.query(models.Finca).filter(models.Finca.id == finca_id).first()
-    if not finca:
+async def eliminar_finca(finca_id: int, tareas: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
+    fotos = await _fotos_huerfanas(db, finca_id)
+
+    # La baja de cada animal queda en el registro de eventos (INSERT ... SELECT)
+    await eventos.registrar_desde(db, eventos.seleccion_bajas().where(models.Ganado.finca_id == finca_id))
+    # Un solo DELETE: la base de datos borra en cascada los animales y los
+    # contadores del censo de la finca (ON DELETE CASCADE)
+    resultado = await db.execute(delete(models.Finca).where(models.Finca.id == finca_id))
+    if resultado.rowcount == 0:
         raise HTTPException(status_code=404, detail="Finca no encontrada")
-
-    db.delete(finca)
-    db.commit()
+    # La cascada también borra ganado
+    await versiones.incrementar(db, "fincas", "ganados")
+    await db.commit()
+    cache.referencias.invalidar("fincas")
+    _publicar("eliminado", finca_id)
+
+    # Los archivos se borran después de responder y solo si el commit tuvo éxito
+    if fotos:
+        tareas.add_task(_eliminar_fotos, fotos)
     return {"mensaje": "Finca eliminada correctamente"}
\ No newline at end of file
@@ -1,22 +1,107 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, UploadFile, File, Form
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from datetime import date
-import models, schemas
-from database import get_db
+import asyncio
+
+from fastapi import APIRouter, Request, Response, Depends, HTTPException, UploadFile, File, Form, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload
+from datetime import date, datetime
+import models, schemas, queries, storage, thumbnails, importacion, exportacion, censo, cache, busqueda, versiones, condicional, serializacion, broker, eventos
+from database import ReadSessionLocal, get_async_db, get_read_db
+from templating import templates
 
-templates = Jinja2Templates(directory="templates") 
 
 router = APIRouter(
     prefix="/ganado",
     tags=["Ganado"]
 )
 
+# Columnas del esquema Ganado, para los listados JSON (ver serializacion.py)
+COLUMNAS_API = serializacion.columnas(models.Ganado, schemas.Ganado)
+
+# Relaciones que muestran las plantillas (finca y tipo). Se cargan con JOIN en la
+# misma consulta para evitar el problema N+1 (1 + 2N consultas por listado).
+CON_RELACIONES = (
+    joinedload(models.Ganado.finca),
+    joinedload(models.Ganado.tipo_animal),
+)
+
+
+async def _pagina_ganado(db: AsyncSession, filtros: schemas.FiltroGanado, cursor: str | None, limite: int, sort: str, *opciones, columnas=None):
+    """
+    Devuelve (ganados, siguiente_cursor) aplicando filtros y paginación keyset.
+
+    Con `columnas` devuelve tuplas con esas columnas en lugar de objetos ORM.
+    """
+    try:
+        campo, columna, descendente = queries.resolver_orden(sort, queries.ORDEN_GANADO)
+        base = select(*columnas) if columnas else select(models.Ganado).options(*opciones)
+        consulta = queries.filtrar_ganado(base, filtros)
+        consulta = queries.aplicar_keyset(
+            consulta, columna, models.Ganado.id, cursor, descendente, limite
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    resultado = await (db.execute(consulta) if columnas else db.scalars(consulta))
+    return queries.cortar_pagina(resultado.all(), limite, campo)
+
+
+async def _buscar_ganado(db: AsyncSession, q: str, filtros: schemas.FiltroGanado, cursor: str | None, limite: int, *opciones):
+    """Devuelve (ganados, siguiente_cursor) de una búsqueda por texto."""
+    try:
+        return await busqueda.buscar(db, q, filtros, cursor, limite, *opciones)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _publicar(accion: str, ganado_id: int, *fincas: int):
+    """Notifica un cambio ya confirmado a las vistas conectadas (ver broker.py)."""
+    broker.cambios.publicar(broker.Evento("ganado", accion, ganado_id, set(fincas)))
+
+
+async def _obtener_ganado(db: AsyncSession, ganado_id: int, *opciones, detalle="Ganado no encontrado"):
+    """Busca un animal por id o responde 404."""
+    ganado = await db.scalar(
+        select(models.Ganado).options(*opciones).where(models.Ganado.id == ganado_id)
+    )
+    if not ganado:
+        raise HTTPException(status_code=404, detail=detalle)
+    return ganado
+
+
+def _error_integridad(e: IntegrityError, identificacion: str) -> HTTPException:
+    """400 para una identificación repetida o una finca / tipo inexistente (claves foráneas)."""
+    if 'UNIQUE constraint failed' in str(e) and 'identificacion' in str(e):
+        return HTTPException(
+            status_code=400,
+            detail=f"La identificación '{identificacion}' ya está en uso por otro animal."
+        )
+    return HTTPException(
+        status_code=400,
+        detail="Error de integridad de datos (Finca o Tipo de Animal no válido)."
+    )
+
+
+async def _registrar_alta(db: AsyncSession, nuevo_ganado: models.Ganado):
+    """Inserta el animal con su contador del censo y su evento, en una transacción."""
+    db.add(nuevo_ganado)
+    try:
+        await db.flush()
+        await censo.ajustar(db, [(*censo.clave(nuevo_ganado), 1)])
+        await eventos.registrar(db, [eventos.alta(nuevo_ganado)])
+        await versiones.incrementar(db, "ganados")
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise _error_integridad(e, nuevo_ganado.identificacion)
+    await db.refresh(nuevo_ganado)
+
+
 # FORMULARIO HTML
 @router.get("/registrar")
-async def registrar_ganado_view(request: Request, db: Session = Depends(get_db)):
-    fincas = db.query(models.Finca).all()
-    tipos_animales = db.query(models.TipoAnimal).all()
+async def registrar_ganado_view(request: Request, db: AsyncSession = Depends(get_read_db)):
+    fincas, tipos_animales = await cache.referencias.obtener(db, "fincas", "tipos_animales")
     return templates.TemplateResponse(
         "ganado/registrar_ganado.html",
         {"request": request, "fincas": fincas, "tipos_animales": tipos_animales}
@@ -29,54 +114,68 @@ async def crear_ganado(
     nombre: str | None = Form(None),
     fecha_nacimiento: date = Form(...),
     sexo: str = Form(...),
-    edad: int = Form(...),
     finca_id: int = Form(...),
     tipo_animal_id: int = Form(...),
     foto: UploadFile | None = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     nuevo_ganado = models.Ganado(
         identificacion=identificacion,
         nombre=nombre,
         fecha_nacimiento=fecha_nacimiento,
         sexo=sexo,
-        edad=edad,
         finca_id=finca_id,
         tipo_animal_id=tipo_animal_id
     )
 
-    # Guardar foto si existe
-    if foto:
-        filename = f"static/uploads/{foto.filename}"
-        with open(filename, "wb") as f:
-            f.write(await foto.read())
-        nuevo_ganado.foto = filename
+    # Guardar foto si existe (por bloques, fuera del event loop y nombrada por su hash)
+    if foto and foto.filename:
+        nuevo_ganado.foto = await storage.guardar_foto(foto)
 
-    db.add(nuevo_ganado)
-    db.commit()
-    db.refresh(nuevo_ganado)
+    await _registrar_alta(db, nuevo_ganado)
+    _publicar("creado", nuevo_ganado.id, nuevo_ganado.finca_id)
+
+    # Miniatura y tamaño medio, en segundo plano (pool de procesos)
+    thumbnails.programar_derivados(nuevo_ganado.foto)
     return nuevo_ganado
 
-# Lista ganado
+# Lista ganado (paginada por cursor). Con ?q= muestra los resultados de la búsqueda
 @router.get("/lista")
-async def listar_ganado_view(request: Request, db: Session = Depends(get_db)):
-    ganados = db.query(models.Ganado).all()
+async def listar_ganado_view(
+    request: Request,
+    filtros: schemas.FiltroGanado = Depends(),
+    q: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(queries.LIMITE_POR_DEFECTO, ge=1, le=queries.LIMITE_MAXIMO),
+    sort: str = "id",
+    db: AsyncSession = Depends(get_read_db)
+):
+    if q and q.strip():
+        ganados, siguiente = await _buscar_ganado(db, q, filtros, cursor, limit, *CON_RELACIONES)
+    else:
+        ganados, siguiente = await _pagina_ganado(db, filtros, cursor, limit, sort, *CON_RELACIONES)
     return templates.TemplateResponse(
         "ganado/lista_ganado.html",
-        {"request": request, "ganados": ganados}
+        {
+            "request": request,
+            "ganados": ganados,
+            "q": q or "",
+            "finca_id": filtros.finca_id,
+            "siguiente_url": request.url.include_query_params(cursor=siguiente) if siguiente else None,
+            "primera_url": request.url.remove_query_params("cursor") if cursor else None,
+        }
     )
 
 #Muestra el formulario para editar Ganado (precargado)
 # URL: /ganado/editar/{ganado_id}
 @router.get("/editar/{ganado_id}")
-async def editar_ganado_view(ganado_id: int, request: Request, db: Session = Depends(get_db)):
+async def editar_ganado_view(ganado_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
     """Muestra el formulario de edición, precargando datos y listas de opciones."""
-    ganado = db.query(models.Ganado).filter(models.Ganado.id == ganado_id).first()
-    if not ganado:
-        raise HTTPException(status_code=404, detail="Ganado no encontrado")
+    # El formulario solo usa finca_id / tipo_animal_id: cualquier carga perezosa
+    # de relaciones sería una consulta extra, así que se prohíbe explícitamente.
+    ganado = await _obtener_ganado(db, ganado_id, raiseload("*"))
         
-    fincas = db.query(models.Finca).all()
-    tipos_animales = db.query(models.TipoAnimal).all()
+    fincas, tipos_animales = await cache.referencias.obtener(db, "fincas", "tipos_animales")
     
     return templates.TemplateResponse(
         "ganado/editar_ganado.html",
@@ -92,11 +191,9 @@ async def editar_ganado_view(ganado_id: int, request: Request, db: Session = Dep
 # 4. Muestra el detalle de un animal
 # URL: /ganado/detalle/{ganado_id}
 @router.get("/detalle/{ganado_id}") 
-async def detalle_ganado_view(ganado_id: int, request: Request, db: Session = Depends(get_db)):
+async def detalle_ganado_view(ganado_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
     """Muestra el detalle de un animal específico."""
-    ganado = db.query(models.Ganado).filter(models.Ganado.id == ganado_id).first()
-    if not ganado:
-        raise HTTPException(status_code=404, detail="Ganado no encontrado")
+    ganado = await _obtener_ganado(db, ganado_id, *CON_RELACIONES)
     
     return templates.TemplateResponse(
         "ganado/detalle_ganado.html",
@@ -109,19 +206,96 @@ async def detalle_ganado_view(ganado_id: int, request: Request, db: Session = De
 
 # Crear ganado (POST API) - URL: /ganado/api/
 @router.post("/api/", response_model=schemas.Ganado)
-def crear_ganado(ganado: schemas.GanadoCreate, db: Session = Depends(get_db)):
+async def crear_ganado(ganado: schemas.GanadoCreate, db: AsyncSession = Depends(get_async_db)):
     # Lógica de validación y creación...
-    nuevo_ganado = models.Ganado(**ganado.dict())
-    db.add(nuevo_ganado)
-    db.commit()
-    db.refresh(nuevo_ganado)
+    nuevo_ganado = models.Ganado(**ganado.model_dump())
+    await _registrar_alta(db, nuevo_ganado)
+    _publicar("creado", nuevo_ganado.id, nuevo_ganado.finca_id)
     return nuevo_ganado
 
 
-# Listar ganado (GET API) - URL: /ganado/api/
-@router.get("/api/", response_model=list[schemas.Ganado]) 
-def listar_ganado_api(db: Session = Depends(get_db)):
-    return db.query(models.Ganado).all()
+# Importación masiva (POST API) - URL: /ganado/api/importar
+# Archivo CSV o NDJSON; se valida fila a fila y se inserta por lotes.
+@router.post("/api/importar", response_model=schemas.ResultadoImportacion)
+async def importar_ganado(
+    archivo: UploadFile = File(...),
+    formato: str | None = Form(None, description="csv o ndjson; si se omite se deduce del archivo"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    formato = formato or importacion.detectar_formato(archivo.filename, archivo.content_type)
+    if formato not in importacion.FORMATOS:
+        raise HTTPException(
+            status_code=400,
+            detail="Formato no reconocido: indique 'csv' o 'ndjson'."
+        )
+    resultado = await importacion.importar(db, archivo.file, formato)
+    if resultado.insertadas:
+        broker.cambios.publicar(broker.Evento("ganado", "masivo", None, None))
+    return resultado
+
+
+# Exportación en streaming (GET API) - URL: /ganado/api/exportar?formato=csv&gzip=true
+# Admite los mismos filtros que el listado; memoria constante con cualquier tamaño de hato.
+@router.get("/api/exportar")
+async def exportar_ganado(
+    filtros: schemas.FiltroGanado = Depends(),
+    formato: str = Query("csv", description="csv o ndjson"),
+    gzip: bool = Query(False, description="Comprimir la descarga (.gz)")
+):
+    if formato not in exportacion.FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato no soportado: use 'csv' o 'ndjson'.")
+
+    nombre = f"ganado-{datetime.utcnow():%Y%m%d}.{formato}"
+    media_type = exportacion.FORMATOS[formato]
+    if gzip:
+        nombre += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        exportacion.generar(formato, filtros, comprimir=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
+
+# Listar ganado (GET API) - URL: /ganado/api/?finca_id=&sexo=&cursor=&limit=&sort=
+# Paginación por cursor: se envía el 'next_cursor' de la respuesta para pedir la siguiente página.
+# Con If-None-Match responde 304 si el ganado no ha cambiado ese día (ver condicional.py).
+@router.get(
+    "/api/",
+    response_model=schemas.PaginaGanado,
+    dependencies=[Depends(condicional.por_version("ganados", diaria=True))],
+)
+async def listar_ganado_api(
+    response: Response,
+    filtros: schemas.FiltroGanado = Depends(),
+    cursor: str | None = None,
+    limit: int = Query(queries.LIMITE_POR_DEFECTO, ge=1, le=queries.LIMITE_MAXIMO),
+    sort: str = Query("id", description="Campo de orden; prefijo '-' para descendente"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    filas, siguiente = await _pagina_ganado(db, filtros, cursor, limit, sort, columnas=COLUMNAS_API)
+    return serializacion.respuesta(
+        {"items": serializacion.filas_a_dicts(filas), "next_cursor": siguiente}, response
+    )
+
+
+# Buscar ganado (GET API) - URL: /ganado/api/buscar?q=&cursor=&limit=
+# Busca fragmentos de la identificación, el nombre, la finca o el tipo; ordenado por relevancia.
+@router.get(
+    "/api/buscar",
+    response_model=schemas.PaginaGanado,
+    dependencies=[Depends(condicional.por_version("ganados", "fincas", "tipos_animales", diaria=True))],
+)
+async def buscar_ganado_api(
+    q: str = Query(..., min_length=1, description="Texto a buscar (fragmentos de 3+ caracteres)"),
+    filtros: schemas.FiltroGanado = Depends(),
+    cursor: str | None = None,
+    limit: int = Query(queries.LIMITE_POR_DEFECTO, ge=1, le=queries.LIMITE_MAXIMO),
+    db: AsyncSession = Depends(get_read_db)
+):
+    ganados, siguiente = await _buscar_ganado(db, q, filtros, cursor, limit)
+    return {"items": ganados, "next_cursor": siguiente}
 
 
 # Actualizar/Modificar (PUT/PATCH) - URL: /ganado/api/{ganado_id}
@@ -130,45 +304,178 @@ def listar_ganado_api(db: Session = Depends(get_db)):
 
 # Eliminar ganado (DELETE API) - URL: /ganado/api/{ganado_id}
 @router.delete("/api/{ganado_id}") 
-def eliminar_ganado(ganado_id: int, db: Session = Depends(get_db)):
-    ganado = db.query(models.Ganado).filter(models.Ganado.id == ganado_id).first()
-    if not ganado:
-        raise HTTPException(status_code=404, detail="Ganado no encontrado")
+async def eliminar_ganado(ganado_id: int, db: AsyncSession = Depends(get_async_db)):
+    ganado = await _obtener_ganado(db, ganado_id)
 
-    db.delete(ganado)
-    db.commit()
+    await db.delete(ganado)
+    await censo.ajustar(db, [(*censo.clave(ganado), -1)])
+    await eventos.registrar(db, [eventos.baja(ganado)])
+    await versiones.incrementar(db, "ganados")
+    await db.commit()
+    _publicar("eliminado", ganado.id, ganado.finca_id)
     return {"mensaje": "Ganado eliminado correctamente"}
 
 # Nueva función para actualizar (PUT) un registro de ganado
 @router.put("/{ganado_id}", response_model=schemas.Ganado)
-def actualizar_ganado(ganado_id: int, datos: schemas.GanadoUpdateData, db: Session = Depends(get_db)):
+async def actualizar_ganado(ganado_id: int, datos: schemas.GanadoUpdateData, db: AsyncSession = Depends(get_async_db)):
     # 1. Buscar el registro existente
-    ganado = db.query(models.Ganado).filter(models.Ganado.id == ganado_id).first()
-    
-    if not ganado:
-        raise HTTPException(status_code=404, detail="Registro de ganado no encontrado")
+    ganado = await _obtener_ganado(db, ganado_id, detalle="Registro de ganado no encontrado")
 
     # 2. Actualizar los campos con los nuevos datos
-    for key, value in datos.dict().items():
+    grupo_anterior = censo.clave(ganado)
+    finca_anterior = ganado.finca_id
+    for key, value in datos.model_dump().items():
         setattr(ganado, key, value)
 
-    # 3. Intentar confirmar la transacción (Manejo de errores de unicidad)
+    # 3. Intentar confirmar la transacción (identificación repetida o finca /
+    # tipo inexistente: el contador del censo del grupo nuevo también lo detecta)
     try:
-        db.commit()
+        # Mover la cabeza de grupo en el censo (misma transacción)
+        if censo.clave(ganado) != grupo_anterior:
+            await censo.ajustar(db, [(*grupo_anterior, -1), (*censo.clave(ganado), 1)])
+        await eventos.registrar(db, [eventos.cambio(ganado, grupo_anterior)])
+        await versiones.incrementar(db, "ganados")
+        await db.commit()
     except IntegrityError as e:
-        db.rollback() 
-        # Si la identificación es UNIQUE, maneja el error aquí:
-        if 'UNIQUE constraint failed' in str(e) and 'identificacion' in str(e):
-            raise HTTPException(
-                status_code=400,
-                detail=f"La identificación '{datos.identificacion}' ya está en uso por otro animal."
-            )
-        # Manejo de otros errores de integridad (como claves foráneas no válidas)
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Error de integridad de datos (Finca o Tipo de Animal no válido)."
+        await db.rollback()
+        raise _error_integridad(e, datos.identificacion)
+
+    await db.refresh(ganado)
+    _publicar("actualizado", ganado.id, finca_anterior, ganado.finca_id)
+    return ganado
+
+
+def _seleccion_lote(consulta, datos: schemas.ActualizacionLote):
+    """Restringe un SELECT o UPDATE a los animales del lote (por ids o por filtro)."""
+    if datos.ids is not None:
+        return consulta.where(models.Ganado.id.in_(datos.ids))
+    return queries.filtrar_ganado(consulta, datos.filtro)
+
+
+# Actualización por lotes (PATCH) - URL: /ganado/api/lote
+# Mueve o corrige muchos animales con un solo UPDATE y un solo commit.
+@router.patch("/api/lote", response_model=schemas.ResultadoLote)
+async def actualizar_ganado_lote(datos: schemas.ActualizacionLote, db: AsyncSession = Depends(get_async_db)):
+    cambios = datos.cambios.model_dump(exclude_unset=True)
+
+    # Claves foráneas: se validan una vez para todo el lote
+    if "finca_id" in cambios and await db.get(models.Finca, cambios["finca_id"]) is None:
+        raise HTTPException(status_code=400, detail=f"La finca {cambios['finca_id']} no existe")
+    if "tipo_animal_id" in cambios and await db.get(models.TipoAnimal, cambios["tipo_animal_id"]) is None:
+        raise HTTPException(status_code=400, detail=f"El tipo de animal {cambios['tipo_animal_id']} no existe")
+
+    # La primera escritura de la transacción: en SQLite toma el bloqueo de
+    # escritura, así los grupos leídos a continuación no cambian antes del UPDATE
+    await versiones.incrementar(db, "ganados")
+
+    # Censo: cuántas cabezas salen de cada grupo y a cuál llegan (sin leer animales)
+    campos_grupo = ("finca_id", "tipo_animal_id", "sexo")
+    if any(campo in cambios for campo in campos_grupo):
+        grupos = await db.execute(_seleccion_lote(
+            select(models.Ganado.finca_id, models.Ganado.tipo_animal_id, models.Ganado.sexo, func.count())
+            .group_by(models.Ganado.finca_id, models.Ganado.tipo_animal_id, models.Ganado.sexo),
+            datos,
+        ))
+        ajustes = []
+        for finca_id, tipo_animal_id, sexo, cantidad in grupos.all():
+            anterior = (finca_id, tipo_animal_id, sexo)
+            nuevo = tuple(cambios.get(campo, valor) for campo, valor in zip(campos_grupo, anterior))
+            ajustes += [(*anterior, -cantidad), (*nuevo, cantidad)]
+        await censo.ajustar(db, ajustes)
+
+    # Un evento por animal, con su grupo antes y después, en un INSERT ... SELECT
+    await eventos.registrar_desde(db, _seleccion_lote(eventos.seleccion_cambios(cambios), datos))
+
+    # Un único UPDATE; `version` se incrementa a mano (no pasa por el ORM)
+    actualizados = await db.scalars(
+        _seleccion_lote(update(models.Ganado), datos)
+        .values(**cambios, version=models.Ganado.version + 1)
+        .returning(models.Ganado.id)
+        .execution_options(synchronize_session=False)
+    )
+    ids_actualizados = set(actualizados.all())
+    await db.commit()
+    # Sin fincas: el filtro de cada vista se resuelve al leer las filas
+    broker.cambios.publicar(*(broker.Evento("ganado", "actualizado", id_, None) for id_ in ids_actualizados))
+
+    conflictos = []
+    if datos.ids is not None:
+        conflictos = [
+            schemas.ConflictoLote(id=id_, error="Ganado no encontrado")
+            for id_ in dict.fromkeys(datos.ids) if id_ not in ids_actualizados
+        ]
+    return schemas.ResultadoLote(actualizados=len(ids_actualizados), conflictos=conflictos)
+
+
+# ============================================================
+#          CAMBIOS EN VIVO (WebSocket) - URL: /ganado/ws?finca_id=
+# ============================================================
+#
+# La lista de ganado se suscribe a los cambios (de una finca o de todas) y
+# recibe mensajes JSON:
+#   {"filas": [{"id", "html"}], "eliminados": [ids], "recargar": bool, "censo": {...}}
+# Los eventos solo dicen qué filas cambiaron; su estado actual se lee al
+# enviar, con una consulta por lote coalescido (ver broker.py).
+
+FILA_GANADO = "ganado/fila_ganado.html"
+
+
+async def _censo_vivo(db: AsyncSession, finca_id: int | None) -> dict:
+    total, grupos = await censo.consultar(db, ["tipo"], finca_id=finca_id)
+    return {
+        "total": total,
+        "grupos": [{"tipo_animal": g["tipo_animal"], "cantidad": g["cantidad"]} for g in grupos],
+    }
+
+
+async def _mensaje_cambios(lote, recargar: bool, finca_id: int | None) -> dict:
+    mensaje = {"filas": [], "eliminados": [], "recargar": recargar}
+    async with ReadSessionLocal() as db:
+        ids = [evento.id for evento in lote]
+        if ids:
+            ganados = await db.scalars(
+                select(models.Ganado).options(*CON_RELACIONES).where(models.Ganado.id.in_(ids))
             )
+            actuales = {
+                ganado.id: ganado for ganado in ganados.unique()
+                if finca_id is None or ganado.finca_id == finca_id
+            }
+            plantilla = templates.env.get_template(FILA_GANADO)
+            for id_ in ids:
+                if id_ in actuales:
+                    mensaje["filas"].append({"id": id_, "html": plantilla.render(animal=actuales[id_])})
+                else:
+                    # Dado de baja o trasladado fuera de la finca de esta vista
+                    mensaje["eliminados"].append(id_)
+        mensaje["censo"] = await _censo_vivo(db, finca_id)
+    return mensaje
+
+
+@router.websocket("/ws")
+async def cambios_ganado_ws(websocket: WebSocket, finca_id: int | None = None):
+    await websocket.accept()
+    suscripcion = broker.cambios.suscribir(finca_id)
 
-    db.refresh(ganado)
-    return ganado
\ No newline at end of file
+    async def _esperar_cierre():
+        # El cliente no envía nada: solo se escucha para detectar la desconexión
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    cierre = asyncio.create_task(_esperar_cierre())
+    try:
+        async with ReadSessionLocal() as db:
+            await websocket.send_json({"censo": await _censo_vivo(db, finca_id)})
+        while True:
+            espera = asyncio.create_task(suscripcion.siguiente())
+            await asyncio.wait({cierre, espera}, return_when=asyncio.FIRST_COMPLETED)
+            if cierre.done():
+                espera.cancel()
+                break
+            lote, recargar = espera.result()
+            # Mientras se envía, los nuevos cambios se siguen acumulando (coalescidos)
+            await websocket.send_json(await _mensaje_cambios(lote, recargar, finca_id))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broker.cambios.cancelar(suscripcion)
+        cierre.cancel()
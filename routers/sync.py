@@ -0,0 +1,81 @@
+import gzip
+import zlib
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+import config, schemas, sincronizacion, serializacion, broker, assets
+
+
+class RequestSync(Request):
+    """Request cuyo cuerpo puede venir con Content-Encoding: gzip (lotes grandes desde el campo)."""
+
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            # Se cuenta mientras se lee: un cuerpo demasiado grande se rechaza
+            # sin cargarlo entero en memoria
+            partes, leidos = [], 0
+            async for parte in self.stream():
+                leidos += len(parte)
+                if leidos > config.SYNC_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail="Lote de sincronización demasiado grande")
+                partes.append(parte)
+            cuerpo = b"".join(partes)
+            if self.headers.get("content-encoding", "").strip().lower() == "gzip":
+                cuerpo = _descomprimir(cuerpo)
+            self._body = cuerpo
+        return self._body
+
+
+def _descomprimir(cuerpo: bytes) -> bytes:
+    """Descomprime sin pasar de SYNC_MAX_BYTES (evita bombas de compresión)."""
+    descompresor = zlib.decompressobj(wbits=31)
+    try:
+        datos = descompresor.decompress(cuerpo, config.SYNC_MAX_BYTES + 1)
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="El cuerpo no es gzip válido")
+    if len(datos) > config.SYNC_MAX_BYTES or descompresor.unconsumed_tail:
+        raise HTTPException(status_code=413, detail="Lote de sincronización demasiado grande")
+    return datos
+
+
+class RutaSync(APIRoute):
+    def get_route_handler(self):
+        manejador = super().get_route_handler()
+
+        async def manejar(request: Request) -> Response:
+            return await manejador(RequestSync(request.scope, request.receive))
+
+        return manejar
+
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sincronización"],
+    route_class=RutaSync,
+)
+
+# ======================================================
+#                RUTAS DE LA API (JSON)
+# ======================================================
+
+# Sincronización de un dispositivo sin conexión - URL: /sync/
+# Cuerpo: schemas.LoteSync en JSON, opcionalmente con Content-Encoding: gzip.
+# Aplica las mutaciones en una transacción y devuelve los cambios del servidor
+# desde `token`; el dispositivo guarda el token nuevo para la siguiente vez.
+@router.post("/", response_model=schemas.RespuestaSync)
+async def sincronizar(lote: schemas.LoteSync, request: Request, db: AsyncSession = Depends(get_async_db)):
+    resultados, cambios = await sincronizacion.aplicar(db, lote)
+    for accion, ganado_id, fincas in cambios:
+        broker.cambios.publicar(broker.Evento("ganado", accion, ganado_id, set(fincas)))
+    delta = await sincronizacion.cambios_desde(db, lote.token, lote.finca_id)
+
+    # La respuesta puede traer miles de animales: se codifica sin validar y,
+    # si el cliente lo acepta, se comprime
+    contenido = serializacion.codificar({**delta, "resultados": [r.model_dump() for r in resultados]})
+    cabeceras = {"Vary": "Accept-Encoding"}
+    if "gzip" in assets.codificaciones_aceptadas(request.headers.get("accept-encoding", "")):
+        contenido = gzip.compress(contenido, compresslevel=6)
+        cabeceras["Content-Encoding"] = "gzip"
+    return Response(contenido, media_type="application/json", headers=cabeceras)
@@ -1,19 +1,25 @@
-from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from database import get_db
-import models, schemas # Importa modelos y esquemas
+from fastapi import APIRouter, Request, Response, Depends, HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, get_read_db
+from templating import templates
+import models, schemas, cache, versiones, condicional, serializacion, broker # Importa modelos y esquemas
 from sqlalchemy.exc import IntegrityError # 🛑 IMPORTA ESTO
 
 
-# Inicializar Jinja2Templates
-templates = Jinja2Templates(directory="templates") 
 
 router = APIRouter(
     prefix="/tipos-animales", # Usamos guiones para la URL
     tags=["Tipos de Animales"]
 )
 
+async def _obtener_tipo(db: AsyncSession, tipo_id: int, detalle="Tipo de animal no encontrado"):
+    """Busca un tipo de animal por id o responde 404."""
+    tipo = await db.get(models.TipoAnimal, tipo_id)
+    if not tipo:
+        raise HTTPException(status_code=404, detail=detalle)
+    return tipo
+
 # ======================================================
 #                RUTAS DE VISTAS (HTML GET)
 # ======================================================
@@ -29,9 +35,9 @@ async def crear_tipo_animal_view(request: Request):
 # 2. Muestra la tabla de Tipos de Animales
 # URL: /tipos-animales/lista
 @router.get("/lista")
-async def listar_tipos_animales_view(request: Request, db: Session = Depends(get_db)):
+async def listar_tipos_animales_view(request: Request, db: AsyncSession = Depends(get_read_db)):
     """Muestra la tabla de tipos de animales."""
-    tipos = db.query(models.TipoAnimal).all()
+    tipos = (await db.scalars(select(models.TipoAnimal))).all()
     return templates.TemplateResponse(
         "tipo_animal/lista_tipos_animales.html", 
         {"request": request, "tipos": tipos}
@@ -40,11 +46,9 @@ async def listar_tipos_animales_view(request: Request, db: Session = Depends(get
 # 3. Muestra el formulario para editar Tipo de Animal (precargado)
 # URL: /tipos-animales/editar/{tipo_id}
 @router.get("/editar/{tipo_id}")
-async def editar_tipo_animal_view(tipo_id: int, request: Request, db: Session = Depends(get_db)):
+async def editar_tipo_animal_view(tipo_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
     """Muestra el formulario de edición, precargando el nombre del tipo."""
-    tipo = db.query(models.TipoAnimal).filter(models.TipoAnimal.id == tipo_id).first()
-    if not tipo:
-        raise HTTPException(status_code=404, detail="Tipo de animal no encontrado")
+    tipo = await _obtener_tipo(db, tipo_id)
     return templates.TemplateResponse(
         "tipo_animal/editar_tipo_animal.html", 
         {"request": request, "tipo": tipo}
@@ -57,17 +61,18 @@ async def editar_tipo_animal_view(tipo_id: int, request: Request, db: Session =
 
 # Crear Tipo de Animal (POST API) - URL: /tipos-animales/
 @router.post("/", response_model=schemas.TipoAnimal)
-def crear_tipo_animal(tipo: schemas.TipoAnimalCreate, db: Session = Depends(get_db)):
+async def crear_tipo_animal(tipo: schemas.TipoAnimalCreate, db: AsyncSession = Depends(get_async_db)):
     # Nota: Tu esquema TipoAnimalCreate debe tener solo el campo 'nombre'
 
-    nuevo_tipo = models.TipoAnimal(**tipo.dict())
+    nuevo_tipo = models.TipoAnimal(**tipo.model_dump())
     db.add(nuevo_tipo)
     
     try:
-        db.commit() # Intentamos confirmar la inserción
+        await versiones.incrementar(db, "tipos_animales")
+        await db.commit() # Intentamos confirmar la inserción
     
     except IntegrityError as e:
-        db.rollback() # Si hay error, revertimos la sesión
+        await db.rollback() # Si hay error, revertimos la sesión
         
         # Verificamos si el error es por duplicidad (el constraint UNIQUE)
         # Esto funciona bien con SQLite y otros DBs
@@ -84,48 +89,49 @@ def crear_tipo_animal(tipo: schemas.TipoAnimalCreate, db: Session = Depends(get_
             )
     
     # Si el commit fue exitoso, refrescamos y retornamos
-    db.refresh(nuevo_tipo)
+    cache.referencias.invalidar("tipos_animales")
+    await db.refresh(nuevo_tipo)
+    broker.cambios.publicar(broker.Evento("tipo_animal", "creado", nuevo_tipo.id, None))
     return nuevo_tipo
 
 
 # Listar todos los Tipos de Animales (GET API) - URL: /tipos-animales/
-@router.get("/", response_model=list[schemas.TipoAnimal])
-def listar_tipos_animales_api(db: Session = Depends(get_db)):
+@router.get("/", response_model=list[schemas.TipoAnimal], dependencies=[Depends(condicional.por_version("tipos_animales"))])
+async def listar_tipos_animales_api(response: Response, db: AsyncSession = Depends(get_read_db)):
     """Devuelve datos JSON de todos los tipos de animales."""
-    return db.query(models.TipoAnimal).all()
+    filas = await db.execute(select(*serializacion.columnas(models.TipoAnimal, schemas.TipoAnimal)))
+    return serializacion.respuesta(serializacion.filas_a_dicts(filas), response)
 
 
 # Actualizar Tipo de Animal (PUT API) - URL: /tipos-animales/{tipo_id}
 @router.put("/{tipo_id}", response_model=schemas.TipoAnimal)
-def actualizar_tipo_animal(tipo_id: int, datos: schemas.TipoAnimalCreate, db: Session = Depends(get_db)):
-    tipo = db.query(models.TipoAnimal).filter(models.TipoAnimal.id == tipo_id).first()
-    if not tipo:
-        raise HTTPException(status_code=404, detail="Tipo de animal no encontrado")
+async def actualizar_tipo_animal(tipo_id: int, datos: schemas.TipoAnimalCreate, db: AsyncSession = Depends(get_async_db)):
+    tipo = await _obtener_tipo(db, tipo_id)
 
-    for key, value in datos.dict().items():
+    for key, value in datos.model_dump().items():
         setattr(tipo, key, value)
 
-    db.commit()
-    db.refresh(tipo)
+    await versiones.incrementar(db, "tipos_animales")
+    await db.commit()
+    cache.referencias.invalidar("tipos_animales")
+    await db.refresh(tipo)
+    broker.cambios.publicar(broker.Evento("tipo_animal", "actualizado", tipo.id, None))
     return tipo
 
 
 # En routers/tipo_animal.py, reemplaza la función existente por esta:
 # Eliminar Tipo de Animal (DELETE API) - URL: /tipos-animales/{tipo_id}
 @router.delete("/{tipo_id}") 
-def eliminar_tipo_animal(tipo_id: int, db: Session = Depends(get_db)):
+async def eliminar_tipo_animal(tipo_id: int, db: AsyncSession = Depends(get_async_db)):
     
     # 1. Obtener el Tipo de Animal
-    tipo = db.query(models.TipoAnimal).filter(models.TipoAnimal.id == tipo_id).first()
-    
-    if not tipo:
-        raise HTTPException(status_code=404, detail="Tipo de Animal no encontrado")
+    tipo = await _obtener_tipo(db, tipo_id, detalle="Tipo de Animal no encontrado")
 
     # 2. 🛑 VERIFICAR GANADO DEPENDIENTE 🛑
     # Consulta la tabla de Ganado para ver si existe algún animal que use este tipo_animal_id
-    ganado_dependiente = db.query(models.Ganado).filter(
-        models.Ganado.tipo_animal_id == tipo_id
-    ).first() 
+    ganado_dependiente = await db.scalar(
+        select(models.Ganado.id).where(models.Ganado.tipo_animal_id == tipo_id).limit(1)
+    )
 
     if ganado_dependiente:
         # Si se encuentra un animal, lanza la excepción HTTP 400 con el mensaje deseado
@@ -134,14 +140,27 @@ def eliminar_tipo_animal(tipo_id: int, db: Session = Depends(get_db)):
             detail="No se puede eliminar el tipo de animal porque se está usando."
         )
 
-    # 3. Si no hay dependencias, proceder con la eliminación
-    db.delete(tipo)
+    # 3. Si no hay dependencias, proceder con la eliminación. Sin animales, los
+    # contadores del censo del tipo están en cero (bases anteriores a que
+    # censo.ajustar los borrara): se eliminan para no violar su clave foránea
+    await db.execute(delete(models.ConteoGanado).where(models.ConteoGanado.tipo_animal_id == tipo_id))
+    await db.delete(tipo)
     
     try:
-        db.commit()
+        await versiones.incrementar(db, "tipos_animales")
+        await db.commit()
+    except IntegrityError:
+        # Un animal registrado con este tipo entre la verificación y el commit
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="No se puede eliminar el tipo de animal porque se está usando."
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         # Esto debería ser un error muy raro ahora, pero es bueno manejarlo
         raise HTTPException(status_code=500, detail=f"Error inesperado al eliminar: {e}")
         
+    cache.referencias.invalidar("tipos_animales")
+    broker.cambios.publicar(broker.Evento("tipo_animal", "eliminado", tipo_id, None))
     return {"mensaje": "Tipo de animal eliminado correctamente"}
\ No newline at end of file
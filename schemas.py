@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import date
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Annotated, Literal, Optional, Union
+from datetime import date, datetime
 from fastapi import UploadFile, File
 
 # GanadoCreate se mantiene igual, sin la foto
@@ -17,8 +17,11 @@ class FincaCreate(FincaBase):
 
 class Finca(FincaBase):
     id: int
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class PaginaFincas(BaseModel):
+    items: list[Finca]
+    next_cursor: Optional[str] = None
 
 
 #-------Ganado------
@@ -26,28 +29,86 @@ class GanadoBase(BaseModel):
     identificacion: str
     nombre: Optional[str] = None
     fecha_nacimiento: date
-    edad: int
     sexo: str
     finca_id: int
     tipo_animal_id: int     #relación con TipoAnimal
 
+# La edad no se envía: se deriva de fecha_nacimiento (si llega, se ignora)
 class GanadoCreate(GanadoBase):
     pass
 
 class Ganado(GanadoBase):
     id: int
-    class Config:
-        orm_mode = True
+    edad: Optional[int] = None  # meses cumplidos
+    model_config = ConfigDict(from_attributes=True)
+
+class PaginaGanado(BaseModel):
+    items: list[Ganado]
+    next_cursor: Optional[str] = None
+
+# Filtros de servidor para el listado de ganado (parámetros de consulta)
+class FiltroGanado(BaseModel):
+    finca_id: Optional[int] = None
+    tipo_animal_id: Optional[int] = None
+    sexo: Optional[str] = None
+    nacido_desde: Optional[date] = None
+    nacido_hasta: Optional[date] = None
+    # Edad en meses (rango sobre fecha_nacimiento, ver edades.py)
+    categoria_edad: Optional[Literal["ternero", "añojo", "adulto"]] = None
+    edad_min_meses: Optional[int] = Field(None, ge=0)
+    edad_max_meses: Optional[int] = Field(None, ge=0)
 
 class GanadoUpdate(BaseModel):
     nombre: str | None = None
-    edad: int | None = None
     sexo: str | None = None
     finca_id: int | None = None
+    tipo_animal_id: int | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Actualización por lotes: los animales se eligen por ids o por filtro, y solo
+# se modifican los campos enviados en `cambios`
+class ActualizacionLote(BaseModel):
+    ids: Optional[list[int]] = Field(None, min_length=1, max_length=10000)
+    filtro: Optional[FiltroGanado] = None
+    cambios: GanadoUpdate
+
+    @model_validator(mode="after")
+    def _seleccion(self):
+        if (self.ids is None) == (self.filtro is None):
+            raise ValueError("Indique 'ids' o 'filtro' (solo uno de los dos)")
+        if self.filtro is not None and not self.filtro.model_dump(exclude_none=True):
+            raise ValueError("El filtro no puede estar vacío (actualizaría todo el ganado)")
+        if not self.cambios.model_fields_set:
+            raise ValueError("No hay cambios que aplicar")
+        nulos = [
+            campo for campo in ("sexo", "finca_id", "tipo_animal_id")
+            if campo in self.cambios.model_fields_set and getattr(self.cambios, campo) is None
+        ]
+        if nulos:
+            raise ValueError(f"Campos obligatorios sin valor: {', '.join(nulos)}")
+        return self
+
+class ConflictoLote(BaseModel):
+    id: int
+    error: str
+
+class ResultadoLote(BaseModel):
+    actualizados: int
+    conflictos: list[ConflictoLote] = []
 
-    class Config:
-        orm_mode = True
 
+# Informe de la importación masiva (una entrada por fila rechazada)
+class ErrorImportacion(BaseModel):
+    fila: int
+    identificacion: Optional[str] = None
+    error: str
+
+class ResultadoImportacion(BaseModel):
+    filas: int = 0
+    insertadas: int = 0
+    errores: list[ErrorImportacion] = []
 
 class GanadoUpdateData(BaseModel):
     identificacion: str
@@ -57,6 +118,101 @@ class GanadoUpdateData(BaseModel):
     finca_id: int
     tipo_animal_id: int
 
+#-------Sincronización (dispositivos sin conexión)------
+
+# Cada mutación lleva una clave única generada por el dispositivo (p. ej. un
+# UUID): si el lote se reenvía, las mutaciones ya aplicadas no se repiten.
+# `ref` permite actualizar o eliminar un animal creado sin conexión, con la
+# clave de su mutación "crear" (de este lote o de uno anterior).
+class MutacionSyncBase(BaseModel):
+    clave: str = Field(min_length=1, max_length=100)
+
+class CrearSync(MutacionSyncBase):
+    operacion: Literal["crear"]
+    datos: GanadoCreate
+
+class _ObjetivoSync(MutacionSyncBase):
+    id: Optional[int] = None
+    ref: Optional[str] = None
+    # Versión del animal que vio el dispositivo: si cambió en el servidor, conflicto
+    version: Optional[int] = None
+
+    @model_validator(mode="after")
+    def _objetivo(self):
+        if (self.id is None) == (self.ref is None):
+            raise ValueError("Indique 'id' o 'ref' (solo uno de los dos)")
+        return self
+
+class ActualizarSync(_ObjetivoSync):
+    operacion: Literal["actualizar"]
+    datos: GanadoUpdateData
+
+class EliminarSync(_ObjetivoSync):
+    operacion: Literal["eliminar"]
+
+MutacionSync = Annotated[Union[CrearSync, ActualizarSync, EliminarSync], Field(discriminator="operacion")]
+
+class LoteSync(BaseModel):
+    dispositivo: str = Field(min_length=1, max_length=100)
+    # Token de la sincronización anterior (None: copia completa)
+    token: Optional[int] = None
+    # Limitar los cambios devueltos a una finca
+    finca_id: Optional[int] = None
+    mutaciones: list[MutacionSync] = Field(default_factory=list, max_length=5000)
+
+class ResultadoMutacion(BaseModel):
+    clave: str
+    estado: Literal["aplicada", "repetida", "conflicto", "error"]
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class GanadoSync(Ganado):
+    version: int
+
+class RespuestaSync(BaseModel):
+    token: int
+    # True: `ganados` es la copia completa y reemplaza los datos del dispositivo
+    completo: bool
+    resultados: list[ResultadoMutacion]
+    ganados: list[GanadoSync]
+    eliminados: list[int]
+
+#-------Censo------
+
+class GrupoCenso(BaseModel):
+    finca_id: Optional[int] = None
+    finca: Optional[str] = None
+    tipo_animal_id: Optional[int] = None
+    tipo_animal: Optional[str] = None
+    sexo: Optional[str] = None
+    categoria_edad: Optional[str] = None
+    cantidad: int
+
+class Censo(BaseModel):
+    total: int
+    grupos: list[GrupoCenso]
+
+class PuntoHistorico(BaseModel):
+    fecha: date
+    cantidad: int
+    entradas: int
+    salidas: int
+
+class SerieHistorico(BaseModel):
+    finca_id: Optional[int] = None
+    finca: Optional[str] = None
+    tipo_animal_id: Optional[int] = None
+    tipo_animal: Optional[str] = None
+    sexo: Optional[str] = None
+    puntos: list[PuntoHistorico]
+
+class HistoricoCenso(BaseModel):
+    desde: date
+    hasta: date
+    # Última incorporación de eventos: los cambios posteriores aún no aparecen
+    actualizado: Optional[datetime] = None
+    series: list[SerieHistorico]
+
 #-------Tipo de Animal------
 
 class TipoAnimalBase(BaseModel):
@@ -68,8 +224,7 @@ class TipoAnimalCreate(TipoAnimalBase):
 class TipoAnimal(TipoAnimalBase):
     id: int
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 
@@ -0,0 +1,67 @@
+import json
+from datetime import date, datetime
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # sin orjson se usa el json de la biblioteca estándar
+    orjson = None
+
+# ============================================================
+#        SERIALIZACIÓN RÁPIDA DE LISTADOS (filas -> JSON)
+# ============================================================
+#
+# Con `response_model`, FastAPI valida cada objeto ORM con Pydantic y después
+# lo recorre con jsonable_encoder: en listados grandes es la mayor parte del
+# tiempo de CPU. Las filas que salen de la base de datos ya tienen los tipos
+# del esquema, así que los listados:
+#   1. piden solo las columnas del esquema, como tuplas (sin objetos ORM),
+#   2. no las vuelven a validar,
+#   3. las codifican con orjson.
+# El `response_model` se mantiene en la ruta para la documentación OpenAPI.
+
+
+def columnas(modelo, esquema) -> list:
+    """
+    Columnas de `modelo` que corresponden a los campos de `esquema`, en su orden.
+    Se etiquetan con el nombre del campo: también vale para expresiones SQL
+    (propiedades híbridas como Ganado.edad).
+    """
+    return [getattr(modelo, campo).label(campo) for campo in esquema.model_fields]
+
+
+def filas_a_dicts(filas) -> list[dict]:
+    return [fila._asdict() for fila in filas]
+
+
+def _por_defecto(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def codificar(contenido) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(contenido)
+    return json.dumps(
+        contenido, default=_por_defecto, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class RespuestaJSON(Response):
+    """Respuesta JSON sin validación ni jsonable_encoder (solo datos de confianza)."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return codificar(content)
+
+
+def respuesta(contenido, response: Response | None = None) -> RespuestaJSON:
+    """
+    Construye la respuesta conservando las cabeceras que las dependencias
+    pusieron en `response` (p. ej. ETag): FastAPI no las copia cuando la ruta
+    devuelve un Response propio.
+    """
+    return RespuestaJSON(contenido, headers=dict(response.headers) if response is not None else None)
@@ -0,0 +1,182 @@
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models, schemas, censo, eventos, versiones, serializacion
+
+# ============================================================
+#      SINCRONIZACIÓN DE DISPOSITIVOS SIN CONEXIÓN (POST /sync/)
+# ============================================================
+#
+# Un dispositivo acumula mutaciones sin conexión y las envía en un solo lote:
+#   1. `aplicar`: todas en una transacción, cada una en su SAVEPOINT (una
+#      identificación repetida o un conflicto no invalida las demás). Las
+#      aplicadas guardan su clave en sync_claves: si el lote se reenvía (p. ej.
+#      se cortó la conexión antes de recibir la respuesta) no se repiten.
+#   2. `cambios_desde`: los animales que cambiaron en el servidor desde el
+#      token del dispositivo. El token es el id del último evento de ganado
+#      (eventos.py), así que la diferencia se obtiene de eventos_ganado. Es
+#      una marca segura porque los ids de los eventos se hacen visibles en el
+#      orden en que se confirman, también en PostgreSQL (ver "Orden de
+#      confirmación" en eventos.py): ningún cambio aparece luego por debajo
+#      de un token ya entregado.
+#
+# Censo, eventos y versiones se mantienen igual que en las rutas de ganado.
+
+COLUMNAS_SYNC = serializacion.columnas(models.Ganado, schemas.GanadoSync)
+
+
+class ConflictoSync(Exception):
+    pass
+
+
+class ErrorSync(Exception):
+    pass
+
+
+async def _crear(db: AsyncSession, mutacion: schemas.CrearSync, ganado):
+    ganado = models.Ganado(**mutacion.datos.model_dump())
+    db.add(ganado)
+    await db.flush()
+    await censo.ajustar(db, [(*censo.clave(ganado), 1)])
+    await eventos.registrar(db, [eventos.alta(ganado)])
+    return ganado, (ganado.finca_id,)
+
+
+async def _actualizar(db: AsyncSession, mutacion: schemas.ActualizarSync, ganado):
+    grupo_anterior = censo.clave(ganado)
+    finca_anterior = ganado.finca_id
+    for campo, valor in mutacion.datos.model_dump().items():
+        setattr(ganado, campo, valor)
+    await db.flush()
+    if censo.clave(ganado) != grupo_anterior:
+        await censo.ajustar(db, [(*grupo_anterior, -1), (*censo.clave(ganado), 1)])
+    await eventos.registrar(db, [eventos.cambio(ganado, grupo_anterior)])
+    return ganado, (finca_anterior, ganado.finca_id)
+
+
+async def _eliminar(db: AsyncSession, mutacion: schemas.EliminarSync, ganado):
+    await db.delete(ganado)
+    await db.flush()
+    await censo.ajustar(db, [(*censo.clave(ganado), -1)])
+    await eventos.registrar(db, [eventos.baja(ganado)])
+    return ganado, (ganado.finca_id,)
+
+
+OPERACIONES = {"crear": _crear, "actualizar": _actualizar, "eliminar": _eliminar}
+ACCIONES_BROKER = {"crear": "creado", "actualizar": "actualizado", "eliminar": "eliminado"}
+
+
+def _objetivo(mutacion, ids_por_clave: dict, cargados: dict):
+    """Animal al que se refiere una mutación actualizar / eliminar."""
+    ganado_id = mutacion.id
+    if mutacion.ref is not None:
+        ganado_id = ids_por_clave.get(mutacion.ref)
+        if ganado_id is None:
+            raise ErrorSync(f"La referencia '{mutacion.ref}' no corresponde a ninguna alta sincronizada")
+    ganado = cargados.get(ganado_id)
+    if ganado is None:
+        raise ErrorSync("Ganado no encontrado")
+    if mutacion.version is not None and ganado.version != mutacion.version:
+        raise ConflictoSync(f"El animal cambió en el servidor (versión {ganado.version})", ganado.id)
+    return ganado
+
+
+async def aplicar(db: AsyncSession, lote: schemas.LoteSync) -> tuple[list[schemas.ResultadoMutacion], list[tuple]]:
+    """
+    Aplica las mutaciones del lote en una transacción y la confirma.
+
+    Devuelve (resultados, cambios), donde cambios es una lista de
+    (acción, ganado_id, fincas) para avisar a las vistas en vivo.
+    """
+    mutaciones = lote.mutaciones
+    claves = {m.clave for m in mutaciones} | {m.ref for m in mutaciones if getattr(m, "ref", None)}
+
+    # Claves ya aplicadas (reenvíos) y altas referenciadas con `ref`
+    ids_por_clave = dict((await db.execute(
+        select(models.SyncClave.clave, models.SyncClave.ganado_id)
+        .where(models.SyncClave.dispositivo == lote.dispositivo, models.SyncClave.clave.in_(claves))
+    )).all())
+    aplicadas = set(ids_por_clave)
+
+    # Los animales a modificar, en una sola consulta
+    ids = {m.id for m in mutaciones if getattr(m, "id", None) is not None} | set(ids_por_clave.values())
+    cargados = {}
+    if ids:
+        cargados = {g.id: g for g in (await db.scalars(select(models.Ganado).where(models.Ganado.id.in_(ids)))).all()}
+
+    resultados, cambios = [], []
+    for mutacion in mutaciones:
+        if mutacion.clave in aplicadas:
+            resultados.append(schemas.ResultadoMutacion(
+                clave=mutacion.clave, estado="repetida", id=ids_por_clave.get(mutacion.clave)
+            ))
+            continue
+        objetivo = None
+        try:
+            if mutacion.operacion != "crear":
+                objetivo = _objetivo(mutacion, ids_por_clave, cargados)
+            async with db.begin_nested():
+                ganado, fincas = await OPERACIONES[mutacion.operacion](db, mutacion, objetivo)
+                db.add(models.SyncClave(dispositivo=lote.dispositivo, clave=mutacion.clave, ganado_id=ganado.id))
+                await db.flush()
+        except ConflictoSync as e:
+            resultados.append(schemas.ResultadoMutacion(clave=mutacion.clave, estado="conflicto", id=e.args[1], error=e.args[0]))
+            continue
+        except ErrorSync as e:
+            resultados.append(schemas.ResultadoMutacion(clave=mutacion.clave, estado="error", error=str(e)))
+            continue
+        except IntegrityError:
+            resultados.append(schemas.ResultadoMutacion(
+                clave=mutacion.clave, estado="error",
+                error="Identificación en uso por otro animal, o finca / tipo de animal inexistente.",
+            ))
+            # El SAVEPOINT se revirtió: el animal vuelve a su estado en la base
+            if objetivo is not None:
+                await db.refresh(objetivo)
+            continue
+
+        aplicadas.add(mutacion.clave)
+        if mutacion.operacion == "crear":
+            ids_por_clave[mutacion.clave] = ganado.id
+            cargados[ganado.id] = ganado
+        elif mutacion.operacion == "eliminar":
+            cargados.pop(ganado.id, None)
+        resultados.append(schemas.ResultadoMutacion(clave=mutacion.clave, estado="aplicada", id=ganado.id))
+        cambios.append((ACCIONES_BROKER[mutacion.operacion], ganado.id, fincas))
+
+    if cambios:
+        await versiones.incrementar(db, "ganados")
+    await db.commit()
+    return resultados, cambios
+
+
+async def cambios_desde(db: AsyncSession, token: int | None, finca_id: int | None = None) -> dict:
+    """Animales cambiados desde `token` (o todos, si no hay token) y el token nuevo."""
+    e = models.EventoGanado
+    nuevo_token = await db.scalar(select(func.coalesce(func.max(e.id), 0)))
+    consulta = select(*COLUMNAS_SYNC)
+    if finca_id is not None:
+        consulta = consulta.where(models.Ganado.finca_id == finca_id)
+
+    # Sin token, o con uno que el servidor no emitió (base restaurada): copia completa
+    if token is None or token > nuevo_token:
+        filas = await db.execute(consulta.order_by(models.Ganado.id))
+        return {"token": nuevo_token, "completo": True, "ganados": serializacion.filas_a_dicts(filas), "eliminados": []}
+
+    cambiados = select(e.ganado_id).where(e.id > token, e.id <= nuevo_token).distinct()
+    if finca_id is not None:
+        # También los que salieron de la finca: para el dispositivo, eliminados
+        cambiados = cambiados.where(or_(e.finca_id == finca_id, e.finca_anterior_id == finca_id))
+    ids = set((await db.scalars(cambiados)).all())
+    ganados = []
+    if ids:
+        filas = await db.execute(consulta.where(models.Ganado.id.in_(ids)).order_by(models.Ganado.id))
+        ganados = serializacion.filas_a_dicts(filas)
+    presentes = {g["id"] for g in ganados}
+    return {
+        "token": nuevo_token,
+        "completo": False,
+        "ganados": ganados,
+        "eliminados": sorted(ids - presentes),
+    }
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import tempfile
+
+from fastapi import HTTPException, UploadFile
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+
+import config
+
+# ============================================================
+#          ALMACENAMIENTO DE FOTOS (direccionado por contenido)
+# ============================================================
+#
+# Las fotos se guardan como static/uploads/<ab>/<sha256>.<ext>, donde <ab> son
+# los dos primeros caracteres del hash. Dos fotos idénticas comparten archivo
+# y dos fotos distintas con el mismo nombre original ya no se sobrescriben.
+
+DIRECTORIO_FOTOS = "static/uploads"
+TAMANO_MAXIMO = config.FOTO_MAX_BYTES
+TAMANO_BLOQUE = 256 * 1024
+
+# Firmas (magic bytes) de los formatos admitidos. No se confía en el
+# content-type ni en la extensión que envía el navegador.
+FIRMAS = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+
+class FotoInvalida(ValueError):
+    """La foto no cumple los límites de tamaño o tipo."""
+
+    def __init__(self, status_code: int, detalle: str):
+        super().__init__(detalle)
+        self.status_code = status_code
+
+
+def detectar_extension(cabecera: bytes):
+    """Devuelve la extensión según los primeros bytes del archivo, o None."""
+    for firma, extension in FIRMAS:
+        if cabecera.startswith(firma):
+            return extension
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def ruta_foto(digest: str, extension: str) -> str:
+    return os.path.join(DIRECTORIO_FOTOS, digest[:2], digest + extension)
+
+
+def _copiar_a_disco(origen, tamano_maximo: int) -> str:
+    """
+    Copia el archivo subido a disco por bloques, calculando el SHA-256 a la vez.
+
+    Se ejecuta en el threadpool: ni la lectura del archivo temporal de la
+    subida ni la escritura bloquean el event loop, y en memoria solo hay un
+    bloque a la vez.
+    """
+    os.makedirs(DIRECTORIO_FOTOS, exist_ok=True)
+    origen.seek(0)
+    cabecera = origen.read(TAMANO_BLOQUE)
+    extension = detectar_extension(cabecera)
+    if extension is None:
+        raise FotoInvalida(415, "Formato de foto no permitido (JPEG, PNG, GIF o WebP).")
+
+    sha = hashlib.sha256()
+    total = 0
+    fd, temporal = tempfile.mkstemp(dir=DIRECTORIO_FOTOS, suffix=".parcial")
+    try:
+        with os.fdopen(fd, "wb") as destino:
+            bloque = cabecera
+            while bloque:
+                total += len(bloque)
+                if total > tamano_maximo:
+                    raise FotoInvalida(
+                        413, f"La foto supera el tamaño máximo de {tamano_maximo // (1024 * 1024)} MB."
+                    )
+                sha.update(bloque)
+                destino.write(bloque)
+                bloque = origen.read(TAMANO_BLOQUE)
+
+        final = ruta_foto(sha.hexdigest(), extension)
+        if os.path.exists(final):
+            # Foto ya almacenada: se reutiliza (deduplicación)
+            os.unlink(temporal)
+        else:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(temporal, final)
+        return final.replace(os.sep, "/")
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+
+
+async def guardar_foto(foto: UploadFile, tamano_maximo: int | None = None) -> str:
+    """
+    Guarda una foto subida y devuelve su ruta relativa (static/uploads/...).
+
+    Responde 413 si supera el tamaño máximo y 415 si no es una imagen admitida.
+    """
+    tamano_maximo = tamano_maximo or TAMANO_MAXIMO
+    if foto.size is not None and foto.size > tamano_maximo:
+        raise HTTPException(
+            status_code=413,
+            detail=f"La foto supera el tamaño máximo de {tamano_maximo // (1024 * 1024)} MB."
+        )
+    try:
+        return await run_in_threadpool(_copiar_a_disco, foto.file, tamano_maximo)
+    except FotoInvalida as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+
+def eliminar_foto(foto: str):
+    """Borra una foto de disco (solo rutas dentro de static/uploads)."""
+    ruta = os.path.normpath(foto)
+    if os.path.commonpath([ruta, os.path.normpath(DIRECTORIO_FOTOS)]) != os.path.normpath(DIRECTORIO_FOTOS):
+        return
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+class StaticFilesInmutables(StaticFiles):
+    """
+    StaticFiles con caché de larga duración.
+
+    Solo debe montarse sobre archivos cuyo nombre cambia cuando cambia su
+    contenido (fotos nombradas por hash y sus derivados).
+    """
+
+    CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = self.CACHE_CONTROL
+        return response
@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, nodes, select_autoescape
+from jinja2.ext import Extension
+
+import assets
+import config
+import thumbnails
+
+# ============================================================
+#        ENTORNO DE PLANTILLAS COMPARTIDO (Jinja2)
+# ============================================================
+#
+# Un único entorno para main.py y todos los routers:
+#   - las plantillas se compilan una vez por proceso (precompilar() en el
+#     lifespan) y no una vez por cada Jinja2Templates,
+#   - el código compilado se guarda en disco (FileSystemBytecodeCache), de modo
+#     que los demás workers y los reinicios no vuelven a compilar,
+#   - la etiqueta {% cache %} guarda fragmentos ya renderizados:
+#
+#       {% cache "fila_ganado", animal.id, animal.version %} ... {% endcache %}
+#
+#     La clave debe incluir todo lo que cambia el fragmento (p. ej. la versión
+#     de la fila, ver models.Ganado.version); las entradas obsoletas no se
+#     borran, simplemente dejan de usarse y salen por LRU.
+
+DIRECTORIO_PLANTILLAS = "templates"
+
+logger = logging.getLogger("ganaderia.plantillas")
+
+
+class Fragmentos:
+    """Caché LRU en memoria de fragmentos renderizados (por worker)."""
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        with self._lock:
+            valor = self._entradas.get(clave)
+            if valor is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+                self._entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+class CacheFragmentos(Extension):
+    """Etiqueta {% cache clave, ... %} ... {% endcache %}."""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        clave = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            clave.append(parser.parse_expression())
+        cuerpo = parser.parse_statements(("name:endcache",), drop_needle=True)
+        llamada = self.call_method("_renderizar", [nodes.Tuple(clave, "load")])
+        return nodes.CallBlock(llamada, [], [], cuerpo).set_lineno(lineno)
+
+    def _renderizar(self, clave, caller):
+        fragmentos = self.environment.fragmentos
+        if fragmentos.maximo <= 0:
+            return caller()
+        html = fragmentos.obtener(clave)
+        if html is None:
+            html = caller()
+            fragmentos.guardar(clave, html)
+        return html
+
+
+class BytecodeCacheDiferido(FileSystemBytecodeCache):
+    """Crea el directorio al guardar el primer bytecode, no al importar."""
+
+    def dump_bytecode(self, bucket):
+        os.makedirs(self.directory, exist_ok=True)
+        super().dump_bytecode(bucket)
+
+
+def crear_entorno() -> Environment:
+    bytecode_cache = None
+    if config.PLANTILLAS_CACHE:
+        bytecode_cache = BytecodeCacheDiferido(config.PLANTILLAS_CACHE)
+    entorno = Environment(
+        loader=FileSystemLoader(DIRECTORIO_PLANTILLAS),
+        autoescape=select_autoescape(),
+        bytecode_cache=bytecode_cache,
+        # Sin recarga, get_template no consulta la fecha del archivo en cada render
+        auto_reload=config.PLANTILLAS_RECARGA,
+        extensions=[CacheFragmentos],
+    )
+    entorno.fragmentos = Fragmentos(config.FRAGMENTOS_MAX)
+    entorno.filters["foto_url"] = thumbnails.url_foto
+    entorno.globals["asset_url"] = assets.asset_url
+    return entorno
+
+
+entorno = crear_entorno()
+templates = Jinja2Templates(env=entorno)
+
+
+def precompilar() -> int:
+    """Compila (o carga del bytecode cache) todas las plantillas. Devuelve cuántas."""
+    inicio = time.perf_counter()
+    nombres = entorno.list_templates(extensions=["html"])
+    for nombre in nombres:
+        entorno.get_template(nombre)
+    logger.info("%d plantillas precompiladas en %.1f ms", len(nombres), (time.perf_counter() - inicio) * 1000)
+    return len(nombres)
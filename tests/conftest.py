@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# ============================================================
+#     ENTORNO DE PRUEBAS (antes de importar config / database)
+# ============================================================
+# Una base SQLite temporal por sesión y el modo depuración activado: cada
+# respuesta trae X-DB-Queries (ver main.contar_consultas).
+
+_DIRECTORIO = tempfile.mkdtemp(prefix="ganaderia-pruebas-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DIRECTORIO, 'pruebas.db')}"
+os.environ["GANADO_DEBUG"] = "1"
+os.environ["GANADO_METRICAS"] = "0"
+os.environ["GANADO_HISTORICO_INTERVALO"] = "0"
+os.environ["GANADO_PLANTILLAS_CACHE"] = os.path.join(_DIRECTORIO, "plantillas")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+GANADOS = 40
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    """App real (crear_app + lifespan) sobre una base con una finca, un tipo y GANADOS animales."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.crear_app()) as cliente:
+        cliente.post("/fincas/", json={"nombre": "La Esperanza", "tamaño": 10, "ubicacion": "Norte"})
+        cliente.post("/tipos-animales/", json={"nombre": "Bovino"})
+        for i in range(GANADOS):
+            respuesta = cliente.post("/ganado/api/", data={
+                "identificacion": f"VACA-{i:03d}",
+                "fecha_nacimiento": "2022-01-01",
+                "sexo": "Hembra" if i % 2 else "Macho",
+                "finca_id": 1,
+                "tipo_animal_id": 1,
+            })
+            assert respuesta.status_code == 200, respuesta.text
+        yield cliente
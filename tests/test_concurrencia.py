@@ -0,0 +1,36 @@
+import asyncio
+
+import httpx
+
+# ============================================================
+#            ESCRITURAS CONCURRENTES (SQLite con WAL)
+# ============================================================
+# Las rutas de escritura leen y luego escriben en la misma transacción. Si la
+# transacción empezara con un BEGIN diferido, SQLite tendría que promover el
+# bloqueo de lectura a escritura y, con otra escritura en curso, fallaría al
+# instante con "database is locked" (sin esperar busy_timeout). El engine de
+# escritura usa BEGIN IMMEDIATE: las escrituras esperan su turno.
+
+ESCRITURAS = 40
+
+
+def test_escrituras_concurrentes_no_bloquean(cliente):
+    ids = [animal["id"] for animal in cliente.get("/ganado/api/?limit=500").json()["items"]][:ESCRITURAS]
+
+    async def actualizar_todos():
+        transporte = httpx.ASGITransport(app=cliente.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://prueba") as http:
+            return await asyncio.gather(*(
+                http.put(f"/ganado/{ganado_id}", json={
+                    "identificacion": f"CONC-{ganado_id:03d}",
+                    "nombre": "concurrente",
+                    "fecha_nacimiento": "2021-06-01",
+                    "sexo": "Hembra",
+                    "finca_id": 1,
+                    "tipo_animal_id": 1,
+                })
+                for ganado_id in ids
+            ))
+
+    respuestas = cliente.portal.call(actualizar_todos)
+    assert [r.status_code for r in respuestas] == [200] * len(ids)
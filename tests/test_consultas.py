@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import select
+
+import models
+from database import SessionLocal, medir_consultas
+
+# ============================================================
+#      CONSULTAS POR PETICIÓN (regresiones N+1 y de caché)
+# ============================================================
+# Cada ruta debe hacer un número fijo de consultas, sin importar cuántos
+# animales devuelva. Se mide la segunda petición: la primera puede poblar las
+# cachés de fincas y tipos (cache.referencias).
+
+
+def _consultas(cliente, url, **kwargs):
+    respuesta = cliente.get(url, **kwargs)
+    return respuesta, int(respuesta.headers["X-DB-Queries"])
+
+
+def test_medir_consultas_cuenta_y_anida(cliente):
+    with SessionLocal() as db:
+        with medir_consultas() as exterior:
+            db.execute(select(models.Finca.id)).all()
+            with medir_consultas() as interior:
+                db.execute(select(models.Ganado.id)).all()
+                db.execute(select(models.TipoAnimal.id)).all()
+    assert interior.consultas == 2
+    assert exterior.consultas == 3
+
+
+@pytest.mark.parametrize("url, esperadas", [
+    # Versión de la tabla (ETag) + página de tuplas
+    ("/ganado/api/", 2),
+    ("/ganado/api/?limit=5", 2),
+    ("/ganado/api/?sort=-fecha_nacimiento&sexo=Hembra", 2),
+    ("/ganado/api/buscar?q=VACA", 2),
+    ("/fincas/", 2),
+    ("/fincas/api/1", 2),
+    # Vistas HTML: una consulta con las relaciones cargadas (joinedload)
+    ("/ganado/lista", 1),
+    ("/ganado/detalle/1", 1),
+])
+def test_consultas_por_ruta(cliente, url, esperadas):
+    cliente.get(url)
+    respuesta, consultas = _consultas(cliente, url)
+    assert respuesta.status_code == 200
+    assert consultas == esperadas
+
+
+@pytest.mark.parametrize("url", ["/ganado/api/", "/ganado/api/buscar?q=VACA", "/fincas/", "/fincas/api/1"])
+def test_304_solo_consulta_la_version(cliente, url):
+    etag = cliente.get(url).headers["ETag"]
+    respuesta, consultas = _consultas(cliente, url, headers={"If-None-Match": etag})
+    assert respuesta.status_code == 304
+    assert consultas == 1
+
+
+def test_consultas_no_crecen_con_la_pagina(cliente):
+    cliente.get("/ganado/api/?limit=1")
+    _, una = _consultas(cliente, "/ganado/api/?limit=1")
+    _, todas = _consultas(cliente, "/ganado/api/?limit=500")
+    assert una == todas
@@ -0,0 +1,52 @@
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy import func, select, update
+
+import database
+import historico
+import models
+from database import SessionLocal
+
+# ============================================================
+#     HISTÓRICO DEL CENSO: CABEZAS AL INICIO DEL RANGO
+# ============================================================
+# Las cabezas al inicio salen del censo actual menos los movimientos
+# posteriores (resumidos o aún pendientes): deben coincidir con la suma de
+# toda la historia anterior al rango.
+
+DESDE = date(2020, 1, 2)
+
+
+def _por_sexo():
+    with SessionLocal() as db:
+        return Counter(dict(db.execute(
+            select(models.Ganado.sexo, func.count()).group_by(models.Ganado.sexo)
+        ).all()))
+
+
+def test_nivel_inicial_con_eventos_resumidos_y_pendientes(cliente):
+    # Toda la historia hasta ahora ocurrió antes del rango
+    with SessionLocal() as db:
+        db.execute(update(models.EventoGanado).values(fecha=datetime(2020, 1, 1, 12)))
+        db.commit()
+    anteriores = _por_sexo()
+
+    async def actualizar():
+        async with database.AsyncSessionLocal() as db:
+            await historico.actualizar(db)
+
+    async def serie():
+        async with database.AsyncSessionLocal() as db:
+            series, _ = await historico.serie(db, DESDE, DESDE, agrupar=("sexo",))
+            return {s["sexo"]: s["puntos"][0]["cantidad"] for s in series}
+
+    cliente.portal.call(actualizar)
+    ids = [animal["id"] for animal in cliente.get("/ganado/api/", params={"limit": 2}).json()["items"]]
+    # Una baja ya resumida en censo_diario y otra todavía pendiente
+    assert cliente.delete(f"/ganado/api/{ids[0]}").status_code == 200
+    cliente.portal.call(actualizar)
+    assert cliente.delete(f"/ganado/api/{ids[1]}").status_code == 200
+
+    assert _por_sexo() != anteriores
+    assert cliente.portal.call(serie) == {sexo: n for sexo, n in anteriores.items() if n}
@@ -0,0 +1,44 @@
+import database
+import importacion
+import schemas
+
+# ============================================================
+#     IMPORTACIÓN: REINTENTO FILA A FILA (conflictos concurrentes)
+# ============================================================
+# Las referencias (fincas y tipos) se cargan al empezar la importación. Si una
+# finca se elimina después, el lote falla por la clave foránea y el reintento
+# fila a fila debe decir qué pasó, no "identificación en uso".
+
+
+def _fila(identificacion, finca_id):
+    return {
+        "identificacion": identificacion, "nombre": None, "fecha_nacimiento": None,
+        "sexo": "Macho", "finca_id": finca_id, "tipo_animal_id": 1,
+    }
+
+
+def test_reintento_distingue_finca_eliminada(cliente):
+    finca_id = cliente.post("/fincas/", json={"nombre": "Temporal", "tamaño": 1, "ubicacion": "Sur"}).json()["id"]
+
+    async def cargar_referencias():
+        async with database.AsyncSessionLocal() as db:
+            return await importacion._Referencias.cargar(db)
+
+    async def insertar(referencias):
+        async with database.AsyncSessionLocal() as db:
+            resultado = schemas.ResultadoImportacion()
+            await importacion._insertar_lote(db, [
+                (2, _fila("IMPORTADA-1", 1)),
+                (3, _fila("IMPORTADA-2", finca_id)),
+                (4, _fila("IMPORTADA-1", 1)),
+            ], resultado, referencias)
+            return resultado
+
+    referencias = cliente.portal.call(cargar_referencias)
+    assert cliente.delete(f"/fincas/{finca_id}").status_code == 200
+    resultado = cliente.portal.call(insertar, referencias)
+    assert resultado.insertadas == 1
+    assert {e.fila: e.error for e in resultado.errores} == {
+        3: f"Finca con id {finca_id} no existe",
+        4: "La identificación ya está en uso por otro animal.",
+    }
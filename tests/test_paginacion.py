@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import insert
+
+import models
+from database import SessionLocal
+
+# ============================================================
+#          PAGINACIÓN POR CURSOR (todas las filas, sin repetir)
+# ============================================================
+
+
+@pytest.fixture(scope="module")
+def sin_fecha(cliente):
+    """Animales sin fecha de nacimiento (solo posibles por importación o SQL)."""
+    with SessionLocal() as db:
+        db.execute(insert(models.Ganado), [
+            {"identificacion": f"SINFECHA-{i}", "sexo": "Macho", "finca_id": 1, "tipo_animal_id": 1}
+            for i in range(5)
+        ])
+        db.commit()
+
+
+def _recorrer(cliente, sort):
+    ids, cursor = [], None
+    while True:
+        params = {"sort": sort, "limit": 7}
+        if cursor:
+            params["cursor"] = cursor
+        pagina = cliente.get("/ganado/api/", params=params).json()
+        ids += [animal["id"] for animal in pagina["items"]]
+        cursor = pagina["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("sort", ["id", "-id", "identificacion", "fecha_nacimiento", "-fecha_nacimiento"])
+def test_recorre_todas_las_filas(cliente, sin_fecha, sort):
+    todos = {animal["id"] for animal in cliente.get("/ganado/api/", params={"limit": 500}).json()["items"]}
+    ids = _recorrer(cliente, sort)
+    assert len(ids) == len(set(ids))
+    assert set(ids) == todos
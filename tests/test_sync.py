@@ -0,0 +1,31 @@
+import httpx
+
+import config
+
+# ============================================================
+#          SINCRONIZACIÓN: LÍMITE DE TAMAÑO DEL LOTE
+# ============================================================
+# El cuerpo se cuenta mientras se lee: un lote demasiado grande se rechaza
+# con 413 sin esperar (ni guardar en memoria) el resto.
+
+PARTES = 100
+
+
+def test_lote_demasiado_grande_se_corta_al_leer(cliente, monkeypatch):
+    monkeypatch.setattr(config, "SYNC_MAX_BYTES", 1000)
+    enviadas = []
+
+    async def cuerpo():
+        # Sin Content-Length (transferencia por partes): solo cuenta lo leído
+        for _ in range(PARTES):
+            enviadas.append(1)
+            yield b" " * 100
+
+    async def sincronizar():
+        transporte = httpx.ASGITransport(app=cliente.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://prueba") as http:
+            return await http.post("/sync/", content=cuerpo(), headers={"Content-Type": "application/json"})
+
+    respuesta = cliente.portal.call(sincronizar)
+    assert respuesta.status_code == 413
+    assert len(enviadas) < PARTES
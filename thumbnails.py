@@ -0,0 +1,163 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from storage import DIRECTORIO_FOTOS
+
+# ============================================================
+#        DERIVADOS DE FOTOS (miniatura y tamaño medio)
+# ============================================================
+#
+# Por cada foto static/uploads/<ruta>.<ext> se generan, en un pool de procesos,
+# static/derivados/<tamaño>/<ruta>.webp. Las plantillas piden el tamaño que
+# necesitan con el filtro `foto_url` y, si el derivado aún no existe, se sirve
+# la foto original.
+
+DIRECTORIO_DERIVADOS = "static/derivados"
+
+# Lado mayor (px) de cada derivado
+TAMANOS = {
+    "thumb": 160,
+    "medium": 800,
+}
+
+EXTENSIONES_FOTO = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+logger = logging.getLogger("ganaderia.thumbnails")
+
+_pool: ProcessPoolExecutor | None = None
+
+# Derivados que ya se vieron en disco. Se nombran por el hash de la foto y no
+# cambian: una vez generados, url_foto no vuelve a consultar el sistema de
+# archivos (las filas cacheadas de la lista lo llaman en cada render).
+_derivados_existentes: set[str] = set()
+
+
+def ruta_derivado(foto: str, tamano: str) -> str:
+    """static/uploads/ab/<hash>.jpg -> static/derivados/<tamano>/ab/<hash>.webp"""
+    relativa = os.path.relpath(foto, DIRECTORIO_FOTOS)
+    return os.path.join(DIRECTORIO_DERIVADOS, tamano, os.path.splitext(relativa)[0] + ".webp")
+
+
+def url_foto(foto: str | None, tamano: str | None = None) -> str | None:
+    """Filtro de plantilla: URL del derivado pedido, o de la original si no existe."""
+    if not foto:
+        return None
+    if tamano:
+        derivado = ruta_derivado(foto, tamano)
+        if derivado in _derivados_existentes or os.path.exists(derivado):
+            _derivados_existentes.add(derivado)
+            return "/" + derivado.replace(os.sep, "/")
+    return "/" + foto
+
+
+def eliminar_derivados(foto: str):
+    """Borra los derivados de una foto eliminada."""
+    for tamano in TAMANOS:
+        _derivados_existentes.discard(ruta_derivado(foto, tamano))
+        try:
+            os.remove(ruta_derivado(foto, tamano))
+        except FileNotFoundError:
+            pass
+
+
+def generar_derivados(foto: str) -> list[str]:
+    """
+    Genera los derivados que falten para una foto. Se ejecuta en un proceso
+    del pool: decodificar y redimensionar imágenes es trabajo de CPU.
+    """
+    from PIL import Image, ImageOps
+
+    pendientes = {
+        tamano: ruta_derivado(foto, tamano)
+        for tamano in TAMANOS
+        if not os.path.exists(ruta_derivado(foto, tamano))
+    }
+    if not pendientes:
+        return []
+
+    generados = []
+    with Image.open(foto) as original:
+        imagen = ImageOps.exif_transpose(original)
+        if imagen.mode not in ("RGB", "RGBA"):
+            imagen = imagen.convert("RGBA" if "transparency" in imagen.info else "RGB")
+        for tamano, destino in pendientes.items():
+            lado = TAMANOS[tamano]
+            copia = imagen.copy()
+            copia.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+            directorio = os.path.dirname(destino)
+            os.makedirs(directorio, exist_ok=True)
+            # Nombre temporal único: otro worker (o el backfill) puede estar
+            # generando el mismo derivado; cada uno reemplaza el final entero
+            fd, temporal = tempfile.mkstemp(dir=directorio, suffix=".parcial")
+            try:
+                with os.fdopen(fd, "wb") as archivo:
+                    copia.save(archivo, "WEBP", quality=80, method=4)
+                os.replace(temporal, destino)
+            except BaseException:
+                if os.path.exists(temporal):
+                    os.unlink(temporal)
+                raise
+            generados.append(destino)
+    return generados
+
+
+def _obtener_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # 'spawn' evita heredar hilos y conexiones del servidor al hacer fork
+        _pool = ProcessPoolExecutor(
+            max_workers=max(1, min(4, (os.cpu_count() or 2) - 1)),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _registrar_error(futuro, foto):
+    error = futuro.exception()
+    if error is not None:
+        logger.warning("No se pudieron generar los derivados de %s: %s", foto, error)
+
+
+def programar_derivados(foto: str | None):
+    """Encola la generación de derivados sin esperar el resultado."""
+    if not foto:
+        return None
+    futuro = _obtener_pool().submit(generar_derivados, foto)
+    futuro.add_done_callback(lambda f: _registrar_error(f, foto))
+    return futuro
+
+
+def cerrar_pool():
+    """Detiene el pool de procesos (al apagar la aplicación)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def fotos_existentes():
+    """Recorre static/uploads y devuelve las rutas de todas las fotos."""
+    for raiz, _, archivos in os.walk(DIRECTORIO_FOTOS):
+        for nombre in archivos:
+            if nombre.lower().endswith(EXTENSIONES_FOTO):
+                yield os.path.join(raiz, nombre).replace(os.sep, "/")
+
+
+def backfill() -> int:
+    """Genera los derivados que falten para todas las fotos ya subidas."""
+    futuros = [programar_derivados(foto) for foto in fotos_existentes()]
+    generados = 0
+    for futuro in futuros:
+        if futuro.exception() is None:
+            generados += len(futuro.result())
+    cerrar_pool()
+    return generados
+
+
+# Uso: python thumbnails.py  (genera los derivados de las fotos existentes)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Derivados generados: {backfill()}")
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from database import insert_dialecto
+
+# ============================================================
+#              VERSIONES DE CAMBIO POR TABLA
+# ============================================================
+#
+# Una fila por tabla en `versiones`. Las rutas de escritura llaman a
+# `incrementar` antes de su commit; quien mantiene datos derivados (cachés,
+# ETags) compara la versión guardada con la actual con una lectura por clave
+# primaria.
+
+
+async def incrementar(db: AsyncSession, *tablas: str):
+    """Incrementa la versión de cada tabla (crea la fila si no existe)."""
+    tabla = models.VersionTabla.__table__
+    ahora = datetime.utcnow()
+    consulta = insert_dialecto(db)(tabla)
+    consulta = consulta.on_conflict_do_update(
+        index_elements=[tabla.c.tabla],
+        set_={"version": tabla.c.version + 1, "actualizado": ahora},
+    )
+    await db.execute(
+        consulta, [{"tabla": nombre, "version": 1, "actualizado": ahora} for nombre in tablas]
+    )
+
+
+async def obtener(db: AsyncSession, *tablas: str) -> dict[str, int]:
+    """Versión actual de cada tabla (0 si nunca se ha modificado)."""
+    filas = await db.execute(
+        select(models.VersionTabla.tabla, models.VersionTabla.version)
+        .where(models.VersionTabla.tabla.in_(tablas))
+    )
+    versiones = dict.fromkeys(tablas, 0)
+    versiones.update(dict(filas.all()))
+    return versiones
+
+
+async def estado(db: AsyncSession, *tablas: str) -> dict[str, tuple[int, datetime | None]]:
+    """(versión, fecha del último cambio) de cada tabla; (0, None) si nunca cambió."""
+    filas = await db.execute(
+        select(models.VersionTabla.tabla, models.VersionTabla.version, models.VersionTabla.actualizado)
+        .where(models.VersionTabla.tabla.in_(tablas))
+    )
+    resultado = dict.fromkeys(tablas, (0, None))
+    resultado.update({tabla: (version, actualizado) for tabla, version, actualizado in filas.all()})
+    return resultado